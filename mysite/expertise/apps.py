@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class ExpertiseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'expertise'
+
+    def ready(self):
+        from expertise import instrumentation
+        instrumentation.install()
@@ -0,0 +1,220 @@
+"""end-to-end benchmark of the most used views on synthetic graphs
+
+every scenario is a request through the Django test client, so the middleware, the
+templates and the JSON encoding are included. the latency percentiles are from the
+timed runs, the memory peak from one extra run with tracemalloc because tracing slows
+down the requests
+
+run_payload_benchmark compares the memory of the two encodings of persons_api on the
+memory graph store, see LEAN_PERSONS_PAYLOAD
+"""
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+from django.test.utils import override_settings
+
+from expertise.graph_index import clear_graph_index
+from expertise.graph_store import get_graph_store
+from expertise.instrumentation import record_queries
+from expertise.models import EditSubmission, Person, ResearchInterest, Expertise
+from expertise.synthetic import clear_graph, generate_graph, write_graph
+from expertise.views import persons_api
+
+DEFAULT_REPEAT = 20
+WARMUP = 2
+PERCENTILES = (50, 95, 99)
+# the scenarios that only read through the graph store, the others need Neo4j
+MEMORY_SCENARIOS = ("persons_api", "graph_api")
+
+# the encodings of persons_api by the value of LEAN_PERSONS_PAYLOAD
+PAYLOAD_MODES = {"dicts": False, "lean": True}
+
+Scenario = tuple[str, Callable[[Client], HttpResponse]]
+
+def get_edit_post_data(person: dict, offered: list[str]) -> dict:
+    return {
+        "action": "edit",
+        "personId": person["pk"],
+        "name": person["name"],
+        "email": person["email"],
+        "title": person["title"],
+        "offered": offered,
+    }
+
+def get_scenarios(graph: dict, client: Client, submissions: int) -> list[Scenario]:
+    """returns the scenarios for the written graph and creates the pending submissions
+    of the approve page"""
+    persons = graph["nodes"][Person]
+    degrees = Counter()
+    for *_, rows in graph["relationships"]:
+        for start, end in rows:
+            degrees[start] += 1
+            degrees[end] += 1
+    interest_pks = {row["pk"] for row in graph["nodes"][ResearchInterest]}
+    hub = max(interest_pks, key=lambda pk: (degrees[pk], pk))
+    leaf = min((row["pk"] for row in persons), key=lambda pk: (degrees[pk] or float("inf"), pk))
+    expertise = graph["nodes"][Expertise][0]["pk"]
+
+    # the persons of the approve page are the first ones, the edit scenarios use the last
+    # one and run after the approve page
+    for person in persons[:min(submissions, len(persons) - 1)]:
+        client.post("/expertise/edit", get_edit_post_data(person, [expertise, "new expertise"]))
+    edited = persons[-1]
+
+    return [
+        ("index", lambda c: c.get("/expertise/")),
+        ("persons_api empty", lambda c: c.get("/expertise/persons?search=")),
+        ("persons_api one phrase", lambda c: c.get("/expertise/persons?search=learning")),
+        ("persons_api multiple phrases", lambda c: c.get("/expertise/persons?search=learning&search=applied")),
+        ("graph_api hub", lambda c: c.get(f"/expertise/graph?id={hub}")),
+        ("graph_api hub depth 2", lambda c: c.get(f"/expertise/graph?id={hub}&depth=2")),
+        ("graph_api leaf", lambda c: c.get(f"/expertise/graph?id={leaf}")),
+        (f"approve GET {EditSubmission.objects.count()} submissions", lambda c: c.get("/expertise/approve")),
+        ("edit GET", lambda c: c.get(f"/expertise/edit?person={edited['pk']}")),
+        ("edit POST", lambda c: c.post("/expertise/edit", get_edit_post_data(edited, [expertise]))),
+        ("shorten", lambda c: c.post(
+            "/expertise/shorten",
+            {"parameters": "search=learning&filter=inte-1"},
+            content_type="application/json",
+        )),
+    ]
+
+def run_scenario(client: Client, request: Callable[[Client], HttpResponse], repeat: int) -> dict:
+    for _ in range(WARMUP):
+        request(client)
+    durations = []
+    queries = []
+    statuses = set()
+    for _ in range(repeat):
+        with record_queries() as records:
+            start = time.perf_counter()
+            response = request(client)
+            durations.append(time.perf_counter() - start)
+        queries.append(len(records))
+        statuses.add(response.status_code)
+
+    tracemalloc.start()
+    try:
+        request(client)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    milliseconds = np.array(durations) * 1000
+    result = {f"p{p}_ms": round(float(np.percentile(milliseconds, p)), 2) for p in PERCENTILES}
+    result["mean_ms"] = round(float(milliseconds.mean()), 2)
+    result["cypher_queries"] = max(queries)
+    result["peak_memory_kb"] = round(peak / 1024)
+    result["status"] = sorted(statuses)
+    return result
+
+def run_benchmark(
+        sizes: list[int],
+        seed: int = 0,
+        repeat: int = DEFAULT_REPEAT,
+        submissions: int = 10,
+        progress: Callable[[str], None] | None = None,
+        memory: bool = False,
+    ) -> list[dict]:
+    """generates a graph for every number of persons and runs all scenarios on it. the
+    databases need to be test databases because they are cleared
+
+    Args:
+        memory (bool): load the graphs into the configured MemoryGraphStore instead of
+            Neo4j and only run MEMORY_SCENARIOS
+    """
+    user = User.objects.filter(username="benchmark").first() or User.objects.create_superuser(username="benchmark")
+    results = []
+    for persons in sizes:
+        EditSubmission.objects.all().delete()
+        graph = generate_graph(persons, seed)
+        if memory:
+            store = get_graph_store()
+            store.clear()
+            store.load_graph(graph)
+        else:
+            clear_graph()
+            write_graph(graph)
+        clear_graph_index()
+        client = Client()
+        client.force_login(user)
+        size = {
+            "persons": persons,
+            "nodes": sum(len(rows) for rows in graph["nodes"].values()),
+            "relationships": sum(len(rows) for *_, rows in graph["relationships"]),
+        }
+        for name, request in get_scenarios(graph, client, 0 if memory else submissions):
+            if memory and not name.startswith(MEMORY_SCENARIOS):
+                continue
+            result = {**size, "scenario": name, **run_scenario(client, request, repeat)}
+            results.append(result)
+            if progress:
+                progress(
+                    f"{persons:>7} persons  {name:<32} p50 {result['p50_ms']:>9.2f} ms  "
+                    f"p95 {result['p95_ms']:>9.2f} ms  {result['cypher_queries']:>3} queries  "
+                    f"{result['peak_memory_kb']:>8} KiB"
+                )
+    return results
+
+def send_persons_payload(lean: bool) -> int:
+    """runs persons_api for all persons and consumes the response like a WSGI server,
+    returns the number of bytes"""
+    request = RequestFactory().get("/expertise/persons?search=")
+    with override_settings(LEAN_PERSONS_PAYLOAD=lean):
+        response = persons_api(request)
+        if not response.streaming:
+            return len(response.content)
+        return sum(len(chunk) for chunk in response.streaming_content)
+
+def run_payload_benchmark(
+        sizes: list[int],
+        seed: int = 0,
+        repeat: int = DEFAULT_REPEAT,
+        progress: Callable[[str], None] | None = None,
+    ) -> list[dict]:
+    """measures the time and the tracemalloc peak of the persons payload of all persons
+    for every encoding. the graphs are loaded into the configured MemoryGraphStore, so
+    only the Python side of the pipeline is measured"""
+    results = []
+    for persons in sizes:
+        graph = generate_graph(persons, seed)
+        store = get_graph_store()
+        store.clear()
+        store.load_graph(graph)
+        sizes_by_mode = {}
+        for mode, lean in PAYLOAD_MODES.items():
+            send_persons_payload(lean)
+            durations = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                send_persons_payload(lean)
+                durations.append(time.perf_counter() - start)
+            tracemalloc.start()
+            try:
+                sizes_by_mode[mode] = send_persons_payload(lean)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            milliseconds = np.array(durations) * 1000
+            result = {
+                "persons": persons,
+                "scenario": f"persons payload {mode}",
+                **{f"p{p}_ms": round(float(np.percentile(milliseconds, p)), 2) for p in PERCENTILES},
+                "peak_memory_kb": round(peak / 1024),
+                "payload_kb": round(sizes_by_mode[mode] / 1024),
+            }
+            results.append(result)
+            if progress:
+                progress(
+                    f"{persons:>7} persons  {result['scenario']:<32} p50 {result['p50_ms']:>9.2f} ms  "
+                    f"{result['payload_kb']:>8} KiB payload  {result['peak_memory_kb']:>8} KiB peak"
+                )
+        if len(set(sizes_by_mode.values())) != 1:
+            raise RuntimeError(f"the encodings of {persons} persons have different sizes: {sizes_by_mode}")
+    return results
@@ -0,0 +1,141 @@
+"""centrality scores of all nodes for ranking and emphasizing nodes in the graph
+
+the scores are computed by the compute_centrality command on the undirected graph
+without parallel relationships and stored with the graph version. requests only read
+the stored scores
+"""
+from typing import Iterable
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from expertise.graph_index import GraphIndex
+from expertise.models import NodeCentrality
+
+DAMPING = 0.85
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-8
+DEFAULT_BETWEENNESS_SAMPLES = 100
+
+def simple_adjacency(index: GraphIndex) -> tuple[np.ndarray, np.ndarray]:
+    """returns indptr and neighbors of the index without parallel relationships and loops"""
+    size = len(index)
+    origins = np.repeat(np.arange(size, dtype=np.int64), index.degrees())
+    codes = np.unique(origins * size + index.neighbors)
+    origins, neighbors = codes // size, codes % size
+    keep = origins != neighbors
+    origins, neighbors = origins[keep], neighbors[keep]
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(origins, minlength=size), out=indptr[1:])
+    return indptr, neighbors
+
+def pagerank(indptr: np.ndarray, neighbors: np.ndarray) -> np.ndarray:
+    """power iteration, the rank of nodes without neighbors is distributed to all nodes"""
+    size = len(indptr) - 1
+    if size == 0:
+        return np.zeros(0)
+    degrees = np.diff(indptr)
+    origins = np.repeat(np.arange(size), degrees)
+    dangling = degrees == 0
+    ranks = np.full(size, 1 / size)
+    for _ in range(MAX_ITERATIONS):
+        shares = np.divide(ranks, degrees, out=np.zeros(size), where=~dangling)
+        new_ranks = np.bincount(neighbors, weights=shares[origins], minlength=size)
+        new_ranks = DAMPING * (new_ranks + ranks[dangling].sum() / size) + (1 - DAMPING) / size
+        converged = np.abs(new_ranks - ranks).sum() < TOLERANCE
+        ranks = new_ranks
+        if converged:
+            break
+    return ranks
+
+def _expand(indptr: np.ndarray, neighbors: np.ndarray, frontier: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """returns all relationships (origin, neighbor) of the frontier nodes"""
+    counts = indptr[frontier + 1] - indptr[frontier]
+    origins = np.repeat(frontier, counts)
+    # position of every relationship in its origin's slice of neighbors
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return origins, neighbors[np.repeat(indptr[frontier], counts) + offsets]
+
+def betweenness(indptr: np.ndarray, neighbors: np.ndarray, samples: int, seed: int = 0) -> np.ndarray:
+    """Brandes' algorithm from a random sample of source nodes, extrapolated to all nodes.
+    every breadth-first search handles a whole level at once"""
+    size = len(indptr) - 1
+    scores = np.zeros(size)
+    if size == 0:
+        return scores
+    rng = np.random.default_rng(seed)
+    sources = rng.choice(size, size=min(samples, size), replace=False)
+    for source in sources:
+        distances = np.full(size, -1, dtype=np.int64)
+        paths = np.zeros(size)
+        distances[source] = 0
+        paths[source] = 1
+        frontier = np.array([source], dtype=np.int64)
+        levels = []
+        while len(frontier):
+            origins, targets = _expand(indptr, neighbors, frontier)
+            new = distances[targets] == -1
+            distances[targets[new]] = len(levels) + 1
+            # relationships on shortest paths
+            shortest = distances[targets] == len(levels) + 1
+            origins, targets = origins[shortest], targets[shortest]
+            np.add.at(paths, targets, paths[origins])
+            levels.append((origins, targets))
+            frontier = np.unique(targets)
+        dependencies = np.zeros(size)
+        for origins, targets in reversed(levels):
+            np.add.at(dependencies, origins, paths[origins] / paths[targets] * (1 + dependencies[targets]))
+        dependencies[source] = 0
+        scores += dependencies
+    # each path was counted from both ends
+    return scores * size / len(sources) / 2
+
+def compute_centrality(index: GraphIndex) -> dict[str, np.ndarray]:
+    indptr, neighbors = simple_adjacency(index)
+    samples = getattr(settings, "CENTRALITY_BETWEENNESS_SAMPLES", DEFAULT_BETWEENNESS_SAMPLES)
+    return {
+        "degree": np.diff(indptr),
+        "pagerank": pagerank(indptr, neighbors),
+        "betweenness": betweenness(indptr, neighbors, samples),
+    }
+
+def save_centrality(index: GraphIndex) -> int:
+    """replace the stored scores with the scores of the index's graph version
+
+    Returns:
+        int: number of nodes with stored scores
+    """
+    scores = compute_centrality(index)
+    rows = [
+        NodeCentrality(
+            node_id=pk,
+            graph_version=index.version,
+            degree=degree,
+            pagerank=rank,
+            betweenness=between,
+        )
+        for pk, degree, rank, between in zip(
+            index.pks,
+            scores["degree"].tolist(),
+            scores["pagerank"].tolist(),
+            scores["betweenness"].tolist(),
+        )
+    ]
+    with transaction.atomic():
+        NodeCentrality.objects.all().delete()
+        NodeCentrality.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+def get_pageranks(node_ids: Iterable[str] | None = None) -> dict[str, float]:
+    """returns the stored PageRank of the nodes or of all nodes. nodes that were added
+    after the scores were computed are missing"""
+    rows = NodeCentrality.objects.all()
+    if node_ids is not None:
+        rows = rows.filter(node_id__in=list(node_ids))
+    return dict(rows.values_list("node_id", "pagerank"))
+
+def get_centrality_version() -> int:
+    """changes whenever the scores are replaced, 0 if there are none. the rows are
+    recreated by save_centrality, so the highest id identifies them"""
+    return NodeCentrality.objects.order_by("-id").values_list("id", flat=True).first() or 0
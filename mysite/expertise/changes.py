@@ -0,0 +1,92 @@
+"""outbox of the changes that were applied to the graph
+
+search indexes, exports and caches can read the changes after the last id they have
+seen instead of polling the whole graph
+"""
+from datetime import datetime
+from typing import Any, Sequence
+
+from expertise.models import GraphChange
+
+MAX_CHANGES_PER_PAGE = 500
+
+# keys of get_person_data that hold lists of primary keys
+RELATIONSHIP_KEYS = (
+    "interests",
+    "institutes",
+    "faculties",
+    "departments",
+    "advisors",
+    "roles",
+    "offered",
+    "wanted",
+)
+
+def record_change(
+        action: str,
+        person_id: str,
+        data: dict[str, str | Sequence[str]],
+        previous_data: dict[str, str | Sequence[str]],
+        user: str = "",
+    ) -> GraphChange:
+    """append a change to the outbox. should be called in the same transaction that
+    deletes the edit submission
+
+    Args:
+        action (str): "edit" or "delete"
+        data (dict): the person's data after the change, empty for deletions
+        previous_data (dict): the person's data before the change, empty for new persons
+    """
+    return GraphChange.objects.create(
+        action=action,
+        person_id=person_id,
+        data=data,
+        previous_data=previous_data,
+        user=user,
+    )
+
+def get_graph_version() -> int:
+    """returns the id of the latest change, it increases with every applied change"""
+    latest = GraphChange.objects.order_by("-id").values_list("id", flat=True).first()
+    return latest or 0
+
+def get_changes(after: int = 0, limit: int = MAX_CHANGES_PER_PAGE) -> list[GraphChange]:
+    """returns up to limit changes with an id greater than the cursor in order"""
+    limit = max(1, min(limit, MAX_CHANGES_PER_PAGE))
+    return list(GraphChange.objects.filter(id__gt=after).order_by("id")[:limit])
+
+def get_change_delta(change: GraphChange) -> dict[str, dict[str, list[str]]]:
+    """returns the added and removed primary keys for every relationship key"""
+    delta = {}
+    for key in RELATIONSHIP_KEYS:
+        new = set(change.data.get(key, []))
+        old = set(change.previous_data.get(key, []))
+        delta[key] = {
+            "added": sorted(new - old),
+            "removed": sorted(old - new),
+        }
+    return delta
+
+def serialize_change(change: GraphChange) -> dict[str, Any]:
+    return {
+        "id": change.id,
+        "action": change.action,
+        "personId": change.person_id,
+        "data": change.data,
+        "previousData": change.previous_data,
+        "delta": get_change_delta(change),
+        "date": change.creation_date.isoformat(),
+    }
+
+def compact_changes(before: datetime) -> int:
+    """delete the changes that were created before the date
+
+    the latest change is always kept because get_graph_version is its id, without it the
+    version would fall back to 0 and the caches of the current version would look stale
+
+    Returns:
+        int: number of deleted changes
+    """
+    latest = get_graph_version()
+    deleted, _ = GraphChange.objects.filter(creation_date__lt=before, id__lt=latest).delete()
+    return deleted
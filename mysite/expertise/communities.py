@@ -0,0 +1,149 @@
+"""communities of the graph for an overview of the whole network
+
+the communities are found with label propagation on the undirected graph without
+parallel relationships: every node takes the most frequent label of its neighbors until
+no label changes. the overview is the graph with one node per community and the number
+of relationships between two communities as the weight of their relationship
+"""
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from expertise.centrality import simple_adjacency
+from expertise.graph_index import GraphIndex
+from expertise.models import Community, NodeCommunity
+
+MAX_ITERATIONS = 30
+DEFAULT_OVERVIEW_COMMUNITIES = 100
+# number of nodes with the most neighbors in a community that describe it
+TOP_NODES = 5
+
+def propagate_labels(indptr: np.ndarray, neighbors: np.ndarray, seed: int = 0) -> np.ndarray:
+    """returns the community of every node, numbered by decreasing size"""
+    size = len(indptr) - 1
+    rng = np.random.default_rng(seed)
+    # plain lists because the nodes are updated one at a time
+    adjacency = [neighbors[indptr[node]:indptr[node + 1]].tolist() for node in range(size)]
+    labels = list(range(size))
+    for _ in range(MAX_ITERATIONS):
+        changed = False
+        # in random order and one at a time, so the labels don't oscillate
+        for node in rng.permutation(size).tolist():
+            if not adjacency[node]:
+                continue
+            counts = Counter(labels[neighbor] for neighbor in adjacency[node])
+            most = max(counts.values())
+            if counts.get(labels[node]) == most:
+                continue
+            best = sorted(label for label, count in counts.items() if count == most)
+            labels[node] = best[rng.integers(len(best))]
+            changed = True
+        if not changed:
+            break
+    _, communities, sizes = np.unique(np.array(labels, dtype=np.int64), return_inverse=True, return_counts=True)
+    # the largest community first, ties by their first node
+    order = np.lexsort((np.arange(len(sizes)), -sizes))
+    ranks = np.empty_like(order)
+    ranks[order] = np.arange(len(order))
+    return ranks[communities]
+
+def detect_communities(index: GraphIndex) -> dict:
+    """returns the community of every node and the rows of all communities"""
+    indptr, neighbors = simple_adjacency(index)
+    communities = propagate_labels(indptr, neighbors)
+    degrees = np.diff(indptr)
+
+    origins = np.repeat(np.arange(len(index)), degrees)
+    # every relationship once, between different communities
+    between = (origins < neighbors) & (communities[origins] != communities[neighbors])
+    count = communities.max() + 1 if len(communities) else 0
+    first = np.minimum(communities[origins[between]], communities[neighbors[between]])
+    second = np.maximum(communities[origins[between]], communities[neighbors[between]])
+    pairs, weights = np.unique(first * count + second, return_counts=True)
+    links = {community: {} for community in range(count)}
+    for pair, weight in zip(pairs.tolist(), weights.tolist()):
+        links[pair // count][str(pair % count)] = weight
+        links[pair % count][str(pair // count)] = weight
+
+    label_names, label_codes = np.unique(np.array(index.labels, dtype=object), return_inverse=True)
+    # the members of every community with the most neighbors first
+    order = np.lexsort((np.arange(len(index)), -degrees, communities))
+    boundaries = np.cumsum(np.bincount(communities, minlength=count))[:-1]
+    rows = []
+    for community, members in enumerate(np.split(order, boundaries)):
+        top = members[:TOP_NODES].tolist()
+        label_counts = np.bincount(label_codes[members], minlength=len(label_names))
+        rows.append({
+            "community_id": community,
+            "size": len(members),
+            "label_counts": {
+                label: label_count
+                for label, label_count in zip(label_names.tolist(), label_counts.tolist()) if label_count
+            },
+            "top_nodes": [
+                {"pk": index.pks[i], "name": index.names[i], "label": index.labels[i]} for i in top
+            ],
+            "links": links[community],
+        })
+    return {"communities": communities, "rows": rows}
+
+def save_communities(index: GraphIndex) -> int:
+    """replace the stored communities with the communities of the index's graph version
+
+    Returns:
+        int: number of communities
+    """
+    result = detect_communities(index)
+    node_rows = [
+        NodeCommunity(node_id=pk, community_id=community, graph_version=index.version)
+        for pk, community in zip(index.pks, result["communities"].tolist())
+    ]
+    community_rows = [Community(graph_version=index.version, **row) for row in result["rows"]]
+    with transaction.atomic():
+        NodeCommunity.objects.all().delete()
+        Community.objects.all().delete()
+        NodeCommunity.objects.bulk_create(node_rows, batch_size=1000)
+        Community.objects.bulk_create(community_rows, batch_size=500)
+    return len(community_rows)
+
+def get_overview_data() -> dict:
+    """returns the graph of the largest communities in the format of get_graph_data
+
+    the nodes have the label "Community", their name is the name of the member with the
+    most neighbors
+    """
+    max_communities = getattr(settings, "GRAPH_OVERVIEW_COMMUNITIES", DEFAULT_OVERVIEW_COMMUNITIES)
+    communities = list(Community.objects.order_by("community_id")[:max_communities])
+    shown = {community.community_id for community in communities}
+    nodes = []
+    rels = []
+    for community in communities:
+        nodes.append({
+            "id": f"community-{community.community_id}",
+            "properties": {
+                "name": community.top_nodes[0]["name"] if community.top_nodes else "",
+            },
+            "labels": ["Community"],
+            "community": {
+                "size": community.size,
+                "labelCounts": community.label_counts,
+                "topNodes": community.top_nodes,
+            },
+        })
+        for other, weight in community.links.items():
+            # every relationship once
+            if int(other) in shown and int(other) > community.community_id:
+                rels.append({
+                    "startNode": f"community-{community.community_id}",
+                    "endNode": f"community-{other}",
+                    "type": "LINKED",
+                    "weight": weight,
+                })
+    return {
+        "nodes": nodes,
+        "relationships": rels,
+        "version": communities[0].graph_version if communities else None,
+        "total": Community.objects.count(),
+    }
@@ -0,0 +1,125 @@
+"""related topics by how often interests and expertise co-occur on the same persons
+
+the person x topic incidence matrix A comes from the INTERESTED_IN, OFFERS and WANTS
+relationships. the co-occurrence counts are the sparse product A^T A, its diagonal is
+the number of persons per topic. the counts are stored in SQLite and changed by the
+difference of a person's topics when a submission is applied. the cosine normalization
+count / sqrt(count_a * count_b) only needs the stored diagonal, so it is done on request
+"""
+from collections import Counter
+from itertools import product
+from typing import Iterable, Sequence
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F
+from neomodel import db
+
+from expertise.graph_index import GraphIndex
+from expertise.models import TopicCooccurrence
+
+DEFAULT_RELATED_TOPICS = 10
+TOPIC_KEYS = ("interests", "offered", "wanted")
+TOPIC_RELATIONSHIPS = ("INTERESTED_IN", "OFFERS", "WANTS")
+
+def get_topics(data: dict[str, str | Sequence[str]]) -> set[str]:
+    """returns the topics of a person with data in the format of get_person_data"""
+    return {pk for key in TOPIC_KEYS for pk in data.get(key, [])}
+
+def count_pairs(index: GraphIndex) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """returns the nonzero entries of A^T A as rows, columns and counts of the index's
+    node numbers, including the diagonal"""
+    rel_types = np.array(index.rel_types, dtype=object)
+    mask = np.isin(rel_types, TOPIC_RELATIONSHIPS)
+    # offering and wanting the same expertise counts once
+    incidence = np.unique(np.stack([index.rel_starts[mask], index.rel_ends[mask]], axis=1), axis=0)
+    size = len(index)
+    codes = []
+    boundaries = np.flatnonzero(np.diff(incidence[:, 0])) + 1
+    for topics in np.split(incidence[:, 1], boundaries):
+        # every ordered pair of the person's topics, encoded as row * size + column
+        codes.append((topics[:, np.newaxis] * size + topics[np.newaxis, :]).ravel())
+    if not codes:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty
+    pairs, counts = np.unique(np.concatenate(codes), return_counts=True)
+    return pairs // size, pairs % size, counts
+
+def rebuild_cooccurrence(index: GraphIndex) -> int:
+    """replace the stored counts with the counts of the index
+
+    Returns:
+        int: number of stored pairs
+    """
+    rows, columns, counts = count_pairs(index)
+    entries = [
+        TopicCooccurrence(topic_id=index.pks[row], other_id=index.pks[column], count=count)
+        for row, column, count in zip(rows.tolist(), columns.tolist(), counts.tolist())
+    ]
+    with transaction.atomic():
+        TopicCooccurrence.objects.all().delete()
+        TopicCooccurrence.objects.bulk_create(entries, batch_size=2000)
+    return len(entries)
+
+def _pair_counter(topics: Iterable[str]) -> Counter:
+    topics = list(topics)
+    return Counter(product(topics, topics))
+
+def update_cooccurrence(previous_data: dict[str, str | Sequence[str]], data: dict[str, str | Sequence[str]]) -> None:
+    """apply the difference of a person's topics, e.g. after a submission was applied.
+    previous_data or data is empty if the person was created or deleted"""
+    previous_topics = get_topics(previous_data)
+    topics = get_topics(data)
+    delta = _pair_counter(topics)
+    delta.subtract(_pair_counter(previous_topics))
+    changes = {key: change for key, change in delta.items() if change != 0}
+    if not changes:
+        return
+    with transaction.atomic():
+        existing = {
+            (row.topic_id, row.other_id): row
+            for row in TopicCooccurrence.objects.filter(
+                topic_id__in={key[0] for key in changes},
+                other_id__in={key[1] for key in changes},
+            )
+        }
+        updated = []
+        created = []
+        for key, change in changes.items():
+            if key in existing:
+                existing[key].count += change
+                updated.append(existing[key])
+            elif change > 0:
+                created.append(TopicCooccurrence(topic_id=key[0], other_id=key[1], count=change))
+        TopicCooccurrence.objects.bulk_update([row for row in updated if row.count > 0], ["count"], batch_size=500)
+        TopicCooccurrence.objects.filter(pk__in=[row.pk for row in updated if row.count <= 0]).delete()
+        TopicCooccurrence.objects.bulk_create(created, batch_size=500)
+
+def get_related_topics(topic_id: str, k: int = DEFAULT_RELATED_TOPICS) -> list[dict]:
+    """returns the k topics with the highest cosine similarity of their persons"""
+    pairs = dict(TopicCooccurrence.objects.filter(topic_id=topic_id).values_list("other_id", "count"))
+    own_count = pairs.pop(topic_id, 0)
+    if not own_count or not pairs:
+        return []
+    other_counts = dict(TopicCooccurrence.objects
+        .filter(topic_id__in=list(pairs), other_id=F("topic_id"))
+        .values_list("topic_id", "count"))
+    scores = {
+        other_id: count / np.sqrt(own_count * other_counts[other_id])
+        for other_id, count in pairs.items() if other_counts.get(other_id)
+    }
+    top = sorted(scores, key=lambda other_id: (-scores[other_id], other_id))[:k]
+
+    query = "MATCH (n) WHERE n.pk IN $pks RETURN n.pk, n.name, labels(n)[0]"
+    results, _ = db.cypher_query(query, {"pks": top})
+    nodes = {pk: (name, label) for pk, name, label in results}
+    return [
+        {
+            "pk": other_id,
+            "name": nodes[other_id][0],
+            "label": nodes[other_id][1],
+            "score": round(float(scores[other_id]), 3),
+            "count": pairs[other_id],
+        }
+        for other_id in top if other_id in nodes
+    ]
@@ -32,6 +32,21 @@ class MultipleChoiceAndNewField(forms.MultipleChoiceField):
 def get_choices(model_class):
     return [(x.pk, x.name) for x in model_class.nodes.all()]
 
+def get_all_choices() -> dict[str, list[tuple[str, str]]]:
+    """choices of all select fields of EditForm, e.g. to share them between forms"""
+    person_choices = get_choices(Person)
+    expertise_choices = get_choices(Expertise)
+    return {
+        "interests": get_choices(ResearchInterest),
+        "institutes": get_choices(Institute),
+        "faculties": get_choices(Faculty),
+        "departments": get_choices(Department),
+        "advisors": person_choices,
+        "roles": get_choices(Role),
+        "offered": expertise_choices,
+        "wanted": expertise_choices,
+    }
+
 class EditForm(forms.Form):
     """edit form excluding the person"""
     # if a helptext is added to a field, the widget also needs aria-describedby
@@ -101,22 +116,15 @@ class EditForm(forms.Form):
         widget=forms.SelectMultiple(attrs={"class": "form-select expertise"})
     )
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, choices: dict[str, list[tuple[str, str]]] | None = None, **kwargs):
+        """
+        Args:
+            choices (dict | None): the result of get_all_choices, they are queried if
+                they are not given
+        """
         super().__init__(*args, **kwargs)
         # otherwise the form field choices are not updated after the first initialization
-        person_choices = get_choices(Person)
-        interest_choices = get_choices(ResearchInterest)
-        institute_choices = get_choices(Institute)
-        faculty_choices = get_choices(Faculty)
-        department_choices = get_choices(Department)
-        role_choices = get_choices(Role)
-        expertise_choices = get_choices(Expertise)
-
-        self.fields["interests"].choices = interest_choices
-        self.fields["institutes"].choices = institute_choices
-        self.fields["faculties"].choices = faculty_choices
-        self.fields["departments"].choices = department_choices
-        self.fields["advisors"].choices = person_choices
-        self.fields["roles"].choices = role_choices
-        self.fields["offered"].choices = expertise_choices
-        self.fields["wanted"].choices = expertise_choices
\ No newline at end of file
+        if choices is None:
+            choices = get_all_choices()
+        for field_name, field_choices in choices.items():
+            self.fields[field_name].choices = field_choices
@@ -0,0 +1,122 @@
+"""in-memory adjacency index of the whole graph
+
+the index is loaded with two queries that only return scalars and is kept per process
+until the graph version changes or it is older than GRAPH_INDEX_MAX_AGE seconds.
+changes that don't go through the approval (e.g. the admin page) are only picked up
+after that time
+"""
+import time
+from typing import Any, Sequence
+
+import numpy as np
+from django.conf import settings
+
+from expertise import metrics
+from expertise.changes import get_graph_version
+from expertise.graph_store import get_graph_store
+
+DEFAULT_INDEX_MAX_AGE = 600
+
+class GraphIndex:
+    """nodes are numbered 0..n-1 and relationships 0..m-1. the neighbors of node i are
+    neighbors[indptr[i]:indptr[i + 1]], reached with the relationships at the same
+    positions in neighbor_rels. the direction of the relationships is ignored there"""
+
+    def __init__(
+            self,
+            pks: Sequence[str],
+            labels: Sequence[str],
+            names: Sequence[str],
+            rel_starts: Sequence[int],
+            rel_types: Sequence[str],
+            rel_ends: Sequence[int],
+            version: int = 0,
+        ):
+        self.version = version
+        self.created = time.monotonic()
+        # structures that other modules derive from this index, e.g. the incidence
+        # matrices of matching.py, so they are built once per index
+        self.derived: dict[str, Any] = {}
+        self.pks = list(pks)
+        self.labels = list(labels)
+        self.names = list(names)
+        self.index = {pk: i for i, pk in enumerate(self.pks)}
+        self.rel_starts = np.asarray(rel_starts, dtype=np.int64)
+        self.rel_ends = np.asarray(rel_ends, dtype=np.int64)
+        self.rel_types = list(rel_types)
+
+        count = len(self.pks)
+        rel_ids = np.arange(len(self.rel_types), dtype=np.int64)
+        origins = np.concatenate([self.rel_starts, self.rel_ends])
+        order = np.argsort(origins, kind="stable")
+        self.neighbors = np.concatenate([self.rel_ends, self.rel_starts])[order]
+        self.neighbor_rels = np.concatenate([rel_ids, rel_ids])[order]
+        self.indptr = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(origins, minlength=count), out=self.indptr[1:])
+
+    def __len__(self) -> int:
+        return len(self.pks)
+
+    def degrees(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def neighbors_of(self, node: int) -> tuple[np.ndarray, np.ndarray]:
+        """returns the neighbors of the node and the relationships to them"""
+        start, end = self.indptr[node], self.indptr[node + 1]
+        return self.neighbors[start:end], self.neighbor_rels[start:end]
+
+    def nodes_with_label(self, label: str) -> np.ndarray:
+        return np.array([i for i, node_label in enumerate(self.labels) if node_label == label], dtype=np.int64)
+
+    def format_nodes(self, nodes: Sequence[int]) -> list[dict]:
+        """same format as format_nodes_for_graph"""
+        return [{"id": self.pks[i],
+                "properties": {
+                    "name": self.names[i],
+                },
+                "labels": [self.labels[i]]}
+                for i in nodes]
+
+    def format_rels(self, rels: Sequence[int]) -> list[dict]:
+        """same format as format_rels_for_graph"""
+        return [{"startNode": self.pks[self.rel_starts[i]],
+                "endNode": self.pks[self.rel_ends[i]],
+                "type": self.rel_types[i]}
+                for i in rels]
+
+def load_graph_index(version: int = 0) -> GraphIndex:
+    nodes, rels = get_graph_store().index_rows()
+    pks = [row[0] for row in nodes]
+    index = {pk: i for i, pk in enumerate(pks)}
+    rels = [row for row in rels if row[0] in index and row[2] in index]
+    return GraphIndex(
+        pks,
+        [row[1] for row in nodes],
+        [row[2] for row in nodes],
+        [index[row[0]] for row in rels],
+        [row[1] for row in rels],
+        [index[row[2]] for row in rels],
+        version,
+    )
+
+_cached_index: GraphIndex | None = None
+
+def get_graph_index() -> GraphIndex:
+    """returns the index of this process and reloads it if it is outdated"""
+    global _cached_index
+    version = get_graph_version()
+    max_age = getattr(settings, "GRAPH_INDEX_MAX_AGE", DEFAULT_INDEX_MAX_AGE)
+    is_outdated = (
+        _cached_index is None
+        or _cached_index.version != version
+        or time.monotonic() - _cached_index.created > max_age
+    )
+    metrics.count_cache("graph_index", not is_outdated)
+    if is_outdated:
+        _cached_index = load_graph_index(version)
+    return _cached_index
+
+def clear_graph_index() -> None:
+    """forces a reload, e.g. in tests that change Neo4j without the approval"""
+    global _cached_index
+    _cached_index = None
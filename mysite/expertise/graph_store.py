@@ -0,0 +1,264 @@
+"""the graph reads of the search and graph views behind one interface
+
+Neo4jGraphStore runs the Cypher queries, MemoryGraphStore answers the same reads from
+Python dicts, e.g. for fast tests and benchmarks of the views. the store is chosen with
+the GRAPH_STORE setting. the edits still go through neomodel and need Neo4j, the memory
+store has its own methods for creating nodes and relationships
+
+the results have the interface of the neo4j driver's nodes and relationships that the
+views use: nodes have id, labels and get(), relationships id, type and nodes
+"""
+import copy
+import itertools
+from contextlib import contextmanager
+from typing import Any, Iterator, Sequence
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from neomodel import db
+
+from expertise.models import Person
+
+DEFAULT_GRAPH_STORE = "expertise.graph_store.Neo4jGraphStore"
+
+class Neo4jGraphStore:
+    def index_rows(self) -> tuple[list[list[Any]], list[list[Any]]]:
+        """returns the rows (pk, label, name) of all nodes and (start pk, type, end pk) of
+        all relationships for load_graph_index"""
+        node_query = "MATCH (n) WHERE n.pk IS NOT NULL RETURN n.pk, labels(n)[0], n.name"
+        nodes, _ = db.cypher_query(node_query)
+        rel_query = "MATCH (a)-[r]->(b) RETURN a.pk, type(r), b.pk"
+        rels, _ = db.cypher_query(rel_query)
+        return nodes, rels
+
+    def search_persons(self, search_phrases: Sequence[str]) -> list[Any]:
+        """returns the persons whose name or one of their neighbors' names contains every
+        lowercase phrase, all persons if there are no phrases"""
+        if not search_phrases:
+            return Person.nodes.all()
+        # this doesn't search properties of persons and advisors because I think it's not useful
+        query = (
+            "MATCH (p:Person)--(n) "
+            "WITH p, COLLECT(n.name) + p.name AS names "
+            "WHERE ALL(phrase IN $searchPhrases WHERE ANY(name IN names WHERE toLower(name) CONTAINS phrase)) "
+            "RETURN DISTINCT p;"
+        )
+        results, _ = db.cypher_query(query, {"searchPhrases": list(search_phrases)}, resolve_objects=True)
+        return [row[0] for row in results]
+
+    def connected_of(self, persons: Sequence[Any]) -> dict[str, dict[str, list[Any]]]:
+        """Person.all_connected for every person by primary key"""
+        return Person.all_connected_of(persons)
+
+    def neighbor_counts(self, node_id: str) -> dict[str, int]:
+        """returns the number of distinct neighbors per label"""
+        query = (
+            "MATCH (n1)--(n2) "
+            "WHERE n1.pk=$id "
+            "RETURN labels(n2)[0], count(DISTINCT n2)"
+        )
+        results, _ = db.cypher_query(query, {"id": node_id})
+        return {label: count for label, count in results}
+
+    def top_neighbors(self, node_id: str, limit: int, label: str | None = None, offset: int = 0) -> list[list[Any]]:
+        """returns the rows (n1, r, n2) of the neighbors with the highest degree. the primary key
+        breaks ties so that the pages of a label continue the selection of all labels"""
+        query = (
+            "MATCH (n1)--(n2) "
+            "WHERE n1.pk=$id AND ($label IS NULL OR $label IN labels(n2)) "
+            "WITH DISTINCT n1, n2 "
+            "WITH n1, n2, size([(n2)--() | 1]) AS degree "
+            "ORDER BY degree DESC, n2.pk "
+            "SKIP $offset LIMIT $limit "
+            "MATCH (n1)-[r]-(n2) "
+            "RETURN n1, r, n2"
+        )
+        params = {"id": node_id, "label": label, "offset": offset, "limit": limit}
+        results, _ = db.cypher_query(query, params)
+        return results
+
+    def relationship_rows(self, node_ids: Sequence[str], limit: int) -> list[list[Any]]:
+        """returns up to limit rows (n1, r, n2) of the relationships of the nodes"""
+        query = (
+            "MATCH (n1)-[r]-(n2) "
+            "WHERE n1.pk IN $ids "
+            "RETURN n1, r, n2 "
+            "LIMIT $limit"
+        )
+        results, _ = db.cypher_query(query, {"ids": list(node_ids), "limit": limit})
+        return results
+
+class MemoryNode:
+    def __init__(self, node_id: int, label: str, properties: dict[str, Any]):
+        self.id = node_id
+        self.labels = frozenset([label])
+        self.properties = properties
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.properties.get(key, default)
+
+    def __getattr__(self, key: str) -> Any:
+        # person.name etc. like the neomodel nodes
+        if key.startswith("_") or key == "properties":
+            raise AttributeError(key)
+        return self.properties.get(key)
+
+class MemoryRelationship:
+    def __init__(self, rel_id: int, start: MemoryNode, rel_type: str, end: MemoryNode):
+        self.id = rel_id
+        self.type = rel_type
+        self.nodes = (start, end)
+
+class MemoryGraphStore:
+    """the reads of Neo4jGraphStore on nodes and relationships in dicts. the order of
+    rows that Neo4j doesn't define is the order of creation"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self) -> None:
+        self.nodes: dict[str, MemoryNode] = {}
+        self.rels: dict[int, MemoryRelationship] = {}
+        # relationship ids of every node by primary key
+        self.node_rels: dict[str, dict[int, None]] = {}
+        self._ids = itertools.count()
+
+    def create_node(self, label: str, **properties: Any) -> MemoryNode:
+        """the properties need a unique "pk" """
+        pk = properties["pk"]
+        if pk in self.nodes:
+            raise ValueError(f"a node with the primary key {pk} already exists")
+        node = MemoryNode(next(self._ids), label, properties)
+        self.nodes[pk] = node
+        self.node_rels[pk] = {}
+        return node
+
+    def delete_node(self, pk: str) -> None:
+        """deletes the node and its relationships"""
+        for rel_id in list(self.node_rels[pk]):
+            self._remove_rel(rel_id)
+        del self.nodes[pk]
+        del self.node_rels[pk]
+
+    def connect(self, start_pk: str, rel_type: str, end_pk: str) -> MemoryRelationship:
+        rel = MemoryRelationship(next(self._ids), self.nodes[start_pk], rel_type, self.nodes[end_pk])
+        self.rels[rel.id] = rel
+        self.node_rels[start_pk][rel.id] = None
+        self.node_rels[end_pk][rel.id] = None
+        return rel
+
+    def disconnect(self, start_pk: str, rel_type: str, end_pk: str) -> None:
+        """deletes the relationships of the type from the start to the end node"""
+        for rel_id in list(self.node_rels[start_pk]):
+            start, end = self.rels[rel_id].nodes
+            if self.rels[rel_id].type == rel_type and start.get("pk") == start_pk and end.get("pk") == end_pk:
+                self._remove_rel(rel_id)
+
+    def _remove_rel(self, rel_id: int) -> None:
+        rel = self.rels.pop(rel_id)
+        for node in rel.nodes:
+            self.node_rels[node.get("pk")].pop(rel_id, None)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """the changes in the block are undone if it raises an exception"""
+        snapshot = copy.deepcopy((self.nodes, self.rels, self.node_rels))
+        try:
+            yield
+        except BaseException:
+            self.nodes, self.rels, self.node_rels = snapshot
+            raise
+
+    def load_graph(self, graph: dict) -> None:
+        """add the nodes and relationships of expertise.synthetic.generate_graph"""
+        for model, rows in graph["nodes"].items():
+            for row in rows:
+                self.create_node(model.__label__, **row)
+        for _, rel_type, _, rows in graph["relationships"]:
+            for start_pk, end_pk in rows:
+                self.connect(start_pk, rel_type, end_pk)
+
+    def _rows_of(self, pk: str) -> Iterator[tuple[MemoryNode, MemoryRelationship, MemoryNode]]:
+        """the rows (n1, r, n2) of the relationships of the node in both directions"""
+        node = self.nodes[pk]
+        for rel_id in self.node_rels[pk]:
+            rel = self.rels[rel_id]
+            start, end = rel.nodes
+            if start is node:
+                yield node, rel, end
+            if end is node:
+                yield node, rel, start
+
+    def index_rows(self) -> tuple[list[list[Any]], list[list[Any]]]:
+        nodes = [[pk, next(iter(node.labels)), node.get("name")] for pk, node in self.nodes.items()]
+        rels = [[rel.nodes[0].get("pk"), rel.type, rel.nodes[1].get("pk")] for rel in self.rels.values()]
+        return nodes, rels
+
+    def search_persons(self, search_phrases: Sequence[str]) -> list[Any]:
+        persons = [node for node in self.nodes.values() if "Person" in node.labels]
+        if not search_phrases:
+            return persons
+        matching = []
+        for person in persons:
+            neighbor_names = [neighbor.get("name") for _, _, neighbor in self._rows_of(person.get("pk"))]
+            if not neighbor_names:
+                continue
+            names = [name.lower() for name in neighbor_names + [person.get("name")] if name is not None]
+            if all(any(phrase in name for name in names) for phrase in search_phrases):
+                matching.append(person)
+        return matching
+
+    def connected_of(self, persons: Sequence[Any]) -> dict[str, dict[str, list[Any]]]:
+        return {
+            person.pk: Person.sort_connected((rel, neighbor) for _, rel, neighbor in self._rows_of(person.pk))
+            for person in persons
+        }
+
+    def _degree(self, pk: str) -> int:
+        """number of relationships, loops count twice like in Cypher"""
+        return sum(1 for _ in self._rows_of(pk))
+
+    def _distinct_neighbors(self, node_id: str) -> dict[str, MemoryNode]:
+        if node_id not in self.nodes:
+            return {}
+        return {neighbor.get("pk"): neighbor for _, _, neighbor in self._rows_of(node_id)}
+
+    def neighbor_counts(self, node_id: str) -> dict[str, int]:
+        counts = {}
+        for neighbor in self._distinct_neighbors(node_id).values():
+            label = next(iter(neighbor.labels))
+            counts[label] = counts.get(label, 0) + 1
+        return counts
+
+    def top_neighbors(self, node_id: str, limit: int, label: str | None = None, offset: int = 0) -> list[list[Any]]:
+        neighbors = [
+            neighbor for neighbor in self._distinct_neighbors(node_id).values()
+            if label is None or label in neighbor.labels
+        ]
+        neighbors.sort(key=lambda node: (-self._degree(node.get("pk")), node.get("pk")))
+        selected = {node.get("pk") for node in neighbors[offset:offset + limit]}
+        return [list(row) for row in self._rows_of(node_id) if row[2].get("pk") in selected]
+
+    def relationship_rows(self, node_ids: Sequence[str], limit: int) -> list[list[Any]]:
+        rows = []
+        for pk in node_ids:
+            if pk not in self.nodes:
+                continue
+            for row in self._rows_of(pk):
+                if len(rows) >= limit:
+                    return rows
+                rows.append(list(row))
+        return rows
+
+_stores: dict[str, Any] = {}
+
+def get_graph_store() -> Neo4jGraphStore | MemoryGraphStore:
+    """returns the store of the GRAPH_STORE setting, one instance per class"""
+    path = getattr(settings, "GRAPH_STORE", DEFAULT_GRAPH_STORE)
+    if path not in _stores:
+        _stores[path] = import_string(path)()
+    return _stores[path]
+
+def clear_graph_stores() -> None:
+    """forget the store instances, e.g. the data of the memory store between tests"""
+    _stores.clear()
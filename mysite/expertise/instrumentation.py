@@ -0,0 +1,91 @@
+"""records the Cypher queries that go through neomodel's db.cypher_query
+
+the neomodel node sets, relationships and cypher methods all use db.cypher_query, so
+wrapping it once covers the queries that they hide. only the hash of the query text is
+kept, the parameters are counted but not stored. the slow queries are also passed to
+slow_queries.py
+"""
+import functools
+import hashlib
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator
+
+from neomodel import db
+
+from expertise import slow_queries
+
+@dataclass
+class QueryRecord:
+    query_hash: str
+    # number of parameters, the items of list parameters are counted individually
+    params_size: int
+    rows: int
+    # seconds
+    duration: float
+    # first line of the query for the logs
+    summary: str
+
+# the lists of the active record_queries blocks
+_recorders: ContextVar[tuple[list[QueryRecord], ...]] = ContextVar("cypher_recorders", default=())
+# path of the current request for the slow query log, set by the middleware
+request_path: ContextVar[str] = ContextVar("cypher_request_path", default="")
+
+@functools.lru_cache(maxsize=1024)
+def hash_query(query: str) -> str:
+    return hashlib.blake2b(query.encode(), digest_size=6).hexdigest()
+
+def get_params_size(params: dict | None) -> int:
+    if not params:
+        return 0
+    return sum(len(value) if isinstance(value, (list, tuple, set)) else 1 for value in params.values())
+
+def _instrumented(cypher_query):
+    @functools.wraps(cypher_query)
+    def wrapper(query, params=None, *args, **kwargs):
+        recorders = _recorders.get()
+        threshold = slow_queries.get_threshold()
+        if not recorders and threshold is None:
+            return cypher_query(query, params, *args, **kwargs)
+        rows = 0
+        start = time.perf_counter()
+        try:
+            results, meta = cypher_query(query, params, *args, **kwargs)
+            rows = len(results)
+        finally:
+            duration = time.perf_counter() - start
+            if recorders:
+                record = QueryRecord(
+                    query_hash=hash_query(query),
+                    params_size=get_params_size(params),
+                    rows=rows,
+                    duration=duration,
+                    summary=query.strip().split("\n")[0][:100],
+                )
+                for recorder in recorders:
+                    recorder.append(record)
+        if threshold is not None and duration >= threshold:
+            slow_queries.record_slow_query(
+                hash_query(query), query, params, get_params_size(params), duration, request_path.get(),
+            )
+        return results, meta
+    wrapper.is_instrumented = True
+    return wrapper
+
+def install() -> None:
+    """wrap db.cypher_query, does nothing if it is already wrapped"""
+    if not getattr(db.cypher_query, "is_instrumented", False):
+        db.cypher_query = _instrumented(db.cypher_query)
+
+@contextmanager
+def record_queries() -> Iterator[list[QueryRecord]]:
+    """collect the queries of the block in the returned list, blocks can be nested"""
+    install()
+    records = []
+    token = _recorders.set(_recorders.get() + (records,))
+    try:
+        yield records
+    finally:
+        _recorders.reset(token)
@@ -0,0 +1,112 @@
+"""server-side force-directed layout for the graph responses
+
+the layouts are cached per node and graph version, so the force simulation only runs
+once per neighborhood instead of in every browser that opens it
+"""
+from typing import Sequence
+import hashlib
+
+import numpy as np
+from django.core.cache import cache
+
+from expertise import metrics
+from expertise.changes import get_graph_version
+
+LAYOUT_WIDTH = 1600
+LAYOUT_HEIGHT = 800
+LAYOUT_ITERATIONS = 120
+# the repulsion is computed for all pairs of nodes and a miss runs in the request, about
+# 0.1 s for 200 nodes, so bigger graphs are left to the client
+LAYOUT_MAX_NODES = 200
+LAYOUT_CACHE_TIMEOUT = 60 * 60 * 24
+
+def compute_layout(
+        node_ids: Sequence[str],
+        edges: Sequence[tuple[str, str]],
+        iterations: int = LAYOUT_ITERATIONS,
+    ) -> dict[str, list[float]]:
+    """Fruchterman-Reingold layout with the forces of all nodes computed at once per iteration
+
+    Args:
+        node_ids (Sequence[str]): the ids are sorted, so the same graph always gets the same layout
+        edges (Sequence[tuple[str, str]]): pairs of node ids, edges with unknown ids are ignored
+
+    Returns:
+        dict[str, list[float]]: x and y coordinate for every node id
+    """
+    node_ids = sorted(set(node_ids))
+    count = len(node_ids)
+    if count == 0:
+        return {}
+    if count == 1:
+        return {node_ids[0]: [LAYOUT_WIDTH / 2, LAYOUT_HEIGHT / 2]}
+
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    pairs = np.array(
+        [(index[start], index[end]) for start, end in edges
+         if start in index and end in index and start != end],
+        dtype=np.intp,
+    ).reshape(-1, 2)
+    sources, targets = pairs[:, 0], pairs[:, 1]
+
+    rng = np.random.default_rng(0)
+    x = rng.random(count)
+    y = rng.random(count)
+    # optimal distance between nodes in the unit square
+    k = np.sqrt(1.0 / count)
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        # repulsion between all pairs as count x count matrices
+        delta_x = x[:, np.newaxis] - x
+        delta_y = y[:, np.newaxis] - y
+        repulsion = k * k / np.maximum(delta_x * delta_x + delta_y * delta_y, 1e-6)
+        displacement_x = (repulsion * delta_x).sum(axis=1)
+        displacement_y = (repulsion * delta_y).sum(axis=1)
+
+        # attraction along the edges
+        edge_x = x[sources] - x[targets]
+        edge_y = y[sources] - y[targets]
+        attraction = np.sqrt(edge_x * edge_x + edge_y * edge_y) / k
+        np.subtract.at(displacement_x, sources, edge_x * attraction)
+        np.add.at(displacement_x, targets, edge_x * attraction)
+        np.subtract.at(displacement_y, sources, edge_y * attraction)
+        np.add.at(displacement_y, targets, edge_y * attraction)
+
+        length = np.maximum(np.hypot(displacement_x, displacement_y), 1e-9)
+        step = np.minimum(length, temperature) / length
+        x += displacement_x * step
+        y += displacement_y * step
+        temperature -= cooling
+
+    # scale to the canvas without distorting and center it
+    x -= x.min()
+    y -= y.min()
+    scale = min(LAYOUT_WIDTH / max(x.max(), 1e-9), LAYOUT_HEIGHT / max(y.max(), 1e-9))
+    x = x * scale + (LAYOUT_WIDTH - x.max() * scale) / 2
+    y = y * scale + (LAYOUT_HEIGHT - y.max() * scale) / 2
+    return {node_id: [round(x_, 1), round(y_, 1)] for node_id, x_, y_ in zip(node_ids, x.tolist(), y.tolist())}
+
+def get_graph_layout(cache_key: str, graph_data: dict) -> dict[str, list[float]] | None:
+    """returns the cached layout of the graph data or computes it
+
+    Args:
+        cache_key (str): identifies the neighborhood, e.g. the node id and the depth
+        graph_data (dict): nodes and relationships as returned by get_graph_data
+
+    Returns:
+        dict[str, list[float]] | None: None if the graph is too big
+    """
+    if len(graph_data["nodes"]) > LAYOUT_MAX_NODES:
+        return None
+    # hashed because the key is based on request parameters
+    key_hash = hashlib.sha1(cache_key.encode()).hexdigest()
+    key = f"graph-layout:{get_graph_version()}:{key_hash}"
+    layout = cache.get(key)
+    metrics.count_cache("graph_layout", layout is not None)
+    if layout is None:
+        node_ids = [node["id"] for node in graph_data["nodes"]]
+        edges = [(rel["startNode"], rel["endNode"]) for rel in graph_data["relationships"]]
+        layout = compute_layout(node_ids, edges)
+        cache.set(key, layout, LAYOUT_CACHE_TIMEOUT)
+    return layout
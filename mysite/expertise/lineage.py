@@ -0,0 +1,153 @@
+"""closure table of the ADVISED_BY relationships for the ancestors and descendants of a person
+
+a row is the number of paths with a length of depth from the descendant to the ancestor.
+adding the relationship from a person to their advisor adds the paths of every ancestor
+of the advisor to every descendant of the person, removing it subtracts them. because
+the number of paths is stored, relationships can be removed without a rebuild. the
+edits reject advisors that would create a cycle, see get_cycle_advisors, because the
+closure can't hold them. such relationships from other sources are not added
+"""
+import logging
+from typing import Sequence
+
+from django.db import transaction
+from django.db.models import Min, Q
+from neomodel import db
+
+from expertise.graph_index import GraphIndex
+from expertise.models import AdvisorClosure
+
+logger = logging.getLogger(__name__)
+
+MAX_LINEAGE_DEPTH = 50
+
+def _ancestors(person_id: str) -> list[tuple[str, int, int]]:
+    """returns (ancestor, depth, paths) including the person itself"""
+    rows = AdvisorClosure.objects.filter(descendant_id=person_id).values_list("ancestor_id", "depth", "paths")
+    return [(person_id, 0, 1)] + list(rows)
+
+def _descendants(person_id: str) -> list[tuple[str, int, int]]:
+    """returns (descendant, depth, paths) including the person itself"""
+    rows = AdvisorClosure.objects.filter(ancestor_id=person_id).values_list("descendant_id", "depth", "paths")
+    return [(person_id, 0, 1)] + list(rows)
+
+def _change_paths(person_id: str, advisor_id: str, sign: int) -> None:
+    changes = {}
+    for ancestor, ancestor_depth, ancestor_paths in _ancestors(advisor_id):
+        for descendant, descendant_depth, descendant_paths in _descendants(person_id):
+            key = (ancestor, descendant, ancestor_depth + descendant_depth + 1)
+            changes[key] = changes.get(key, 0) + sign * ancestor_paths * descendant_paths
+    existing = {
+        (row.ancestor_id, row.descendant_id, row.depth): row
+        for row in AdvisorClosure.objects.filter(
+            ancestor_id__in={key[0] for key in changes},
+            descendant_id__in={key[1] for key in changes},
+        )
+    }
+    updated = []
+    created = []
+    for key, change in changes.items():
+        if key in existing:
+            existing[key].paths += change
+            updated.append(existing[key])
+        elif change > 0:
+            created.append(AdvisorClosure(ancestor_id=key[0], descendant_id=key[1], depth=key[2], paths=change))
+    AdvisorClosure.objects.bulk_update([row for row in updated if row.paths > 0], ["paths"], batch_size=500)
+    AdvisorClosure.objects.filter(pk__in=[row.pk for row in updated if row.paths <= 0]).delete()
+    AdvisorClosure.objects.bulk_create(created, batch_size=500)
+
+def is_advisor(person_id: str, advisor_id: str) -> bool:
+    return AdvisorClosure.objects.filter(ancestor_id=advisor_id, descendant_id=person_id, depth=1).exists()
+
+def get_cycle_advisors(person_id: str, advisor_ids: Sequence[str]) -> list[str]:
+    """returns the advisors that would create a cycle: the person and the persons that
+    the person advised directly or indirectly"""
+    cycle_advisors = set(AdvisorClosure.objects
+        .filter(ancestor_id=person_id, descendant_id__in=list(advisor_ids))
+        .values_list("descendant_id", flat=True))
+    if person_id in advisor_ids:
+        cycle_advisors.add(person_id)
+    return sorted(cycle_advisors)
+
+def add_advisor(person_id: str, advisor_id: str) -> bool:
+    """add the relationship from the person to their advisor
+
+    Returns:
+        bool: False if the relationship was skipped because it would create a cycle or
+            already exists
+    """
+    if person_id == advisor_id or AdvisorClosure.objects.filter(ancestor_id=person_id, descendant_id=advisor_id).exists():
+        logger.warning(f"advisor relationship {person_id} -> {advisor_id} creates a cycle and is not in the closure table")
+        return False
+    if is_advisor(person_id, advisor_id):
+        return False
+    with transaction.atomic():
+        _change_paths(person_id, advisor_id, 1)
+    return True
+
+def remove_advisor(person_id: str, advisor_id: str) -> None:
+    if not is_advisor(person_id, advisor_id):
+        return
+    with transaction.atomic():
+        _change_paths(person_id, advisor_id, -1)
+
+def update_advisors(person_id: str, previous_advisors: Sequence[str], advisors: Sequence[str]) -> None:
+    """apply the changed advisors of a person, e.g. after a submission was applied"""
+    with transaction.atomic():
+        for advisor_id in set(previous_advisors) - set(advisors):
+            remove_advisor(person_id, advisor_id)
+        for advisor_id in set(advisors) - set(previous_advisors):
+            add_advisor(person_id, advisor_id)
+
+def remove_person_lineage(person_id: str) -> None:
+    """remove the relationships to the advisors and the advised persons of a deleted person"""
+    with transaction.atomic():
+        direct = AdvisorClosure.objects.filter(Q(ancestor_id=person_id) | Q(descendant_id=person_id), depth=1)
+        for descendant_id, ancestor_id in direct.values_list("descendant_id", "ancestor_id"):
+            remove_advisor(descendant_id, ancestor_id)
+
+def rebuild_closure(index: GraphIndex) -> int:
+    """replace the closure table with the advisor relationships of the index
+
+    Returns:
+        int: number of rows
+    """
+    with transaction.atomic():
+        AdvisorClosure.objects.all().delete()
+        for rel, rel_type in enumerate(index.rel_types):
+            if rel_type == "ADVISED_BY":
+                add_advisor(index.pks[index.rel_starts[rel]], index.pks[index.rel_ends[rel]])
+        return AdvisorClosure.objects.count()
+
+def get_lineage(person_id: str, max_depth: int) -> dict:
+    """returns the ancestors and descendants up to max_depth with their shortest distance
+    and the advisor relationships between them and the person"""
+    ancestors = dict(AdvisorClosure.objects
+        .filter(descendant_id=person_id, depth__lte=max_depth)
+        .values_list("ancestor_id")
+        .annotate(Min("depth")))
+    descendants = dict(AdvisorClosure.objects
+        .filter(ancestor_id=person_id, depth__lte=max_depth)
+        .values_list("descendant_id")
+        .annotate(Min("depth")))
+    pks = set(ancestors) | set(descendants) | {person_id}
+    edges = AdvisorClosure.objects.filter(depth=1, ancestor_id__in=pks, descendant_id__in=pks)
+
+    query = "MATCH (p:Person) WHERE p.pk IN $pks RETURN p.pk, p.name, p.title"
+    results, _ = db.cypher_query(query, {"pks": list(pks)})
+    persons = {pk: {"pk": pk, "name": name, "title": title} for pk, name, title in results}
+
+    def with_depth(depths: dict[str, int]) -> list[dict]:
+        return sorted(
+            [{**persons[pk], "depth": depth} for pk, depth in depths.items() if pk in persons],
+            key=lambda x: (x["depth"], x["name"]),
+        )
+
+    return {
+        "ancestors": with_depth(ancestors),
+        "descendants": with_depth(descendants),
+        "relationships": [
+            {"startNode": descendant_id, "endNode": ancestor_id, "type": "ADVISED_BY"}
+            for descendant_id, ancestor_id in edges.values_list("descendant_id", "ancestor_id")
+        ],
+    }
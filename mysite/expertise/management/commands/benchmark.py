@@ -0,0 +1,122 @@
+import io
+import json
+import platform
+import subprocess
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from neomodel import db, install_all_labels
+
+from expertise.benchmark import DEFAULT_REPEAT, run_benchmark, run_payload_benchmark
+from expertise.graph_store import DEFAULT_GRAPH_STORE
+from expertise.test_runner import get_test_neo4j_url
+from expertise.synthetic import MAX_PERSONS
+
+MEMORY_GRAPH_STORE = "expertise.graph_store.MemoryGraphStore"
+
+def get_commit() -> str:
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+    return result.stdout.strip()
+
+class Command(BaseCommand):
+    help = (
+        "Time the most used views on synthetic graphs of several sizes and write the "
+        "latency percentiles, Cypher query counts and memory peaks as JSON. Uses a "
+        "temporary Django test database and a Neo4j test database that is cleared."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[1000, 10000],
+            help="numbers of persons of the generated graphs (default: 1000 10000)",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="seed of the generated graphs (default: 0)")
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=DEFAULT_REPEAT,
+            help=f"timed requests per scenario (default: {DEFAULT_REPEAT})",
+        )
+        parser.add_argument(
+            "--submissions",
+            type=int,
+            default=10,
+            help="pending submissions on the approve page (default: 10)",
+        )
+        parser.add_argument(
+            "--neo4j-url",
+            help="bolt URL of the Neo4j database that is cleared and filled, default is the "
+            "database \"test\" like in the tests",
+        )
+        parser.add_argument(
+            "--memory",
+            action="store_true",
+            help="use the in-memory graph store instead of Neo4j, only for the persons and graph API",
+        )
+        parser.add_argument(
+            "--payload",
+            action="store_true",
+            help="only compare the peak memory of the encodings of the persons payload, on the "
+            "in-memory graph store",
+        )
+        parser.add_argument(
+            "--output",
+            default="benchmark.json",
+            help="file for the results (default: benchmark.json)",
+        )
+
+    def handle(self, *args, **options):
+        if any(not 1 <= size <= MAX_PERSONS for size in options["sizes"]):
+            raise CommandError(f"the sizes need to be between 1 and {MAX_PERSONS}")
+        if options["repeat"] < 1:
+            raise CommandError("--repeat needs to be at least 1")
+
+        memory = options["memory"] or options["payload"]
+        store = MEMORY_GRAPH_STORE if memory else getattr(settings, "GRAPH_STORE", DEFAULT_GRAPH_STORE)
+        if not memory:
+            db.set_connection(options["neo4j_url"] or get_test_neo4j_url())
+            install_all_labels(io.StringIO())
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(GRAPH_STORE=store):
+                if options["payload"]:
+                    results = run_payload_benchmark(
+                        options["sizes"], options["seed"], options["repeat"], self.stdout.write,
+                    )
+                else:
+                    results = run_benchmark(
+                        options["sizes"],
+                        options["seed"],
+                        options["repeat"],
+                        options["submissions"],
+                        self.stdout.write,
+                        options["memory"],
+                    )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        data = {
+            "commit": get_commit(),
+            "date": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "seed": options["seed"],
+            "repeat": options["repeat"],
+            "store": store,
+            "results": results,
+        }
+        with open(options["output"], "w") as f:
+            json.dump(data, f, indent=2)
+        self.stdout.write(f"Wrote {len(results)} results to {options['output']}")
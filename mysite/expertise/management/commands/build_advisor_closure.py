@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from expertise.changes import get_graph_version
+from expertise.graph_index import load_graph_index
+from expertise.lineage import rebuild_closure
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the closure table of the advisor relationships. Approved submissions "
+        "update the table, so this is only needed initially and after changes that don't "
+        "go through the approval."
+    )
+
+    def handle(self, *args, **options):
+        count = rebuild_closure(load_graph_index(get_graph_version()))
+        self.stdout.write(f"Saved {count} rows of the advisor closure table")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from expertise.changes import get_graph_version
+from expertise.graph_index import load_graph_index
+from expertise.cooccurrence import rebuild_cooccurrence
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the co-occurrence counts of interests and expertise for the related "
+        "topics. Approved submissions update the counts, so this is only needed initially "
+        "and after changes that don't go through the approval."
+    )
+
+    def handle(self, *args, **options):
+        count = rebuild_cooccurrence(load_graph_index(get_graph_version()))
+        self.stdout.write(f"Saved {count} co-occurrence counts")
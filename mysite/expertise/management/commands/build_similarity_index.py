@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from expertise.changes import get_graph_version
+from expertise.graph_index import load_graph_index
+from expertise.similarity import rebuild_signatures
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the MinHash signatures of all persons for the similar persons. Approved "
+        "submissions update the signatures, so this is only needed initially and after "
+        "changes that don't go through the approval."
+    )
+
+    def handle(self, *args, **options):
+        count = rebuild_signatures(load_graph_index(get_graph_version()))
+        self.stdout.write(f"Saved the signatures of {count} persons")
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from expertise.changes import compact_changes
+
+class Command(BaseCommand):
+    help = "Delete old entries of the graph change outbox. The latest entry is always kept."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=90,
+            help="keep the changes of the last DAYS days (default: 90)",
+        )
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options["days"])
+        deleted = compact_changes(before)
+        self.stdout.write(f"Deleted {deleted} graph changes created before {before:%Y-%m-%d %H:%M}")
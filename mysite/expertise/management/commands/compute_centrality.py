@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from expertise.changes import get_graph_version
+from expertise.graph_index import load_graph_index
+from expertise.centrality import save_centrality
+from expertise.models import NodeCentrality
+
+class Command(BaseCommand):
+    help = (
+        "Compute the degree, PageRank and approximate betweenness of all nodes. Does "
+        "nothing if the stored scores are from the current graph version."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="recompute even if the graph version didn't change",
+        )
+
+    def handle(self, *args, **options):
+        version = get_graph_version()
+        if not options["force"] and NodeCentrality.objects.filter(graph_version=version).exists():
+            self.stdout.write(f"The centrality scores are up to date with graph version {version}")
+            return
+        count = save_centrality(load_graph_index(version))
+        self.stdout.write(f"Saved the centrality scores of {count} nodes for graph version {version}")
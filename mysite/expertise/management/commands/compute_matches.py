@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from expertise.changes import get_graph_version
+from expertise.graph_index import load_graph_index
+from expertise.matching import save_all_matches, DEFAULT_TOP_MATCHES
+from expertise.models import ExpertiseMatches
+
+class Command(BaseCommand):
+    help = (
+        "Precompute the expertise matches of all persons. Does nothing if the stored "
+        "matches are from the current graph version."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="recompute even if the graph version didn't change",
+        )
+
+    def handle(self, *args, **options):
+        version = get_graph_version()
+        if not options["force"] and ExpertiseMatches.objects.filter(graph_version=version).exists():
+            self.stdout.write(f"The matches are up to date with graph version {version}")
+            return
+        count = save_all_matches(load_graph_index(version), DEFAULT_TOP_MATCHES)
+        self.stdout.write(f"Saved the matches of {count} persons for graph version {version}")
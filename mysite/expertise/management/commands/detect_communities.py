@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from expertise.changes import get_graph_version
+from expertise.graph_index import load_graph_index
+from expertise.communities import save_communities
+from expertise.models import Community
+
+class Command(BaseCommand):
+    help = (
+        "Detect the communities of the graph for the overview. Does nothing if the stored "
+        "communities are from the current graph version."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="recompute even if the graph version didn't change",
+        )
+
+    def handle(self, *args, **options):
+        version = get_graph_version()
+        if not options["force"] and Community.objects.filter(graph_version=version).exists():
+            self.stdout.write(f"The communities are up to date with graph version {version}")
+            return
+        count = save_communities(load_graph_index(version))
+        self.stdout.write(f"Saved {count} communities for graph version {version}")
@@ -0,0 +1,60 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from neomodel import db, install_all_labels
+
+from expertise.synthetic import DEFAULT_BATCH_SIZE, MAX_PERSONS, clear_graph, generate_graph, write_graph
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic graph with hubs, advisor chains and alternatives for scale "
+        "tests and benchmarks. The same number of persons and seed always generate the "
+        "same graph. Never use this on the production database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--persons",
+            type=int,
+            default=1000,
+            help=f"number of persons, the other nodes scale with it (default: 1000, at most {MAX_PERSONS})",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="seed of the generator (default: 0)")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"rows per UNWIND query (default: {DEFAULT_BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="delete all nodes first, otherwise the database needs to be empty",
+        )
+
+    def handle(self, *args, **options):
+        persons = options["persons"]
+        if not 1 <= persons <= MAX_PERSONS:
+            raise CommandError(f"--persons needs to be between 1 and {MAX_PERSONS}")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size needs to be at least 1")
+
+        if options["clear"]:
+            clear_graph(options["batch_size"])
+        else:
+            results, _ = db.cypher_query("MATCH (n) RETURN n LIMIT 1")
+            if results:
+                raise CommandError("The database is not empty, use --clear to delete all nodes first")
+        # the relationships are created by matching the unique primary keys
+        install_all_labels(io.StringIO())
+
+        start = time.monotonic()
+        graph = generate_graph(persons, options["seed"])
+        self.stdout.write(f"Generated the graph in {time.monotonic() - start:.1f} s")
+        start = time.monotonic()
+        write_graph(graph, options["batch_size"], lambda message: self.stdout.write(f"Created {message}"))
+        self.stdout.write(
+            f"Wrote the graph in {time.monotonic() - start:.1f} s. Rebuild the derived data, "
+            "e.g. with compute_matches, build_similarity_index and compute_centrality --force"
+        )
@@ -0,0 +1,133 @@
+"""matchmaking between wanted and offered expertise
+
+the OFFERS and WANTS relationships are sparse person x expertise incidence matrices in
+CSR form. the scores of all persons for one person are a sparse matrix-vector product,
+i.e. the persons in the rows of the expertise the person wants or offers are counted
+"""
+import numpy as np
+from django.db import transaction
+
+from expertise.changes import get_graph_version
+from expertise.graph_index import GraphIndex, get_graph_index
+from expertise.models import ExpertiseMatches
+
+DEFAULT_TOP_MATCHES = 10
+
+def _group(keys: np.ndarray, values: np.ndarray, size: int) -> tuple[np.ndarray, np.ndarray]:
+    """returns indptr and the values sorted by key, so the values of key i are
+    values[indptr[i]:indptr[i + 1]]"""
+    order = np.argsort(keys, kind="stable")
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=size), out=indptr[1:])
+    return indptr, values[order]
+
+class ExpertiseIncidence:
+    def __init__(self, index: GraphIndex):
+        self.index = index
+        size = len(index)
+        rel_types = np.array(index.rel_types, dtype=object)
+        self.rows = {}
+        self.columns = {}
+        for rel_type in ("OFFERS", "WANTS"):
+            mask = rel_types == rel_type
+            # a person can't offer the same expertise twice, but the data might contain duplicates
+            pairs = np.unique(np.stack([index.rel_starts[mask], index.rel_ends[mask]], axis=1), axis=0)
+            persons, expertise = pairs[:, 0], pairs[:, 1]
+            # by person and by expertise
+            self.rows[rel_type] = _group(persons, expertise, size)
+            self.columns[rel_type] = _group(expertise, persons, size)
+
+    def _row(self, rel_type: str, person: int) -> np.ndarray:
+        indptr, values = self.rows[rel_type]
+        return values[indptr[person]:indptr[person + 1]]
+
+    def _column(self, rel_type: str, expertise: int) -> np.ndarray:
+        indptr, values = self.columns[rel_type]
+        return values[indptr[expertise]:indptr[expertise + 1]]
+
+    def has_expertise(self, person: int) -> bool:
+        return len(self._row("OFFERS", person)) > 0 or len(self._row("WANTS", person)) > 0
+
+    def rank(self, person: int, own_type: str, other_type: str, k: int) -> list[dict]:
+        """returns the top k persons whose other_type expertise overlaps the person's
+        own_type expertise, e.g. WANTS and OFFERS for persons who offer what the person wants"""
+        own = self._row(own_type, person)
+        if len(own) == 0:
+            return []
+        candidates = np.concatenate([self._column(other_type, expertise) for expertise in own])
+        candidates = candidates[candidates != person]
+        if len(candidates) == 0:
+            return []
+        matches, scores = np.unique(candidates, return_counts=True)
+        # highest score first, ties in the order of the index
+        order = np.lexsort((matches, -scores))[:k]
+        own_set = set(own.tolist())
+        index = self.index
+        results = []
+        for match, score in zip(matches[order].tolist(), scores[order].tolist()):
+            shared = sorted(own_set.intersection(self._row(other_type, match).tolist()))
+            results.append({
+                "person": {"pk": index.pks[match], "name": index.names[match]},
+                "score": score,
+                "expertise": [{"pk": index.pks[i], "name": index.names[i]} for i in shared],
+            })
+        return results
+
+    def matches(self, person: int, k: int = DEFAULT_TOP_MATCHES) -> dict[str, list[dict]]:
+        """
+        Returns:
+            dict[str, list[dict]]: "offering" are the persons who offer what the person
+                wants, "wanting" are the persons who want what the person offers
+        """
+        return {
+            "offering": self.rank(person, "WANTS", "OFFERS", k),
+            "wanting": self.rank(person, "OFFERS", "WANTS", k),
+        }
+
+    def all_matches(self, k: int = DEFAULT_TOP_MATCHES) -> dict[str, dict[str, list[dict]]]:
+        """returns the matches of every person with offered or wanted expertise by primary key"""
+        return {
+            self.index.pks[person]: self.matches(person, k)
+            for person in self.index.nodes_with_label("Person").tolist()
+            if self.has_expertise(person)
+        }
+
+def get_incidence(index: GraphIndex) -> ExpertiseIncidence:
+    """returns the incidence matrices of the index, they are built on the first call"""
+    if "expertise_incidence" not in index.derived:
+        index.derived["expertise_incidence"] = ExpertiseIncidence(index)
+    return index.derived["expertise_incidence"]
+
+def save_all_matches(index: GraphIndex, k: int = DEFAULT_TOP_MATCHES) -> int:
+    """replace the stored matches with the matches of the index's graph version
+
+    Returns:
+        int: number of persons with stored matches
+    """
+    all_matches = ExpertiseIncidence(index).all_matches(k)
+    rows = [
+        ExpertiseMatches(
+            person_id=person_id,
+            graph_version=index.version,
+            offering=matches["offering"],
+            wanting=matches["wanting"],
+        )
+        for person_id, matches in all_matches.items()
+    ]
+    with transaction.atomic():
+        ExpertiseMatches.objects.all().delete()
+        ExpertiseMatches.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+def get_matches(person_id: str, k: int = DEFAULT_TOP_MATCHES) -> dict[str, list[dict]]:
+    """returns the stored matches if they are up to date, otherwise they are computed
+    from the incidence matrices of the graph index, which are only built once per graph
+    version and process"""
+    if k <= DEFAULT_TOP_MATCHES:
+        stored = ExpertiseMatches.objects.filter(person_id=person_id, graph_version=get_graph_version()).first()
+        if stored:
+            return {"offering": stored.offering[:k], "wanting": stored.wanting[:k]}
+    index = get_graph_index()
+    if person_id not in index.index:
+        return {"offering": [], "wanting": []}
+    return get_incidence(index).matches(index.index[person_id], k)
@@ -0,0 +1,156 @@
+"""counters and histograms of all processes in the Prometheus text format, see /metrics
+
+every process adds its observations to a dict and writes them into the SQLite file
+METRICS_DB at most every METRICS_FLUSH_INTERVAL seconds, so the mod_wsgi processes
+share their numbers without a write per request. the file holds the totals of every
+sample since it was created, /metrics flushes the own process and reads the totals
+"""
+import atexit
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Iterable
+
+from django.conf import settings
+
+DEFAULT_FLUSH_INTERVAL = 5
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+# name: (type, help)
+METRICS = {
+    "expertise_request_duration_seconds": ("histogram", "Duration of the requests by view"),
+    "expertise_responses_total": ("counter", "Responses by view and status code"),
+    "expertise_response_size_bytes": ("histogram", "Size of the response bodies by view"),
+    "expertise_cypher_queries_total": ("counter", "Cypher queries by view"),
+    "expertise_cypher_query_duration_seconds": ("histogram", "Duration of the Cypher queries by view"),
+    "expertise_cache_requests_total": ("counter", "Cache lookups by cache and result (hit or miss)"),
+    "expertise_pending_edit_submissions": ("gauge", "Edit submissions that wait for an approval"),
+}
+
+Labels = tuple[tuple[str, str], ...]
+
+_lock = threading.Lock()
+# the values since the last flush by (sample name, labels)
+_pending: dict[tuple[str, Labels], float] = {}
+_last_flush = time.monotonic()
+
+def is_enabled() -> bool:
+    return getattr(settings, "METRICS", True)
+
+def increment(name: str, labels: dict[str, str], value: float = 1) -> None:
+    if not is_enabled():
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _pending[key] = _pending.get(key, 0) + value
+    maybe_flush()
+
+def observe(name: str, labels: dict[str, str], value: float, buckets: Iterable[float]) -> None:
+    """adds the value to the histogram, the buckets are cumulative like in Prometheus"""
+    if not is_enabled():
+        return
+    label_items = tuple(sorted(labels.items()))
+    with _lock:
+        # every bucket is added, also with 0, so that all of them are exported
+        for bound in (*buckets, math.inf):
+            key = (f"{name}_bucket", label_items + (("le", format_value(bound)),))
+            _pending[key] = _pending.get(key, 0) + (value <= bound)
+        for sample, amount in ((f"{name}_sum", value), (f"{name}_count", 1)):
+            _pending[(sample, label_items)] = _pending.get((sample, label_items), 0) + amount
+    maybe_flush()
+
+def count_cache(cache: str, hit: bool) -> None:
+    increment("expertise_cache_requests_total", {"cache": cache, "result": "hit" if hit else "miss"})
+
+def connect() -> sqlite3.Connection:
+    # outside of the checkout by default, all processes of the user share the directory
+    path = getattr(settings, "METRICS_DB", None) or os.path.join(tempfile.gettempdir(), "expertise-metrics.sqlite3")
+    connection = sqlite3.connect(path, timeout=10)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS samples ("
+        "name TEXT NOT NULL, labels TEXT NOT NULL, value REAL NOT NULL, PRIMARY KEY (name, labels))"
+    )
+    return connection
+
+def flush() -> None:
+    """adds the values of this process to the file"""
+    global _last_flush
+    with _lock:
+        pending = list(_pending.items())
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not pending:
+        return
+    connection = connect()
+    try:
+        with connection:
+            connection.executemany(
+                "INSERT INTO samples (name, labels, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value",
+                [(name, format_labels(labels), value) for (name, labels), value in pending],
+            )
+    finally:
+        connection.close()
+
+def maybe_flush() -> None:
+    if time.monotonic() - _last_flush >= getattr(settings, "METRICS_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL):
+        flush()
+
+@atexit.register
+def _flush_at_exit() -> None:
+    try:
+        flush()
+    except sqlite3.Error:
+        pass
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_labels(labels: Labels) -> str:
+    return ",".join(f'{key}="{escape(value)}"' for key, value in labels)
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def get_family(name: str) -> str:
+    for suffix in ("_bucket", "_sum", "_count"):
+        if name.endswith(suffix) and name[:-len(suffix)] in METRICS:
+            return name[:-len(suffix)]
+    return name
+
+def sort_key(row: tuple[str, str, float]) -> tuple:
+    """orders the buckets of a histogram by their bound, the le label is always the last"""
+    name, labels, _ = row
+    if name.endswith("_bucket"):
+        other_labels, _, bound = f",{labels}".rpartition(',le="')
+        return (get_family(name), other_labels.lstrip(","), name, float(bound.rstrip('"')))
+    return (get_family(name), labels, name, 0)
+
+def export(gauges: dict[str, float]) -> str:
+    """returns the totals of all processes and the gauges of this request in the text format"""
+    flush()
+    connection = connect()
+    try:
+        rows = connection.execute("SELECT name, labels, value FROM samples").fetchall()
+    finally:
+        connection.close()
+    rows += [(name, "", value) for name, value in gauges.items()]
+    lines = []
+    family = None
+    for name, labels, value in sorted(rows, key=sort_key):
+        if get_family(name) != family:
+            family = get_family(name)
+            metric_type, help_text = METRICS.get(family, ("untyped", ""))
+            lines.append(f"# HELP {family} {help_text}")
+            lines.append(f"# TYPE {family} {metric_type}")
+        sample = f"{name}{{{labels}}}" if labels else name
+        lines.append(f"{sample} {format_value(value)}")
+    return "\n".join(lines) + "\n"
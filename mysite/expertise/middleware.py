@@ -0,0 +1,129 @@
+import cProfile
+import logging
+import time
+from typing import Iterator
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+
+from expertise import metrics
+from expertise.instrumentation import record_queries, request_path
+from expertise.profiling import format_report, get_profile_data, store_profile
+
+logger = logging.getLogger(__name__)
+
+class CypherTimingMiddleware:
+    """adds the number and the total duration of the request's Cypher queries to the
+    Server-Timing header and logs them at the debug level"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, "CYPHER_INSTRUMENTATION", True):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = request_path.set(request.path)
+        try:
+            with record_queries() as records:
+                response = self.get_response(request)
+        finally:
+            request_path.reset(token)
+        duration = sum(record.duration for record in records) * 1000
+        rows = sum(record.rows for record in records)
+        timing = f'cypher;dur={duration:.1f};desc="{len(records)} queries, {rows} rows"'
+        if response.has_header("Server-Timing"):
+            timing = f"{response['Server-Timing']}, {timing}"
+        response["Server-Timing"] = timing
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"{request.method} {request.path}: {len(records)} Cypher queries, {rows} rows, {duration:.1f} ms")
+            for record in records:
+                logger.debug(
+                    f"  {record.query_hash} {record.duration * 1000:.1f} ms, {record.rows} rows, "
+                    f"{record.params_size} params: {record.summary}"
+                )
+        return response
+
+class ProfilingMiddleware:
+    """runs the request of a staff user under cProfile if it has the query parameter
+    "profile" or the header X-Profile. with "text" (or any other value) the response is
+    replaced by the report, with "prof" by the stats file for pstats or snakeviz. the
+    stats are also written into PROFILE_DIR if it is set"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_PROFILING", True):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = request.GET.get("profile") or request.headers.get("X-Profile")
+        if not mode or not request.user.is_staff:
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # another profiler is active in this thread
+            logger.warning(f"can't profile {request.method} {request.path}, another profiler is active")
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+            # the content of streaming responses is only created while it is sent
+            size = len(b"".join(response.streaming_content)) if response.streaming else len(response.content)
+        finally:
+            profiler.disable()
+
+        data = get_profile_data(profiler)
+        file_name = None
+        if getattr(settings, "PROFILE_DIR", None):
+            file_name = store_profile(data, request.method, request.path)
+        logger.info(f"profiled {request.method} {request.path} for {request.user}, stored as {file_name}")
+        if mode == "prof":
+            profile_response = HttpResponse(data, content_type="application/octet-stream")
+            profile_response["Content-Disposition"] = 'attachment; filename="request.prof"'
+        else:
+            title = f"{request.method} {request.get_full_path()}: status {response.status_code}, {size} bytes"
+            profile_response = HttpResponse(format_report(profiler, title), content_type="text/plain; charset=utf-8")
+        if file_name:
+            profile_response["X-Profile-File"] = file_name
+        return profile_response
+
+class MetricsMiddleware:
+    """collects the duration, status, size and Cypher queries of every request by the
+    name of its view for /metrics"""
+
+    def __init__(self, get_response):
+        if not metrics.is_enabled():
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with record_queries() as records:
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+        # only the names of the URL patterns so that unknown paths don't add labels
+        match = request.resolver_match
+        labels = {"view": (match.url_name or match.view_name) if match else "unknown"}
+        metrics.observe("expertise_request_duration_seconds", labels, duration, metrics.DURATION_BUCKETS)
+        metrics.increment("expertise_responses_total", {**labels, "status": str(response.status_code)})
+        if response.streaming:
+            response.streaming_content = self.count_streaming_size(response.streaming_content, labels)
+        else:
+            metrics.observe("expertise_response_size_bytes", labels, len(response.content), metrics.SIZE_BUCKETS)
+        if records:
+            metrics.increment("expertise_cypher_queries_total", labels, len(records))
+            for record in records:
+                metrics.observe(
+                    "expertise_cypher_query_duration_seconds", labels, record.duration, metrics.QUERY_DURATION_BUCKETS,
+                )
+        return response
+
+    @staticmethod
+    def count_streaming_size(chunks: Iterator[bytes], labels: dict[str, str]) -> Iterator[bytes]:
+        """passes the chunks on and records the size when the last one was sent"""
+        size = 0
+        for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+        metrics.observe("expertise_response_size_bytes", labels, size, metrics.SIZE_BUCKETS)
@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-18 22:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expertise', '0013_editsubmission_action'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GraphChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('edit', 'edit'), ('delete', 'delete')], max_length=30)),
+                ('person_id', models.CharField(max_length=30)),
+                ('data', models.JSONField(default=dict)),
+                ('previous_data', models.JSONField(default=dict)),
+                ('user', models.CharField(default='', max_length=150)),
+                ('creation_date', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2 on 2026-10-18 22:32
+
+from django.db import migrations, models
+import expertise.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expertise', '0014_graphchange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpertiseMatches',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('person_id', models.CharField(max_length=32, unique=True)),
+                ('graph_version', models.BigIntegerField()),
+                ('offering', models.JSONField(default=expertise.models.default_list)),
+                ('wanting', models.JSONField(default=expertise.models.default_list)),
+            ],
+        ),
+    ]
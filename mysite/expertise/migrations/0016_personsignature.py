@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-18 22:34
+
+from django.db import migrations, models
+import expertise.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expertise', '0015_expertisematches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersonSignature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('person_id', models.CharField(max_length=32, unique=True)),
+                ('name', models.CharField(default='', max_length=120)),
+                ('tokens', models.JSONField(default=expertise.models.default_list)),
+                ('signature', models.JSONField(default=expertise.models.default_list)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SignatureBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('person_id', models.CharField(db_index=True, max_length=32)),
+                ('band', models.SmallIntegerField()),
+                ('bucket', models.CharField(max_length=16)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='signatureband',
+            index=models.Index(fields=['band', 'bucket'], name='expertise_s_band_4ddcf3_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-18 22:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expertise', '0016_personsignature'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopicCooccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic_id', models.CharField(max_length=32)),
+                ('other_id', models.CharField(max_length=32)),
+                ('count', models.IntegerField()),
+            ],
+            options={
+                'unique_together': {('topic_id', 'other_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2 on 2026-10-18 22:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expertise', '0017_topiccooccurrence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NodeCentrality',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('node_id', models.CharField(max_length=32, unique=True)),
+                ('graph_version', models.BigIntegerField()),
+                ('degree', models.IntegerField()),
+                ('pagerank', models.FloatField()),
+                ('betweenness', models.FloatField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-18 22:40
+
+from django.db import migrations, models
+import expertise.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expertise', '0018_nodecentrality'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Community',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('community_id', models.IntegerField(unique=True)),
+                ('graph_version', models.BigIntegerField()),
+                ('size', models.IntegerField()),
+                ('label_counts', models.JSONField(default=dict)),
+                ('top_nodes', models.JSONField(default=expertise.models.default_list)),
+                ('links', models.JSONField(default=dict)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='NodeCommunity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('node_id', models.CharField(max_length=32, unique=True)),
+                ('community_id', models.IntegerField(db_index=True)),
+                ('graph_version', models.BigIntegerField()),
+            ],
+        ),
+    ]
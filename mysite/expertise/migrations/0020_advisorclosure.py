@@ -0,0 +1,26 @@
+# Generated by Django 4.2 on 2026-10-18 22:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expertise', '0019_community'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdvisorClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ancestor_id', models.CharField(db_index=True, max_length=32)),
+                ('descendant_id', models.CharField(db_index=True, max_length=32)),
+                ('depth', models.IntegerField()),
+                ('paths', models.BigIntegerField()),
+            ],
+            options={
+                'unique_together': {('ancestor_id', 'descendant_id', 'depth')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-18 23:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expertise', '0020_advisorclosure'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query_hash', models.CharField(max_length=12, unique=True)),
+                ('query', models.TextField()),
+                ('count', models.IntegerField(default=0)),
+                ('max_duration', models.FloatField(default=0)),
+                ('last_duration', models.FloatField(default=0)),
+                ('last_path', models.CharField(blank=True, max_length=200)),
+                ('last_seen', models.DateTimeField(db_index=True)),
+                ('plan', models.JSONField(null=True)),
+                ('profile_date', models.DateTimeField(null=True)),
+            ],
+        ),
+    ]
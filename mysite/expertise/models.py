@@ -1,7 +1,9 @@
+from typing import Iterable, Sequence
+
 from django.db import models
-from neomodel import StringProperty, EmailProperty, RelationshipTo, UniqueIdProperty, ArrayProperty
+from neomodel import StringProperty, EmailProperty, RelationshipTo, UniqueIdProperty, ArrayProperty, db
 from django_neomodel import DjangoNode
-from neo4j.graph import Node
+from neo4j.graph import Node, Relationship
 
 # Neo4j
 
@@ -68,6 +70,23 @@ class Person(DjangoNode):
         Args:
             inflate (bool, optional): if the node should be inflated to a DjangoNode
         """
+        results, _ = self.cypher("MATCH (p:Person)-[r]-(n) WHERE id(p)=$self RETURN r, n")
+        return Person.sort_connected(results, inflate)
+
+    @classmethod
+    def all_connected_of(cls, persons: Sequence["Person"], inflate: bool=False) -> dict[str, dict[str, list[DjangoNode | Node]]]:
+        """all_connected of several persons with one query, by primary key of the person"""
+        connected = {person.pk: [] for person in persons}
+        if connected:
+            query = "MATCH (p:Person)-[r]-(n) WHERE p.pk IN $pks RETURN p.pk, r, n"
+            results, _ = db.cypher_query(query, {"pks": list(connected)})
+            for pk, rel, node in results:
+                connected[pk].append((rel, node))
+        return {pk: cls.sort_connected(rows, inflate) for pk, rows in connected.items()}
+
+    @staticmethod
+    def sort_connected(results: Iterable[tuple[Relationship, Node]], inflate: bool=False) -> dict[str, list[DjangoNode | Node]]:
+        """sorts the relationships and nodes connected to a person, see all_connected"""
         person_data: dict[str, list[DjangoNode | Node]] = {
             "interests": [],
             "institutes": [],
@@ -78,7 +97,6 @@ class Person(DjangoNode):
             "wanted": [],
             "advisors": [],
         }
-        results, _ = self.cypher("MATCH (p:Person)-[r]-(n) WHERE id(p)=$self RETURN r, n")
         for rel, node in results:
             label = list(node.labels)[0]
             # TODO: turn into match?
@@ -169,3 +187,110 @@ class ShareParameters(models.Model):
     parameters = models.CharField(max_length=1000, unique=True)
     creation_date = models.DateTimeField(auto_now_add=True)
     last_used = models.DateTimeField(auto_now=True)
+
+# append-only outbox of the changes that were applied to Neo4j. the implicitly created
+# primary key is increasing and used as the cursor for reading the changes
+class GraphChange(models.Model):
+    action = models.CharField(
+        max_length=30,
+        choices=[
+            ("edit", "edit"),
+            ("delete", "delete")
+        ],
+        null=False,
+    )
+    person_id = models.CharField(max_length=30, null=False)
+    # person data in the format of get_person_data, empty if the person didn't exist
+    data = models.JSONField(null=False, default=dict)
+    previous_data = models.JSONField(null=False, default=dict)
+    user = models.CharField(max_length=150, default="", null=False)
+    creation_date = models.DateTimeField(auto_now_add=True)
+
+# precomputed results of the matchmaking for one graph version, see matching.py
+class ExpertiseMatches(models.Model):
+    person_id = models.CharField(max_length=32, unique=True)
+    graph_version = models.BigIntegerField(null=False)
+    # persons who offer expertise the person wants
+    offering = models.JSONField(null=False, default=default_list)
+    # persons who want expertise the person offers
+    wanting = models.JSONField(null=False, default=default_list)
+
+# MinHash signatures of the persons' neighbor sets for the similar persons, see similarity.py
+class PersonSignature(models.Model):
+    person_id = models.CharField(max_length=32, unique=True)
+    name = models.CharField(max_length=120, default="", null=False)
+    # the neighbor set, used for the exact similarity of the candidates
+    tokens = models.JSONField(null=False, default=default_list)
+    signature = models.JSONField(null=False, default=default_list)
+
+# the LSH index: the hash of every band of every signature
+class SignatureBand(models.Model):
+    person_id = models.CharField(max_length=32, db_index=True)
+    band = models.SmallIntegerField(null=False)
+    bucket = models.CharField(max_length=16, null=False)
+
+    class Meta:
+        indexes = [models.Index(fields=["band", "bucket"])]
+
+# number of persons with both topics (interests or expertise), see cooccurrence.py. the
+# pairs are stored in both orders and topic_id == other_id is the number of persons
+# with the topic
+class TopicCooccurrence(models.Model):
+    topic_id = models.CharField(max_length=32)
+    other_id = models.CharField(max_length=32)
+    count = models.IntegerField(null=False)
+
+    class Meta:
+        unique_together = ("topic_id", "other_id")
+
+# precomputed centrality scores of one graph version, see centrality.py
+class NodeCentrality(models.Model):
+    node_id = models.CharField(max_length=32, unique=True)
+    graph_version = models.BigIntegerField(null=False)
+    degree = models.IntegerField(null=False)
+    pagerank = models.FloatField(null=False)
+    betweenness = models.FloatField(null=False)
+
+# communities of one graph version, see communities.py. the communities are numbered
+# by decreasing size
+class Community(models.Model):
+    community_id = models.IntegerField(unique=True)
+    graph_version = models.BigIntegerField(null=False)
+    size = models.IntegerField(null=False)
+    # number of members per node label
+    label_counts = models.JSONField(null=False, default=dict)
+    # the members with the most neighbors
+    top_nodes = models.JSONField(null=False, default=default_list)
+    # number of relationships to the other communities by their id
+    links = models.JSONField(null=False, default=dict)
+
+class NodeCommunity(models.Model):
+    node_id = models.CharField(max_length=32, unique=True)
+    community_id = models.IntegerField(db_index=True)
+    graph_version = models.BigIntegerField(null=False)
+
+# closure table of the ADVISED_BY relationships, see lineage.py. the number of paths
+# with the length depth from the descendant to the ancestor
+class AdvisorClosure(models.Model):
+    ancestor_id = models.CharField(max_length=32, db_index=True)
+    descendant_id = models.CharField(max_length=32, db_index=True)
+    depth = models.IntegerField(null=False)
+    paths = models.BigIntegerField(null=False)
+
+    class Meta:
+        unique_together = ("ancestor_id", "descendant_id", "depth")
+
+# the Cypher queries that took longer than CYPHER_SLOW_QUERY_MS, see slow_queries.py. one
+# row per query text, the parameters are not stored
+class SlowQuery(models.Model):
+    query_hash = models.CharField(max_length=12, unique=True)
+    query = models.TextField()
+    count = models.IntegerField(null=False, default=0)
+    # milliseconds
+    max_duration = models.FloatField(null=False, default=0)
+    last_duration = models.FloatField(null=False, default=0)
+    last_path = models.CharField(max_length=200, blank=True)
+    last_seen = models.DateTimeField(db_index=True)
+    # summary of the last PROFILE: total db hits, rows and the operators
+    plan = models.JSONField(null=True)
+    profile_date = models.DateTimeField(null=True)
@@ -0,0 +1,118 @@
+"""shortest paths between two nodes of the graph index"""
+import heapq
+
+from expertise.graph_index import GraphIndex
+
+# a path is the list of nodes and the list of relationships between them
+Path = tuple[list[int], list[int]]
+
+def _expand_level(
+        index: GraphIndex,
+        frontier: list[int],
+        parents: dict[int, tuple[int, int, int]],
+        banned_nodes: set[int],
+        banned_edges: set[tuple[int, int]],
+    ) -> list[int]:
+    """expand the frontier by one level and record (parent, relationship, distance)"""
+    next_frontier = []
+    for node in frontier:
+        distance = parents[node][2] + 1
+        neighbors, rels = index.neighbors_of(node)
+        for neighbor, rel in zip(neighbors.tolist(), rels.tolist()):
+            if neighbor in parents or neighbor in banned_nodes:
+                continue
+            if (node, neighbor) in banned_edges or (neighbor, node) in banned_edges:
+                continue
+            parents[neighbor] = (node, rel, distance)
+            next_frontier.append(neighbor)
+    return next_frontier
+
+def _trace(parents: dict[int, tuple[int, int, int]], node: int) -> Path:
+    """returns the path from the root of the search to the node"""
+    nodes = [node]
+    rels = []
+    while parents[node][0] != -1:
+        node, rel, _ = parents[node]
+        nodes.append(node)
+        rels.append(rel)
+    return nodes[::-1], rels[::-1]
+
+def bidirectional_bfs(
+        index: GraphIndex,
+        source: int,
+        target: int,
+        max_length: int,
+        banned_nodes: set[int] | None = None,
+        banned_edges: set[tuple[int, int]] | None = None,
+    ) -> Path | None:
+    """returns a shortest path with at most max_length relationships or None
+
+    the searches from both ends alternately expand the smaller frontier by a whole level.
+    after the first level that meets the other search, the meeting node with the smallest
+    sum of both distances gives a shortest path
+    """
+    if source == target:
+        return [source], []
+    banned_nodes = banned_nodes or set()
+    banned_edges = banned_edges or set()
+    forward = {source: (-1, -1, 0)}
+    backward = {target: (-1, -1, 0)}
+    forward_frontier = [source]
+    backward_frontier = [target]
+    length = 0
+    while forward_frontier and backward_frontier and length < max_length:
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier = _expand_level(index, forward_frontier, forward, banned_nodes, banned_edges)
+            new_nodes, other = forward_frontier, backward
+        else:
+            backward_frontier = _expand_level(index, backward_frontier, backward, banned_nodes, banned_edges)
+            new_nodes, other = backward_frontier, forward
+        length += 1
+
+        meetings = [node for node in new_nodes if node in other]
+        if meetings:
+            meeting = min(meetings, key=lambda node: forward[node][2] + backward[node][2])
+            if forward[meeting][2] + backward[meeting][2] > max_length:
+                return None
+            forward_nodes, forward_rels = _trace(forward, meeting)
+            backward_nodes, backward_rels = _trace(backward, meeting)
+            return forward_nodes + backward_nodes[-2::-1], forward_rels + backward_rels[::-1]
+    return None
+
+def k_shortest_paths(index: GraphIndex, source: int, target: int, k: int, max_length: int) -> list[Path]:
+    """Yen's algorithm with bidirectional_bfs for the spur paths
+
+    paths that only differ in parallel relationships (e.g. OFFERS and WANTS of the same
+    expertise) count as the same path
+    """
+    shortest = bidirectional_bfs(index, source, target, max_length)
+    if shortest is None:
+        return []
+    paths = [shortest]
+    seen = {tuple(shortest[0])}
+    candidates = []
+    while len(paths) < k:
+        previous_nodes, previous_rels = paths[-1]
+        for i in range(len(previous_nodes) - 1):
+            spur = previous_nodes[i]
+            root_nodes = previous_nodes[:i + 1]
+            banned_edges = {
+                (nodes[i], nodes[i + 1]) for nodes, _ in paths
+                if len(nodes) > i + 1 and nodes[:i + 1] == root_nodes
+            }
+            spur_path = bidirectional_bfs(
+                index, spur, target, max_length - i, set(root_nodes[:-1]), banned_edges
+            )
+            if spur_path is None:
+                continue
+            nodes = root_nodes[:-1] + spur_path[0]
+            if tuple(nodes) in seen:
+                continue
+            seen.add(tuple(nodes))
+            rels = previous_rels[:i] + spur_path[1]
+            heapq.heappush(candidates, (len(rels), nodes, rels))
+        if not candidates:
+            break
+        _, nodes, rels = heapq.heappop(candidates)
+        paths.append((nodes, rels))
+    return paths
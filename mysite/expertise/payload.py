@@ -0,0 +1,63 @@
+"""the lean encoding of the persons payload, see LEAN_PERSONS_PAYLOAD
+
+get_all_person_data builds a dict per person and new dicts for every neighbor, which
+JsonResponse then encodes into one string. here every distinct neighbor is encoded once
+and the JSON of the persons is streamed in batches, so at no time all dicts or the whole
+string are in memory. the bytes are the same as of the JsonResponse
+"""
+from typing import Any, Iterator, Sequence
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from expertise.graph_store import get_graph_store
+
+# the keys of Person.sort_connected in their order, the person and the advisors also
+# have their own fields
+ENTITY_LISTS = ("interests", "institutes", "faculties", "departments", "roles", "offered", "wanted")
+# persons per chunk of the response
+BATCH_SIZE = 200
+
+class EntityRefs:
+    """the JSON of every neighbor by primary key, encoded once per response"""
+    __slots__ = ("encoder", "entities", "advisors")
+
+    def __init__(self, encoder: DjangoJSONEncoder):
+        self.encoder = encoder
+        self.entities: dict[str, str] = {}
+        self.advisors: dict[str, str] = {}
+
+    def entity(self, node: Any) -> str:
+        pk = node.get("pk")
+        if pk not in self.entities:
+            self.entities[pk] = self.encoder.encode({"name": node.get("name"), "pk": pk})
+        return self.entities[pk]
+
+    def advisor(self, node: Any) -> str:
+        pk = node.get("pk")
+        if pk not in self.advisors:
+            self.advisors[pk] = self.encoder.encode({"name": node.get("name"), "title": node.get("title"), "pk": pk})
+        return self.advisors[pk]
+
+def encode_person(person: Any, connected: dict[str, list[Any]], refs: EntityRefs) -> str:
+    """the JSON of one entry of get_all_person_data"""
+    parts = [f'"{key}": [{", ".join(refs.entity(node) for node in connected[key])}]' for key in ENTITY_LISTS]
+    parts.append(f'"advisors": [{", ".join(refs.advisor(node) for node in connected["advisors"])}]')
+    person_data = {"name": person.name, "title": person.title, "email": person.email, "pk": person.pk}
+    parts.append(f'"person": {refs.encoder.encode(person_data)}')
+    return "{" + ", ".join(parts) + "}"
+
+def iter_persons_json(persons: Sequence[Any]) -> Iterator[str]:
+    """yields the JSON of {"persons": [...]} for the persons in the given order. the
+    neighbors are queried before the first chunk, so that the query runs in the request
+    like for JsonResponse and not while the response is sent"""
+    connected = get_graph_store().connected_of(persons)
+    refs = EntityRefs(DjangoJSONEncoder())
+
+    def chunks() -> Iterator[str]:
+        yield '{"persons": ['
+        for start in range(0, len(persons), BATCH_SIZE):
+            batch = persons[start:start + BATCH_SIZE]
+            chunk = ", ".join(encode_person(person, connected[person.pk], refs) for person in batch)
+            yield chunk if start == 0 else ", " + chunk
+        yield "]}"
+    return chunks()
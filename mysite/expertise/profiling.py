@@ -0,0 +1,61 @@
+"""cProfile reports of single requests, see ProfilingMiddleware
+
+besides the functions with the highest cumulative time, the report sums up the time of
+the parts that are usually slow: the Cypher queries, the inflation of the neomodel
+nodes, the templates, the forms and the JSON encoding. the parts can overlap, e.g. the
+templates contain the queries of lazy node sets
+"""
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import re
+
+from django.conf import settings
+from django.utils import timezone
+
+DEFAULT_PROFILE_LINES = 40
+# (end of the file name, function name) of the outermost function of every part
+PROFILE_PARTS = {
+    "cypher queries": [("neomodel/util.py", "cypher_query")],
+    "neomodel inflation": [("neomodel/core.py", "inflate")],
+    "templates": [("django/template/backends/django.py", "render")],
+    "forms": [("expertise/forms.py", "__init__"), ("expertise/forms.py", "get_all_choices")],
+    "json encoding": [("json/encoder.py", "encode")],
+}
+
+def get_part_times(stats: pstats.Stats) -> dict[str, tuple[int, float]]:
+    """returns the number of calls and the cumulative seconds of every part"""
+    parts = {}
+    for part, functions in PROFILE_PARTS.items():
+        calls = 0
+        seconds = 0.0
+        for (filename, _, name), (_, primitive_calls, _, cumulative, _) in stats.stats.items():
+            if any(filename.replace(os.sep, "/").endswith(end) and name == function for end, function in functions):
+                calls += primitive_calls
+                seconds += cumulative
+        parts[part] = (calls, seconds)
+    return parts
+
+def format_report(profiler: cProfile.Profile, title: str) -> str:
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    lines = [title, f"total: {stats.total_tt * 1000:.1f} ms", ""]
+    for part, (calls, seconds) in get_part_times(stats).items():
+        lines.append(f"{part:<20} {seconds * 1000:>10.1f} ms {calls:>8} calls")
+    lines.append("")
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(getattr(settings, "PROFILE_LINES", DEFAULT_PROFILE_LINES))
+    return "\n".join(lines) + stats.stream.getvalue()
+
+def get_profile_data(profiler: cProfile.Profile) -> bytes:
+    """the stats in the format of pstats and of the viewers like snakeviz"""
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
+
+def store_profile(data: bytes, method: str, path: str) -> str:
+    """writes the profile into PROFILE_DIR and returns the file name"""
+    slug = re.sub(r"[^a-zA-Z0-9]+", "-", path).strip("-") or "index"
+    name = f"{timezone.now():%Y%m%d-%H%M%S-%f}-{method.lower()}-{slug[:60]}.prof"
+    with open(os.path.join(settings.PROFILE_DIR, name), "wb") as f:
+        f.write(data)
+    return name
@@ -0,0 +1,172 @@
+"""similar persons by the overlap of their interests, expertise, departments and advisors
+
+every person has a MinHash signature of their neighbor set. the signature is split into
+bands and persons with an identical band are candidates, which are then ranked by their
+exact Jaccard similarity. the signatures are stored in SQLite and updated when a
+submission is applied
+"""
+import hashlib
+from typing import Sequence
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+
+from expertise.graph_index import GraphIndex
+from expertise.models import PersonSignature, SignatureBand
+
+NUM_PERMUTATIONS = 64
+ROWS_PER_BAND = 2
+# persons with a similarity of about (1 / bands) ** (1 / rows) = 0.18 are candidates with
+# a probability of 50 %, with a similarity of 0.3 with 95 %
+NUM_BANDS = NUM_PERMUTATIONS // ROWS_PER_BAND
+DEFAULT_SIMILAR_PERSONS = 10
+# prime larger than the 32 bit token hashes, so a * hash + b fits into 64 bits
+_PRIME = np.uint64(4294967311)
+_rng = np.random.default_rng(1)
+_A = _rng.integers(1, 2**32, size=NUM_PERMUTATIONS, dtype=np.uint64)
+_B = _rng.integers(0, 2**32, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+# keys of get_person_data that are compared and the prefix of their tokens. offered and
+# wanted expertise count as the same
+TOKEN_PREFIXES = {
+    "interests": "interest",
+    "offered": "expertise",
+    "wanted": "expertise",
+    "departments": "department",
+    "advisors": "advisor",
+}
+
+def get_tokens(data: dict[str, str | Sequence[str]]) -> list[str]:
+    """returns the neighbor set of a person with data in the format of get_person_data"""
+    tokens = {f"{prefix}:{pk}" for key, prefix in TOKEN_PREFIXES.items() for pk in data.get(key, [])}
+    return sorted(tokens)
+
+def get_signature(tokens: Sequence[str]) -> np.ndarray:
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(token.encode(), digest_size=4).digest(), "little") for token in tokens],
+        dtype=np.uint64,
+    )
+    # one row per permutation, the minimum over the tokens
+    return ((np.outer(_A, hashes) + _B[:, np.newaxis]) % _PRIME).min(axis=1)
+
+def get_buckets(signature: np.ndarray) -> list[str]:
+    """returns the hash of every band of the signature"""
+    return [
+        hashlib.blake2b(band.tobytes(), digest_size=8).hexdigest()
+        for band in signature.reshape(NUM_BANDS, ROWS_PER_BAND)
+    ]
+
+def jaccard(tokens1: Sequence[str], tokens2: Sequence[str]) -> float:
+    set1 = set(tokens1)
+    set2 = set(tokens2)
+    if not set1 and not set2:
+        return 0.0
+    return len(set1 & set2) / len(set1 | set2)
+
+def _create_signature_rows(person_id: str, name: str, tokens: list[str]) -> tuple[PersonSignature, list[SignatureBand]]:
+    signature = get_signature(tokens)
+    row = PersonSignature(person_id=person_id, name=name, tokens=tokens, signature=signature.tolist())
+    bands = [
+        SignatureBand(person_id=person_id, band=band, bucket=bucket)
+        for band, bucket in enumerate(get_buckets(signature))
+    ]
+    return row, bands
+
+def update_person_signature(person_id: str, name: str, data: dict[str, str | Sequence[str]]) -> None:
+    """replace the signature of the person, e.g. after a submission was applied"""
+    with transaction.atomic():
+        remove_person_signature(person_id)
+        tokens = get_tokens(data)
+        if not tokens:
+            return
+        row, bands = _create_signature_rows(person_id, name, tokens)
+        row.save()
+        SignatureBand.objects.bulk_create(bands)
+
+def remove_person_signature(person_id: str) -> None:
+    PersonSignature.objects.filter(person_id=person_id).delete()
+    SignatureBand.objects.filter(person_id=person_id).delete()
+
+def get_person_data_from_index(index: GraphIndex, person: int) -> dict[str, list[str]]:
+    """returns the relationship keys of get_person_data from the graph index"""
+    data = {key: [] for key in TOKEN_PREFIXES}
+    neighbors, rels = index.neighbors_of(person)
+    for neighbor, rel in zip(neighbors.tolist(), rels.tolist()):
+        rel_type = index.rel_types[rel]
+        pk = index.pks[neighbor]
+        if rel_type == "INTERESTED_IN":
+            data["interests"].append(pk)
+        elif rel_type == "OFFERS":
+            data["offered"].append(pk)
+        elif rel_type == "WANTS":
+            data["wanted"].append(pk)
+        elif rel_type == "MEMBER_OF" and index.labels[neighbor] == "Department":
+            data["departments"].append(pk)
+        # ignore the persons the person advises
+        elif rel_type == "ADVISED_BY" and index.rel_starts[rel] == person:
+            data["advisors"].append(pk)
+    return data
+
+def rebuild_signatures(index: GraphIndex) -> int:
+    """replace all signatures with the signatures of the persons in the index
+
+    Returns:
+        int: number of persons with a signature
+    """
+    rows = []
+    bands = []
+    for person in index.nodes_with_label("Person").tolist():
+        tokens = get_tokens(get_person_data_from_index(index, person))
+        if not tokens:
+            continue
+        row, person_bands = _create_signature_rows(index.pks[person], index.names[person], tokens)
+        rows.append(row)
+        bands += person_bands
+    with transaction.atomic():
+        PersonSignature.objects.all().delete()
+        SignatureBand.objects.all().delete()
+        PersonSignature.objects.bulk_create(rows, batch_size=500)
+        SignatureBand.objects.bulk_create(bands, batch_size=2000)
+    return len(rows)
+
+def get_similar_persons(
+        person_id: str,
+        tokens: Sequence[str] | None = None,
+        k: int = DEFAULT_SIMILAR_PERSONS,
+    ) -> list[dict]:
+    """returns the k most similar persons with a similarity greater than 0
+
+    Args:
+        tokens (Sequence[str] | None): the tokens of the person if they don't have a
+            stored signature
+    """
+    stored = PersonSignature.objects.filter(person_id=person_id).first()
+    if stored:
+        tokens = stored.tokens
+        signature = np.array(stored.signature, dtype=np.uint64)
+    elif tokens:
+        signature = get_signature(tokens)
+    else:
+        return []
+
+    condition = Q()
+    for band, bucket in enumerate(get_buckets(signature)):
+        condition |= Q(band=band, bucket=bucket)
+    candidate_ids = (SignatureBand.objects
+        .filter(condition)
+        .exclude(person_id=person_id)
+        .values_list("person_id", flat=True)
+        .distinct())
+    candidates = PersonSignature.objects.filter(person_id__in=list(candidate_ids))
+
+    similar = []
+    for candidate in candidates:
+        similarity = jaccard(tokens, candidate.tokens)
+        if similarity > 0:
+            similar.append({
+                "person": {"pk": candidate.person_id, "name": candidate.name},
+                "similarity": round(similarity, 3),
+            })
+    similar.sort(key=lambda x: (-x["similarity"], x["person"]["name"]))
+    return similar[:k]
@@ -0,0 +1,160 @@
+"""log of the Cypher queries that take longer than CYPHER_SLOW_QUERY_MS
+
+every slow query is logged as JSON and counted in SlowQuery, one row per query text. a
+sample of them (CYPHER_SLOW_QUERY_SAMPLE_RATE) is run again with PROFILE in a read
+transaction, at most once per query text in CYPHER_PROFILE_INTERVAL seconds and never if
+the query writes. in a request the profiles only run after the response was sent, when
+request_finished is sent. the summary of the plan is logged and stored with the query
+for the staff page. the parameters are only kept in memory until then
+"""
+import json
+import logging
+import random
+import re
+import threading
+from datetime import timedelta
+from typing import Any
+
+import neo4j
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from neomodel import db
+
+from expertise.models import SlowQuery
+
+logger = logging.getLogger(__name__)
+
+# the queries (hash, text, parameters) that this thread's request sampled for a profile
+_local = threading.local()
+
+DEFAULT_SLOW_QUERY_MS = 500
+DEFAULT_SAMPLE_RATE = 0.1
+DEFAULT_PROFILE_INTERVAL = 600
+# operators of the plan that are stored, in the order of the plan from the result
+MAX_OPERATORS = 30
+MAX_DETAILS_LENGTH = 200
+MAX_QUERY_LENGTH = 4000
+# CALL because procedures can write
+WRITE_CLAUSES = re.compile(r"\b(CREATE|MERGE|SET|DELETE|REMOVE|DROP|CALL|LOAD\s+CSV|FOREACH)\b", re.IGNORECASE)
+
+def get_threshold() -> float | None:
+    """returns the threshold in seconds, None if CYPHER_SLOW_QUERY_MS is None"""
+    milliseconds = getattr(settings, "CYPHER_SLOW_QUERY_MS", DEFAULT_SLOW_QUERY_MS)
+    return None if milliseconds is None else milliseconds / 1000
+
+def is_read_only(query: str) -> bool:
+    return not WRITE_CLAUSES.search(query)
+
+def summarize_plan(plan: dict[str, Any]) -> dict[str, Any]:
+    """returns the total db hits, the rows of the result and the operators of the profiled
+    plan with their rows, db hits and details"""
+    operators = []
+    db_hits = 0
+    stack = [(plan, 0)]
+    while stack:
+        operator, depth = stack.pop()
+        db_hits += operator.get("dbHits", 0)
+        if len(operators) < MAX_OPERATORS:
+            operators.append({
+                "operator": operator.get("operatorType", "").split("@")[0],
+                "depth": depth,
+                "rows": operator.get("rows", 0),
+                "db_hits": operator.get("dbHits", 0),
+                "details": str(operator.get("args", {}).get("Details", ""))[:MAX_DETAILS_LENGTH],
+            })
+        stack.extend((child, depth + 1) for child in reversed(operator.get("children", [])))
+    return {"db_hits": db_hits, "rows": plan.get("rows", 0), "operators": operators}
+
+def profile_query(query: str, params: dict | None) -> dict[str, Any]:
+    """runs the query with PROFILE in a read transaction of its own session and returns
+    the summary of the plan"""
+    def work(tx):
+        return tx.run("PROFILE " + query, params or {}).consume().profile
+
+    with db.driver.session(database=db._database_name, default_access_mode=neo4j.READ_ACCESS) as session:
+        plan = session.read_transaction(work)
+    return summarize_plan(plan)
+
+def should_profile(slow_query: SlowQuery, query: str) -> bool:
+    if not is_read_only(query):
+        return False
+    interval = timedelta(seconds=getattr(settings, "CYPHER_PROFILE_INTERVAL", DEFAULT_PROFILE_INTERVAL))
+    if slow_query.profile_date and timezone.now() - slow_query.profile_date < interval:
+        return False
+    return random.random() < getattr(settings, "CYPHER_SLOW_QUERY_SAMPLE_RATE", DEFAULT_SAMPLE_RATE)
+
+def record_slow_query(
+        query_hash: str,
+        query: str,
+        params: dict | None,
+        params_size: int,
+        duration: float,
+        path: str,
+    ) -> None:
+    """logs the slow query, counts it and profiles it if it is sampled, in a request only
+    after the response was sent. the errors are only logged because the query itself
+    succeeded"""
+    milliseconds = round(duration * 1000, 1)
+    entry = {
+        "event": "slow_cypher_query",
+        "query_hash": query_hash,
+        "duration_ms": milliseconds,
+        "params_size": params_size,
+        "path": path,
+    }
+    logger.warning(json.dumps(entry))
+    try:
+        # a savepoint, so that an error doesn't break e.g. the atomic block of an approval
+        with transaction.atomic():
+            now = timezone.now()
+            slow_query, _ = SlowQuery.objects.get_or_create(
+                query_hash=query_hash,
+                defaults={"query": query[:MAX_QUERY_LENGTH], "last_seen": now},
+            )
+            SlowQuery.objects.filter(pk=slow_query.pk).update(
+                count=F("count") + 1,
+                last_duration=milliseconds,
+                last_path=path[:200],
+                last_seen=now,
+            )
+            if milliseconds > slow_query.max_duration:
+                SlowQuery.objects.filter(pk=slow_query.pk, max_duration__lt=milliseconds).update(max_duration=milliseconds)
+            sampled = should_profile(slow_query, query)
+            if sampled:
+                # mark it first so that the other processes don't profile it at the same time
+                SlowQuery.objects.filter(pk=slow_query.pk).update(profile_date=now)
+    except Exception as e:
+        logger.exception(f"recording the slow Cypher query {query_hash} failed: {e}")
+        return
+    if not sampled:
+        return
+    if path:
+        if not hasattr(_local, "pending"):
+            _local.pending = []
+        _local.pending.append((query_hash, query, params))
+    else:
+        run_profile(query_hash, query, params)
+
+def run_profile(query_hash: str, query: str, params: dict | None) -> None:
+    try:
+        plan = profile_query(query, params)
+        with transaction.atomic():
+            SlowQuery.objects.filter(query_hash=query_hash).update(plan=plan)
+    except Exception as e:
+        logger.exception(f"profiling the slow Cypher query {query_hash} failed: {e}")
+        return
+    logger.warning(json.dumps({"event": "cypher_query_profile", "query_hash": query_hash, "plan": plan}))
+
+def run_pending_profiles(**kwargs) -> None:
+    """profiles the queries that the finished request sampled"""
+    pending = getattr(_local, "pending", None)
+    if not pending:
+        return
+    _local.pending = []
+    for query_hash, query, params in pending:
+        run_profile(query_hash, query, params)
+
+request_finished.connect(run_pending_profiles, dispatch_uid="expertise.slow_queries.run_pending_profiles")
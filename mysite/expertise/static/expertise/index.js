@@ -340,6 +340,8 @@ function updateAlert(searchedLength, filteredLength) {
 function convertToGraphData(apiData) {
     apiData.nodes = apiData.nodes.map((node) => {
         node.label = node.properties.name;
+        // undefined if the scores weren't computed yet
+        node.pagerank = node.properties.pagerank;
         delete node.properties;
         return node;
     });
@@ -361,6 +363,9 @@ function convertToGraphData(apiData) {
             case "HAS":
                 rel.label = "IS";
                 break;
+            case "MORE":
+                rel.label = "";
+                break;
             default:
                 rel.label = rel.type;
                 break;
@@ -398,8 +403,46 @@ function getWordWrapPattern(maxLength) {
     return new RegExp(`(?![^\n]{1,${maxLength}}$)([^\n]{1,${maxLength}})\\s`, "g");
 }
 
+/**
+ * set the coordinates that were computed by the server
+ * @param {Array} nodes
+ * @param {Object} layout node ids mapped to [x, y]
+ */
+function applyLayout(nodes, layout) {
+    if (!layout) {
+        return;
+    }
+    nodes.forEach((node) => {
+        if (layout[node.id]) {
+            [node.x, node.y] = layout[node.id];
+        }
+    });
+}
+
+/**
+ * @param {Array} nodes
+ * @returns {boolean} whether every node has coordinates
+ */
+function hasPositions(nodes) {
+    return nodes.every((node) => node.x !== undefined && node.y !== undefined);
+}
+
+/**
+ * let the client lay out the graph from now on, e.g. because the server sent nodes
+ * without coordinates for a neighborhood that was too big
+ * @param {Object} graph
+ */
+function useForceLayout(graph) {
+    if (!graph.get("usePresetLayout")) {
+        return;
+    }
+    graph.set("usePresetLayout", false);
+    graph.updateLayout(FORCE_LAYOUT);
+}
+
 function prepareGraphData(apiData) {
     const data = convertToGraphData(apiData);
+    applyLayout(data.nodes, data.layout);
     const colors = getColors();
     const breakStringAt = 22;
     const regexPattern = getWordWrapPattern(breakStringAt);
@@ -441,6 +484,11 @@ function prepareGraphData(apiData) {
                 node.style.fill = colors.expertise;
                 node.stateStyles.active.fill = colors.expertise;
                 break;
+            case "Aggregate":
+                // placeholder for the neighbors of a hub node that are not shown
+                node.style.lineDash = [4, 4];
+                node.style.cursor = "pointer";
+                break;
             default:
                 console.warn(`The node label '${label}' was not recognized. Default styles applied.`);
         }
@@ -463,6 +511,8 @@ function drawG6Graph(apiData, containerId, container){
     // change this value instead of directly editing renderer and fitView properties
     const useCanvas = true;
     const height = 800;
+    // the server already computed the node positions
+    const usePresetLayout = Boolean(data.layout) && hasPositions(data.nodes);
     const graph = new G6.Graph({
         container: containerId,
         width: 1600, // initial value
@@ -490,13 +540,7 @@ function drawG6Graph(apiData, containerId, container){
             },
         },
         renderer: useCanvas ? "canvas" : "svg",
-        layout: {
-            type: "force2",
-            animate: false,
-            linkDistance: 280,
-            maxSpeed: 1300,
-            preventOverlap: true,
-        },
+        layout: usePresetLayout ? undefined : FORCE_LAYOUT,
         // is the animation configuration bugged?
         // animateCfg: {
         //     duration: 1,
@@ -509,12 +553,27 @@ function drawG6Graph(apiData, containerId, container){
         fitView: false,
     });
 
+    // changes to false if later nodes come without coordinates, see useForceLayout
+    graph.set("usePresetLayout", usePresetLayout);
     graph.data(data);
     graph.render();
     setGraphEvents(graph, container, useCanvas, height);
     graphGlobal = graph;
 }
 
+/**
+ * additional size of the more central nodes of the graph
+ * @param {number | undefined} pagerank
+ * @param {number} maxPagerank the highest PageRank of the drawn nodes
+ * @returns {number}
+ */
+function getCentralityPadding(pagerank, maxPagerank) {
+    if (!pagerank || !maxPagerank) {
+        return 0;
+    }
+    return Math.round(MAX_CENTRALITY_PADDING * Math.sqrt(pagerank / maxPagerank));
+}
+
 function handleNodeClick(e) {
     if (e.originalEvent.shiftKey) {
         nodeToggleFilter(e);
@@ -525,6 +584,9 @@ function handleNodeClick(e) {
 
 function setGraphEvents(graph, container, useCanvas, height) {
     graph.on("beforerender", () => {
+        if (graph.get("usePresetLayout")) {
+            return;
+        }
         // turn animation off, else afterrender event and resizing of the nodes happens late
         graph.updateLayout({ animate: false });
     });
@@ -537,6 +599,7 @@ function setGraphEvents(graph, container, useCanvas, height) {
             // wait till svg is actually drawn
             await new Promise((r) => setTimeout(r, 100));
         }
+        const maxPagerank = Math.max(0, ...graph.getNodes().map((node) => node.getModel().pagerank || 0));
         graph.getNodes().forEach((node) => {
             // find the text shape by its name
             const labelShape = node.getContainer().find((el) => el.get("name") === "text-shape");
@@ -545,13 +608,16 @@ function setGraphEvents(graph, container, useCanvas, height) {
             }
             // get the bounding box of the label
             const labelBBox = labelShape.getBBox();
+            const padding = getCentralityPadding(node.getModel().pagerank, maxPagerank);
             graph.updateItem(node, {
-                size: [labelBBox.width + 15, labelBBox.height + 20],
+                size: [labelBBox.width + 15 + padding, labelBBox.height + 20 + padding],
             });
         });
         graph.fitCenter();
-        // animation for dragging nodes
-        graph.updateLayout({ animate: true });
+        if (!graph.get("usePresetLayout")) {
+            // animation for dragging nodes
+            graph.updateLayout({ animate: true });
+        }
     });
 
     graph.on("node:click", handleNodeClick);
@@ -559,10 +625,16 @@ function setGraphEvents(graph, container, useCanvas, height) {
 
     if (useCanvas) {
         graph.on("node:dragstart", function (e) {
+            if (graph.get("usePresetLayout")) {
+                return;
+            }
             graph.layout();
             refreshDraggedNodePosition(e);
         });
         graph.on("node:drag", function (e) {
+            if (graph.get("usePresetLayout")) {
+                return;
+            }
             refreshDraggedNodePosition(e);
             graph.layout();
         });
@@ -626,11 +698,26 @@ function nodeToggleFilter(e) {
 
 function changeGraphData(e) {
     const graph = graphGlobal;
+    if (e.item.getModel().aggregate) {
+        loadMoreNeighbors(e.item.getModel());
+        return;
+    }
     const id = e.item.get("id");
     setGraphId(id);
-    getGraph(id)
+    // the server doesn't send the nodes again that are already drawn
+    const knownIds = graph.getNodes()
+        .map((node) => node.get("id"))
+        .slice(0, MAX_KNOWN_NODES);
+    getGraph(id, knownIds)
         .then((data) => {
+            const retainedIds = new Set(data.graph.knownNodes);
+            const retainedNodes = graph.save().nodes.filter((node) => retainedIds.has(node.id));
             data = prepareGraphData(data.graph);
+            applyLayout(retainedNodes, data.layout);
+            data.nodes = data.nodes.concat(retainedNodes);
+            if (!hasPositions(data.nodes)) {
+                useForceLayout(graph);
+            }
             graph.changeData(data);
             graph.render();
         })
@@ -640,6 +727,44 @@ function changeGraphData(e) {
         });
 }
 
+/**
+ * replace the aggregate node with the next page of the neighbors it summarizes
+ * @param {Object} aggregateModel
+ */
+function loadMoreNeighbors(aggregateModel) {
+    const graph = graphGlobal;
+    const { origin, label, offset } = aggregateModel.aggregate;
+    getNeighborsPage(origin, label, offset)
+        .then((data) => {
+            const pageData = prepareGraphData(data.graph);
+            const current = graph.save();
+            const currentIds = new Set(current.nodes.map((node) => node.id));
+            const nodes = current.nodes
+                .filter((node) => node.id !== aggregateModel.id)
+                .concat(pageData.nodes.filter((node) => !currentIds.has(node.id) || node.aggregate));
+            const edges = current.edges
+                .filter((edge) => edge.target !== aggregateModel.id)
+                .concat(pageData.edges);
+            if (!hasPositions(nodes)) {
+                useForceLayout(graph);
+            }
+            graph.changeData({ nodes: nodes, edges: edges });
+            graph.render();
+        })
+        .catch((error) => {
+            document.querySelector("#graph-container").textContent = error.message;
+        });
+}
+
+async function getNeighborsPage(nodeId, label, offset) {
+    const params = new URLSearchParams({ id: nodeId, label: label, offset: offset });
+    const response = await fetch(`graph/neighbors?${params}`);
+    if (!response.ok) {
+        throw new Error("Request failed");
+    }
+    return response.json();
+}
+
 function showGraph(data) {
     const containerId = "graph-container";
     const container = document.querySelector("#" + containerId);
@@ -655,10 +780,16 @@ function showGraph(data) {
     networkEl.setAttribute("alt", "Network graph");
 }
 
-async function getGraph(nodeId) {
+/**
+ * @param {String} nodeId
+ * @param {Array.<String>} knownIds ids of the nodes that are already drawn
+ */
+async function getGraph(nodeId, knownIds = []) {
     // what happens in case of timeout?
     const path = "graph";
-    const response = await fetch(`${path}?id=${encodeURIComponent(nodeId)}`);
+    const params = new URLSearchParams({ id: nodeId, layout: "1" });
+    knownIds.forEach((knownId) => params.append("known", knownId));
+    const response = await fetch(`${path}?${params}`);
     if (!response.ok) {
         throw new Error("Request failed");
     }
@@ -1231,3 +1362,15 @@ initializeClipboardButtons();
 loadSharedViewFromHtml();
 
 var graphGlobal = null;
+// keeps the graph request URL short enough for the server
+const MAX_KNOWN_NODES = 150;
+// added to the width and height of the node with the highest PageRank
+const MAX_CENTRALITY_PADDING = 40;
+// the client layout if the server didn't send the coordinates of all nodes
+const FORCE_LAYOUT = {
+    type: "force2",
+    animate: false,
+    linkDistance: 280,
+    maxSpeed: 1300,
+    preventOverlap: true,
+};
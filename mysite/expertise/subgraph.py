@@ -0,0 +1,130 @@
+"""induced subgraph of the persons that match a search, computed from the graph index
+
+the search phrases work like get_filtered_data and the filters like the filters of the
+search page: filters of different categories are combined with AND, filters of the
+same category with OR and persons/advisors and offered/wanted expertise count as one
+category each
+"""
+from typing import Sequence
+
+import numpy as np
+from django.conf import settings
+
+from expertise.graph_index import GraphIndex
+
+DEFAULT_SUBGRAPH_MAX_NODES = 300
+# prefixes of the filter values, see formatted_node_pk. the filters of the persons are
+# the persons themselves
+FILTER_RELATIONSHIPS = {
+    "pers": None,
+    "advi": "ADVISED_BY",
+    "inte": "INTERESTED_IN",
+    "inst": "MEMBER_OF",
+    "facu": "MEMBER_OF",
+    "depa": "MEMBER_OF",
+    "role": "HAS",
+    "offe": "OFFERS",
+    "want": "WANTS",
+}
+FILTER_CATEGORIES = (("pers", "advi"), ("inte",), ("inst",), ("facu",), ("depa",), ("role",), ("offe", "want"))
+
+def parse_filters(filters: Sequence[str]) -> dict[str, list[str]]:
+    """returns the primary keys by prefix
+
+    Raises:
+        ValueError: if a filter doesn't have a known prefix
+    """
+    parsed = {}
+    for value in filters:
+        prefix, _, pk = value.partition("-")
+        if prefix not in FILTER_RELATIONSHIPS or not pk:
+            raise ValueError(value)
+        parsed.setdefault(prefix, []).append(pk)
+    return parsed
+
+def match_search(index: GraphIndex, persons: np.ndarray, search_phrases: Sequence[str]) -> np.ndarray:
+    """returns the persons whose name or one of their neighbors' names contains every phrase"""
+    search_phrases = [x.lower() for x in search_phrases if x != ""]
+    if not search_phrases:
+        return persons
+    degrees = index.degrees()
+    origins = np.repeat(np.arange(len(index)), degrees)
+    names = [(name or "").lower() for name in index.names]
+    # persons without neighbors can't be found, like in get_filtered_data
+    matching = degrees[persons] > 0
+    for phrase in search_phrases:
+        hits = np.array([phrase in name for name in names], dtype=bool)
+        neighbor_hits = np.bincount(origins, weights=hits[index.neighbors], minlength=len(index))
+        matching &= hits[persons] | (neighbor_hits[persons] > 0)
+    return persons[matching]
+
+def match_filters(index: GraphIndex, persons: np.ndarray, filters: dict[str, list[str]]) -> np.ndarray:
+    rel_types = np.array(index.rel_types, dtype=object)
+    matching = np.ones(len(persons), dtype=bool)
+    for category in FILTER_CATEGORIES:
+        if not any(prefix in filters for prefix in category):
+            continue
+        found = np.zeros(len(index), dtype=bool)
+        for prefix in category:
+            targets = [index.index[pk] for pk in filters.get(prefix, []) if pk in index.index]
+            if FILTER_RELATIONSHIPS[prefix] is None:
+                found[targets] = True
+            else:
+                rels = (rel_types == FILTER_RELATIONSHIPS[prefix]) & np.isin(index.rel_ends, targets)
+                found[index.rel_starts[rels]] = True
+        matching &= found[persons]
+    return persons[matching]
+
+def get_subgraph_data(
+        index: GraphIndex,
+        search_phrases: Sequence[str] = (),
+        filters: dict[str, list[str]] | None = None,
+    ) -> dict:
+    """returns the matching persons and the entities that at least two of them share (all
+    entities if only one person matches) in the format of get_graph_data
+
+    at most GRAPH_SUBGRAPH_MAX_NODES nodes are returned: the persons with the most shared
+    entities and the entities shared by the most persons. the number of matching persons
+    of an entity is its "matches" property, so the relationships to the persons that are
+    not shown are still counted. "hidden" is the number of nodes that were left out by label
+    """
+    max_nodes = getattr(settings, "GRAPH_SUBGRAPH_MAX_NODES", DEFAULT_SUBGRAPH_MAX_NODES)
+    persons = index.nodes_with_label("Person")
+    persons = match_search(index, persons, search_phrases)
+    persons = match_filters(index, persons, filters or {})
+    size = len(index)
+    is_matched = np.zeros(size, dtype=bool)
+    is_matched[persons] = True
+
+    # relationships from the matched persons to the nodes that are not matched persons
+    outgoing = is_matched[index.rel_starts] & ~is_matched[index.rel_ends]
+    pairs = np.unique(np.stack([index.rel_starts[outgoing], index.rel_ends[outgoing]], axis=1), axis=0)
+    shares = np.bincount(pairs[:, 1], minlength=size)
+    entities = np.flatnonzero(shares >= min(2, max(len(persons), 1)))
+    entities = entities[np.lexsort((entities, -shares[entities]))]
+
+    is_entity = np.zeros(size, dtype=bool)
+    is_entity[entities] = True
+    shared_counts = np.bincount(pairs[:, 0], weights=is_entity[pairs[:, 1]], minlength=size)
+    persons = persons[np.lexsort((persons, -shared_counts[persons]))]
+    person_limit = max(max_nodes - len(entities), max_nodes // 2)
+    shown_persons = persons[:person_limit]
+    shown_entities = entities[:max_nodes - len(shown_persons)]
+
+    is_shown = np.zeros(size, dtype=bool)
+    is_shown[shown_persons] = True
+    is_shown[shown_entities] = True
+    rels = np.flatnonzero(is_shown[index.rel_starts] & is_shown[index.rel_ends])
+
+    nodes = index.format_nodes(np.concatenate([shown_persons, shown_entities]).tolist())
+    for node, entity in zip(nodes[len(shown_persons):], shown_entities.tolist()):
+        node["properties"]["matches"] = int(shares[entity])
+    hidden = {}
+    for node in np.concatenate([persons[person_limit:], entities[len(shown_entities):]]).tolist():
+        hidden[index.labels[node]] = hidden.get(index.labels[node], 0) + 1
+    return {
+        "nodes": nodes,
+        "relationships": index.format_rels(rels.tolist()),
+        "persons": len(persons),
+        "hidden": hidden,
+    }
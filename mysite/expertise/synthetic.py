@@ -0,0 +1,235 @@
+"""synthetic graphs with the labels and relationship types of the models for scale tests
+and benchmarks
+
+the entities that persons connect to are chosen with a power law, so a few interests,
+expertise entries and groups are hubs and most have only some neighbors. the number of
+relationships of a person follows a power law too. advisors are always persons that
+were generated earlier, so the advisor relationships form chains without cycles. the
+graph only depends on the number of persons and the seed
+"""
+import uuid
+from typing import Callable, Sequence
+
+import numpy as np
+from neomodel import db
+
+from expertise.models import (
+    Person,
+    ResearchInterest,
+    Institute,
+    Faculty,
+    Department,
+    Role,
+    Expertise,
+)
+
+DEFAULT_BATCH_SIZE = 5000
+MAX_PERSONS = 200000
+# exponent of the popularity of the entities, higher values mean bigger hubs
+POPULARITY_EXPONENT = 1.1
+# exponent of the number of relationships of a person
+DEGREE_EXPONENT = 2.2
+MAX_DEGREE = 30
+ALTERNATIVES_SHARE = 0.2
+
+FIRST_NAMES = (
+    "Anna", "Ben", "Clara", "David", "Elif", "Felix", "Greta", "Hannes", "Ida", "Jonas",
+    "Karla", "Lukas", "Mia", "Noah", "Olga", "Paul", "Qiang", "Rosa", "Sven", "Tara",
+    "Umut", "Vera", "Wei", "Xenia", "Yusuf", "Zoe", "Amir", "Lena", "Marek", "Priya",
+)
+LAST_NAMES = (
+    "Schmidt", "Mueller", "Nguyen", "Kowalski", "Fischer", "Weber", "Rossi", "Garcia",
+    "Wagner", "Becker", "Hoffmann", "Yilmaz", "Schulz", "Novak", "Richter", "Klein",
+    "Wolf", "Chen", "Neumann", "Schwarz", "Zimmermann", "Braun", "Hofmann", "Hartmann",
+    "Lange", "Schmitt", "Werner", "Krause", "Meier", "Lehmann", "Kumar", "Silva",
+)
+QUALIFIERS = (
+    "Applied", "Distributed", "Statistical", "Computational", "Scalable", "Interpretable",
+    "Probabilistic", "Federated", "Quantum", "Robust", "Efficient", "Biomedical", "Visual",
+    "Semantic", "Parallel", "Causal", "Geospatial", "Multimodal", "Trustworthy", "Sustainable",
+)
+SUBJECTS = (
+    "Machine Learning", "Data Engineering", "Knowledge Graphs", "Databases", "Optimization",
+    "Computer Vision", "Natural Language Processing", "Reinforcement Learning", "Simulation",
+    "High Performance Computing", "Data Visualization", "Information Retrieval", "Robotics",
+    "Bioinformatics", "Time Series Analysis", "Signal Processing", "Graph Analytics",
+    "Privacy", "Software Engineering", "Research Data Management", "Neural Networks",
+    "Digital Humanities", "Climate Modelling", "Materials Science", "Medical Imaging",
+)
+INSTITUTE_KINDS = ("University", "University of Applied Sciences", "Research Center", "Institute of Technology")
+CITIES = (
+    "Dresden", "Leipzig", "Chemnitz", "Freiberg", "Jena", "Halle", "Magdeburg", "Berlin",
+    "Potsdam", "Erfurt", "Zwickau", "Görlitz", "Mittweida", "Ilmenau", "Rostock", "Kiel",
+)
+ROLE_NAMES = (
+    "Professor", "Postdoc", "PhD student", "Research assistant", "Student assistant",
+    "Group leader", "Principal investigator", "Associated member", "Guest researcher",
+    "Research software engineer",
+)
+# (relationship of the Person model, share of persons with it)
+ENTITY_RELATIONSHIPS = (
+    ("interests", 0.85),
+    ("offered_expertise", 0.7),
+    ("wanted_expertise", 0.4),
+)
+
+def get_sizes(persons: int) -> dict[type, int]:
+    """number of nodes per model for the number of persons"""
+    return {
+        Person: persons,
+        ResearchInterest: max(20, persons // 5),
+        Expertise: max(20, persons // 4),
+        Institute: max(3, persons // 1000),
+        Faculty: max(5, persons // 200),
+        Department: max(10, persons // 40),
+        Role: len(ROLE_NAMES),
+    }
+
+def unique_names(count: int, first: Sequence[str], second: Sequence[str], template: str) -> list[str]:
+    """returns count different names from the combinations of the two word lists, the
+    names are numbered when there are not enough combinations"""
+    combinations = [template.format(a, b) for a in first for b in second]
+    return [
+        combinations[i % len(combinations)] + (f" {i // len(combinations) + 1}" if i >= len(combinations) else "")
+        for i in range(count)
+    ]
+
+def get_acronym(name: str) -> str:
+    return "".join(word[0] for word in name.split() if word[0].isalpha()).upper()
+
+def popularity(rng: np.random.Generator, count: int) -> np.ndarray:
+    """returns the probabilities of the nodes, the ranks are shuffled so that the hubs
+    are not the first nodes"""
+    weights = 1 / np.arange(1, count + 1) ** POPULARITY_EXPONENT
+    return rng.permutation(weights / weights.sum())
+
+def sample_relationships(
+        rng: np.random.Generator,
+        persons: int,
+        targets: int,
+        share: float,
+    ) -> tuple[np.ndarray, np.ndarray]:
+    """returns the distinct pairs (person, target) for a share of the persons"""
+    degrees = np.minimum(rng.zipf(DEGREE_EXPONENT, size=persons), MAX_DEGREE)
+    degrees[rng.random(persons) >= share] = 0
+    starts = np.repeat(np.arange(persons), degrees)
+    ends = rng.choice(targets, size=len(starts), p=popularity(rng, targets))
+    codes = np.unique(starts * targets + ends)
+    return codes // targets, codes % targets
+
+def sample_advisors(rng: np.random.Generator, persons: int) -> tuple[np.ndarray, np.ndarray]:
+    """returns the pairs (person, advisor). the advisor is an earlier person, biased
+    towards the first persons so that they advise many persons"""
+    starts = []
+    ends = []
+    for share in (0.6, 0.1):
+        advised = np.flatnonzero(rng.random(persons) < share)
+        advised = advised[advised > 0]
+        starts.append(advised)
+        ends.append((advised * rng.random(len(advised)) ** 2).astype(np.int64))
+    codes = np.unique(np.concatenate(starts) * persons + np.concatenate(ends))
+    return codes // persons, codes % persons
+
+def generate_graph(persons: int, seed: int = 0) -> dict:
+    """returns the nodes as {model: [properties]} and the relationships as
+    [(model, relationship type, end model, [(start pk, end pk)])]"""
+    rng = np.random.default_rng(seed)
+    sizes = get_sizes(persons)
+
+    def new_pk() -> str:
+        return uuid.UUID(bytes=rng.bytes(16), version=4).hex
+
+    def entity_rows(names: list[str]) -> list[dict]:
+        rows = [{"pk": new_pk(), "name": name} for name in names]
+        for i in np.flatnonzero(rng.random(len(names)) < ALTERNATIVES_SHARE).tolist():
+            rows[i]["alternatives"] = [get_acronym(names[i]), names[i].lower()]
+        return rows
+
+    nodes = {
+        ResearchInterest: entity_rows(unique_names(sizes[ResearchInterest], QUALIFIERS, SUBJECTS, "{} {}")),
+        Expertise: entity_rows(unique_names(sizes[Expertise], SUBJECTS, QUALIFIERS, "{} ({})")),
+        Institute: entity_rows(unique_names(sizes[Institute], INSTITUTE_KINDS, CITIES, "{} {}")),
+        Faculty: entity_rows(unique_names(sizes[Faculty], SUBJECTS, CITIES, "Faculty of {}, {}")),
+        Department: entity_rows(unique_names(sizes[Department], QUALIFIERS, SUBJECTS, "Chair of {} {}")),
+        Role: entity_rows(list(ROLE_NAMES)),
+    }
+    first_names = rng.integers(len(FIRST_NAMES), size=persons).tolist()
+    last_names = rng.integers(len(LAST_NAMES), size=persons).tolist()
+    nodes[Person] = [
+        {
+            "pk": new_pk(),
+            "name": f"{FIRST_NAMES[first]} {LAST_NAMES[last]}",
+            "email": f"{FIRST_NAMES[first]}.{LAST_NAMES[last]}.{i}@example.org".lower(),
+            # the first persons are the most senior ones
+            "title": "Prof. Dr." if i < persons * 0.05 else "Dr." if i < persons * 0.3 else "",
+        }
+        for i, (first, last) in enumerate(zip(first_names, last_names))
+    ]
+
+    pairs = []
+    for attribute, share in ENTITY_RELATIONSHIPS:
+        end_model = getattr(Person, attribute)._raw_class
+        pairs.append((attribute, end_model, *sample_relationships(rng, persons, sizes[end_model], share)))
+    pairs.append(("roles", Role, *sample_relationships(rng, persons, sizes[Role], 0.3)))
+
+    # every person is in a department of a faculty of an institute, most of them are
+    # members of all three
+    faculty_institutes = rng.integers(sizes[Institute], size=sizes[Faculty])
+    department_faculties = rng.integers(sizes[Faculty], size=sizes[Department])
+    departments = rng.choice(sizes[Department], size=persons, p=popularity(rng, sizes[Department]))
+    faculties = department_faculties[departments]
+    for attribute, model, targets, share in (
+            ("departments", Department, departments, 0.9),
+            ("faculties", Faculty, faculties, 0.7),
+            ("institutes", Institute, faculty_institutes[faculties], 0.8),
+        ):
+        members = np.flatnonzero(rng.random(persons) < share)
+        pairs.append((attribute, model, members, targets[members]))
+    pairs.append(("advisors", Person, *sample_advisors(rng, persons)))
+
+    person_pks = [row["pk"] for row in nodes[Person]]
+    relationships = []
+    for attribute, end_model, starts, ends in pairs:
+        end_pks = [row["pk"] for row in nodes[end_model]]
+        relationships.append((
+            Person,
+            getattr(Person, attribute).definition["relation_type"],
+            end_model,
+            [(person_pks[start], end_pks[end]) for start, end in zip(starts.tolist(), ends.tolist())],
+        ))
+    return {"nodes": nodes, "relationships": relationships}
+
+def run_batches(query: str, rows: list, batch_size: int) -> None:
+    for start in range(0, len(rows), batch_size):
+        db.cypher_query(query, {"rows": rows[start:start + batch_size]})
+
+def write_graph(
+        graph: dict,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        progress: Callable[[str], None] | None = None,
+    ) -> None:
+    """create the nodes and relationships of generate_graph with one UNWIND query per
+    batch. the relationships are matched by the primary keys, so the unique indexes of
+    the models need to be installed"""
+    for model, rows in graph["nodes"].items():
+        run_batches(f"UNWIND $rows AS row CREATE (n:{model.__label__}) SET n = row", rows, batch_size)
+        if progress:
+            progress(f"{len(rows)} {model.__label__} nodes")
+    for start_model, rel_type, end_model, rows in graph["relationships"]:
+        query = (
+            "UNWIND $rows AS row "
+            f"MATCH (a:{start_model.__label__} {{pk: row[0]}}) "
+            f"MATCH (b:{end_model.__label__} {{pk: row[1]}}) "
+            f"CREATE (a)-[:{rel_type}]->(b)"
+        )
+        run_batches(query, rows, batch_size)
+        if progress:
+            progress(f"{len(rows)} {rel_type} relationships to {end_model.__label__}")
+
+def clear_graph(batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+    """delete all nodes in batches, so that large graphs don't need one big transaction"""
+    query = "MATCH (n) WITH n LIMIT $limit DETACH DELETE n RETURN count(n)"
+    while True:
+        results, _ = db.cypher_query(query, {"limit": batch_size})
+        if not results or results[0][0] == 0:
+            break
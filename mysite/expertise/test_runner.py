@@ -0,0 +1,106 @@
+"""test runner with one Neo4j test database per parallel worker
+
+"manage.py test --parallel N" runs the tests in N processes. every process gets its own
+Neo4j database, so the tests can still clear the whole database in setUp:
+
+- NEO4J_TEST_BOLT_URLS: comma separated bolt URLs, one per worker, e.g. of several
+  Community Edition servers. the first one is used without --parallel
+- otherwise the databases test1 ... testN of the NEO4J_BOLT_URL server are created,
+  which needs the Enterprise Edition. without --parallel the database is "test"
+
+every process points neomodel at its test database at the start, but only connects,
+installs the labels and empties the database in batches when the first Neo4jTestCase
+runs. so the tests that only use the memory graph store run without a Neo4j server. the
+main process also empties the database after the run if it used it. the metrics of the
+test requests go into a temporary METRICS_DB
+"""
+import io
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, runner
+from django.test.runner import DiscoverRunner, ParallelTestSuite
+from neo4j.exceptions import ClientError
+from neomodel import db, install_all_labels
+
+from expertise.synthetic import clear_graph
+
+_connected_url = None
+
+def get_test_neo4j_url(worker_id: int = 0) -> str:
+    """returns the bolt URL of the worker's test database, 0 is the main process"""
+    urls = [url for url in os.environ.get("NEO4J_TEST_BOLT_URLS", "").split(",") if url]
+    if urls:
+        if worker_id > len(urls):
+            raise ImproperlyConfigured(f"NEO4J_TEST_BOLT_URLS has {len(urls)} URLs but worker {worker_id} needs one")
+        return urls[max(worker_id, 1) - 1]
+    split_url = os.environ["NEO4J_BOLT_URL"].split("/")
+    split_url[-1] = f"test{worker_id}" if worker_id else "test"
+    return "/".join(split_url)
+
+def create_database(name: str) -> None:
+    try:
+        with db.driver.session(database="system") as session:
+            session.run(f"CREATE DATABASE `{name}` IF NOT EXISTS WAIT")
+    except ClientError as e:
+        raise ImproperlyConfigured(
+            f"the test database {name} can't be created ({e.message}). the Community Edition "
+            "only has one database, set NEO4J_TEST_BOLT_URLS to one server per worker instead"
+        ) from e
+
+def use_test_database() -> None:
+    """point neomodel at the test database of this process without connecting, so that
+    no test can use the configured database"""
+    url = get_test_neo4j_url(runner._worker_id)
+    if url != db.url:
+        db.set_connection(url)
+
+def connect_test_database() -> None:
+    """prepare the test database of this process: create it if needed, install the labels
+    and empty it. does nothing if it was prepared already"""
+    global _connected_url
+    worker_id = runner._worker_id
+    url = get_test_neo4j_url(worker_id)
+    if url == _connected_url:
+        return
+    use_test_database()
+    if worker_id and not os.environ.get("NEO4J_TEST_BOLT_URLS"):
+        create_database(db._database_name)
+    install_all_labels(io.StringIO())
+    clear_graph()
+    _connected_url = url
+
+class Neo4jTestCase(TestCase):
+    """a test case that needs the Neo4j test database"""
+
+    @classmethod
+    def setUpClass(cls):
+        connect_test_database()
+        super().setUpClass()
+
+def _init_worker(counter, *args, **kwargs):
+    runner._init_worker(counter, *args, **kwargs)
+    use_test_database()
+
+class Neo4jParallelTestSuite(ParallelTestSuite):
+    init_worker = _init_worker
+
+class Neo4jTestRunner(DiscoverRunner):
+    parallel_test_suite = Neo4jParallelTestSuite
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.metrics_dir = tempfile.TemporaryDirectory()
+        settings.METRICS_DB = os.path.join(self.metrics_dir.name, "metrics.sqlite3")
+        use_test_database()
+
+    def teardown_test_environment(self, **kwargs):
+        super().teardown_test_environment(**kwargs)
+        self.metrics_dir.cleanup()
+
+    def teardown_databases(self, old_config, **kwargs):
+        super().teardown_databases(old_config, **kwargs)
+        if _connected_url:
+            clear_graph()
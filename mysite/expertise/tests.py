@@ -1,12 +1,19 @@
-import os
 import json
-from typing import Sequence
-
-from django.test import TestCase
+import marshal
+import re
+from contextlib import contextmanager
+from typing import Iterator, Sequence
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from django.contrib.auth.models import User, Group, Permission
 from django.http import QueryDict
+from django.core.signals import request_finished
+from django.db import DatabaseError
 from django.forms.boundfield import BoundField
-from neomodel import db, clear_neo4j_database, install_all_labels
+from neomodel import db, clear_neo4j_database
+from django_neomodel import DjangoNode
 
 from expertise.models import (
     Person,
@@ -18,8 +25,29 @@ from expertise.models import (
     Expertise,
     EditSubmission,
     ShareParameters,
+    GraphChange,
+    ExpertiseMatches,
+    PersonSignature,
+    TopicCooccurrence,
+    NodeCentrality,
+    NodeCommunity,
+    AdvisorClosure,
+    SlowQuery,
 )
 from expertise.forms import EditForm
+from expertise.changes import compact_changes, get_graph_version, record_change
+from expertise.graph_index import clear_graph_index, get_graph_index, load_graph_index
+from expertise.matching import get_matches, save_all_matches
+from expertise.similarity import rebuild_signatures, update_person_signature, remove_person_signature
+from expertise.cooccurrence import rebuild_cooccurrence, update_cooccurrence
+from expertise.centrality import save_centrality
+from expertise.communities import save_communities
+from expertise.lineage import rebuild_closure, update_advisors, remove_person_lineage
+from expertise.instrumentation import QueryRecord, record_queries, hash_query
+from expertise.slow_queries import record_slow_query
+from expertise.synthetic import generate_graph, write_graph
+from expertise.graph_store import get_graph_store, clear_graph_stores
+from expertise.test_runner import Neo4jTestCase
 from expertise.views import (
     is_same_string_or_list,
     is_same_data,
@@ -27,18 +55,9 @@ from expertise.views import (
     save_submission,
     get_submissions_forms,
     get_filtered_data,
+    clear_suggestions,
 )
 
-# e.g. the form would still use the non-test database because it is
-# initialized before the test is run
-url_with_database = os.environ["NEO4J_BOLT_URL"]
-split_url = url_with_database.split("/")
-split_url[-1] = "test"
-test_url = "/".join(split_url)
-db.set_connection(test_url)
-with open(os.devnull, "w") as f:
-    install_all_labels(f)
-
 def create_group_and_user(test_case: TestCase) -> None:
     """creates a group and user for edit submissions, user is not added to the group yet"""
     test_case.group = Group(name="edit_submissions")
@@ -49,9 +68,36 @@ def create_group_and_user(test_case: TestCase) -> None:
     test_case.password = "test"
     test_case.user = User.objects.create_user(username="test", password=test_case.password)
 
-class IndexViewTestCase(TestCase):
+@contextmanager
+def assert_max_cypher_queries(test_case: TestCase, max_queries: int) -> Iterator[list[QueryRecord]]:
+    """like assertNumQueries but for the queries sent to Neo4j in the block. it's an upper
+    bound so that the tests don't depend on e.g. how many queries a neomodel method needs"""
+    with record_queries() as records:
+        yield records
+    test_case.assertLessEqual(
+        len(records),
+        max_queries,
+        "too many Cypher queries:\n" + "\n".join(record.summary for record in records),
+    )
+
+def create_persons(count: int) -> list[Person]:
+    """creates persons with an interest, an advisor and offered expertise each"""
+    interest = ResearchInterest(name="interest").save()
+    expertise = Expertise(name="expertise").save()
+    persons = []
+    for i in range(count):
+        person = Person(name=f"Person {i}", email=f"person{i}@a.com").save()
+        person.interests.connect(interest)
+        person.offered_expertise.connect(expertise)
+        if persons:
+            person.advisors.connect(persons[-1])
+        persons.append(person)
+    return persons
+
+class IndexViewTestCase(Neo4jTestCase):
     def setUp(self):
         clear_neo4j_database(db)
+        clear_suggestions()
         person1 = Person(title="Prof", name="Adviso").save()
         person2 = Person(name="Ken").save()
         person1.advisors.connect(person2)
@@ -81,6 +127,18 @@ class IndexViewTestCase(TestCase):
         self.assertEqual(2, len(suggestions["offered_expertise"]["options"]))
         self.assertEqual(2, len(suggestions["wanted_expertise"]["options"]))
 
+    def test_suggestions_cached(self):
+        self.client.get("/expertise/")
+        new_person = Person(name="New").save()
+        # only the versions are read
+        with self.assertNumQueries(2), assert_max_cypher_queries(self, 0):
+            response = self.client.get("/expertise/")
+        self.assertEqual(2, len(response.context["suggestions"]["persons"]["options"]))
+        # a new graph version loads them again
+        record_change("edit", new_person.pk, {"name": "New"}, {})
+        response = self.client.get("/expertise/")
+        self.assertEqual(3, len(response.context["suggestions"]["persons"]["options"]))
+
     def test_suggestions_format(self):
         response = self.client.get("/expertise/")
         suggestions = response.context["suggestions"]
@@ -96,7 +154,15 @@ class IndexViewTestCase(TestCase):
         self.assertEqual("expertise/index.html", templates[0].name)
         self.assertEqual("expertise/base.html", templates[1].name)
 
-class PersonApiTestCase(TestCase):
+    def test_query_count(self):
+        # one query per suggestion list
+        for count in (1, 20):
+            clear_neo4j_database(db)
+            create_persons(count)
+            with assert_max_cypher_queries(self, 8):
+                self.client.get("/expertise/")
+
+class PersonApiTestCase(Neo4jTestCase):
     def setUp(self):
         clear_neo4j_database(db)
 
@@ -138,6 +204,22 @@ class PersonApiTestCase(TestCase):
         data = response.json()
         self.assertEqual([], data["persons"])
 
+    def test_lean_payload(self):
+        adviso = Person(title="Prof", name="Adviso Müller", email="a@a.com").save()
+        jake = Person(name="Jake").save()
+        python = Expertise(name="Python").save()
+        adviso.offered_expertise.connect(python)
+        jake.wanted_expertise.connect(python)
+        jake.advisors.connect(adviso)
+        jake.departments.connect(Department(name="ZIH").save())
+
+        for query in ("search=", "search=pyth", "search=pyth&sort=centrality", "search=nothing"):
+            response = self.client.get(f"/expertise/persons?{query}")
+            with override_settings(LEAN_PERSONS_PAYLOAD=True):
+                lean_response = self.client.get(f"/expertise/persons?{query}")
+            self.assertTrue(lean_response.streaming)
+            self.assertEqual(b"".join(lean_response.streaming_content), response.content)
+
     def test_one_search_phrase(self):
         person1 = Person(title="Prof", name="Adviso", comment="I am hiring").save()
         person2 = Person(name="jake").save()
@@ -206,7 +288,19 @@ class PersonApiTestCase(TestCase):
         data = response.json()
         self.assertEqual(len(data["persons"]), 1)
 
-class GraphApiTestCase(TestCase):
+    def test_query_count(self):
+        # the matching persons and then their connected nodes, not one query per person
+        for count in (2, 30):
+            clear_neo4j_database(db)
+            create_persons(count)
+            with assert_max_cypher_queries(self, 2):
+                response = self.client.get("/expertise/persons?search=")
+            self.assertEqual(len(response.json()["persons"]), count)
+            with assert_max_cypher_queries(self, 2):
+                response = self.client.get("/expertise/persons?search=interest&sort=centrality")
+            self.assertEqual(len(response.json()["persons"]), count)
+
+class GraphApiTestCase(Neo4jTestCase):
     def setUp(self):
         clear_neo4j_database(db)
 
@@ -260,6 +354,774 @@ class GraphApiTestCase(TestCase):
             self.assertIn("endNode", rel)
             self.assertIn("type", rel)
 
+    def test_depth(self):
+        person1 = Person(name="Adviso").save()
+        person2 = Person(name="Person").save()
+        interest = ResearchInterest(name="interest").save()
+        department = Department(name="department").save()
+        person1.interests.connect(interest)
+        person2.interests.connect(interest)
+        person2.departments.connect(department)
+
+        response = self.client.get("/expertise/graph?id=" + person1.pk)
+        data = response.json()["graph"]
+        self.assertEqual(len(data["nodes"]), 2)
+        self.assertEqual(len(data["relationships"]), 1)
+
+        response = self.client.get(f"/expertise/graph?id={person1.pk}&depth=2")
+        data = response.json()["graph"]
+        self.assertEqual(len(data["nodes"]), 3)
+        self.assertEqual(len(data["relationships"]), 2)
+
+        response = self.client.get(f"/expertise/graph?id={person1.pk}&depth=3")
+        data = response.json()["graph"]
+        self.assertCountEqual(
+            [node["id"] for node in data["nodes"]],
+            [person1.pk, person2.pk, interest.pk, department.pk],
+        )
+        self.assertEqual(len(data["relationships"]), 3)
+
+    def test_known_nodes(self):
+        person = Person(name="Adviso").save()
+        interest = ResearchInterest(name="interest").save()
+        department = Department(name="department").save()
+        person.interests.connect(interest)
+        person.departments.connect(department)
+
+        response = self.client.get(f"/expertise/graph?id={interest.pk}&known={interest.pk}&known={department.pk}")
+        data = response.json()["graph"]
+        self.assertEqual([node["id"] for node in data["nodes"]], [person.pk])
+        self.assertEqual(data["knownNodes"], [interest.pk])
+        self.assertEqual(len(data["relationships"]), 1)
+
+    @override_settings(GRAPH_MAX_NEIGHBORS=2)
+    def test_hub_node(self):
+        interest = ResearchInterest(name="AI").save()
+        persons = [Person(name=f"Person {i}").save() for i in range(5)]
+        for i, person in enumerate(persons):
+            person.interests.connect(interest)
+            for j in range(i):
+                person.offered_expertise.connect(Expertise(name=f"expertise {i} {j}").save())
+
+        response = self.client.get("/expertise/graph?id=" + interest.pk)
+        data = response.json()["graph"]
+        node_ids = [node["id"] for node in data["nodes"]]
+        # the neighbors with the highest degree are returned
+        self.assertIn(persons[4].pk, node_ids)
+        self.assertIn(persons[3].pk, node_ids)
+        self.assertEqual(len(data["nodes"]), 4)
+        aggregate = data["nodes"][-1]
+        self.assertEqual(aggregate["labels"], ["Aggregate", "Person"])
+        self.assertEqual(aggregate["aggregate"]["count"], 3)
+        self.assertEqual(aggregate["aggregate"]["offset"], 2)
+
+        response = self.client.get(f"/expertise/graph/neighbors?id={interest.pk}&label=Person&offset=2")
+        data = response.json()
+        node_ids = [node["id"] for node in data["graph"]["nodes"]]
+        self.assertIn(persons[2].pk, node_ids)
+        self.assertEqual(data["nextOffset"], 4)
+
+        response = self.client.get(f"/expertise/graph/neighbors?id={interest.pk}&label=Person&offset=4")
+        data = response.json()
+        self.assertIsNone(data["nextOffset"])
+
+        response = self.client.get(f"/expertise/graph/neighbors?id={interest.pk}&label=Unknown")
+        self.assertEqual(response.status_code, 400)
+
+    def test_layout(self):
+        person = Person(name="Adviso").save()
+        interest = ResearchInterest(name="interest").save()
+        department = Department(name="department").save()
+        person.interests.connect(interest)
+        person.departments.connect(department)
+
+        response = self.client.get(f"/expertise/graph?id={person.pk}&layout=1&known={person.pk}")
+        data = response.json()["graph"]
+        # the known nodes also get coordinates
+        self.assertCountEqual(data["layout"].keys(), [person.pk, interest.pk, department.pk])
+        for x, y in data["layout"].values():
+            self.assertTrue(0 <= x <= 1600)
+            self.assertTrue(0 <= y <= 800)
+
+        response = self.client.get(f"/expertise/graph?id={person.pk}")
+        self.assertNotIn("layout", response.json()["graph"])
+
+    def test_multiple_ids(self):
+        person1 = Person(name="Adviso").save()
+        person2 = Person(name="Person").save()
+        person3 = Person(name="Jake").save()
+        interest = ResearchInterest(name="interest").save()
+        department = Department(name="department").save()
+        person1.interests.connect(interest)
+        person2.interests.connect(interest)
+        person2.departments.connect(department)
+        person3.departments.connect(department)
+
+        response = self.client.get(f"/expertise/graph?id={person1.pk}&id={person2.pk}&known={person1.pk}")
+        data = response.json()["graph"]
+        self.assertCountEqual([node["id"] for node in data["nodes"]], [person2.pk, interest.pk, department.pk])
+        self.assertEqual(data["knownNodes"], [person1.pk])
+        self.assertEqual(len(data["relationships"]), 3)
+
+        ids = "&".join(f"id={i}" for i in range(21))
+        response = self.client.get(f"/expertise/graph?{ids}")
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(GRAPH_MAX_NEIGHBORS=5)
+    def test_query_count(self):
+        # the neighbor counts, the neighbors of hubs and one query per hop
+        for count in (3, 20):
+            clear_neo4j_database(db)
+            persons = create_persons(count)
+            interest = ResearchInterest.nodes.get(name="interest")
+            for depth in (1, 2):
+                with assert_max_cypher_queries(self, 2 + depth):
+                    self.client.get(f"/expertise/graph?id={interest.pk}&depth={depth}&layout=1")
+                with assert_max_cypher_queries(self, depth):
+                    self.client.get(f"/expertise/graph?id={persons[0].pk}&id={persons[1].pk}&depth={depth}")
+
+    def test_invalid_depth(self):
+        person = Person(name="Adviso").save()
+        for depth in ("0", "4", "abc"):
+            response = self.client.get(f"/expertise/graph?id={person.pk}&depth={depth}")
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("error", response.json())
+
+class PathApiTestCase(Neo4jTestCase):
+    def setUp(self):
+        clear_neo4j_database(db)
+        clear_graph_index()
+
+    def test_missing_parameter(self):
+        response = self.client.get("/expertise/path?from=abc")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", response.json())
+
+        response = self.client.get("/expertise/path?from=abc&to=def&k=0")
+        self.assertEqual(response.status_code, 400)
+
+    def test_paths(self):
+        person1 = Person(name="Adviso").save()
+        person2 = Person(name="Person").save()
+        person3 = Person(name="Jake").save()
+        interest = ResearchInterest(name="interest").save()
+        department = Department(name="department").save()
+        unconnected = Person(name="Hans").save()
+        person1.interests.connect(interest)
+        person2.interests.connect(interest)
+        person2.advisors.connect(person3)
+        person1.departments.connect(department)
+        person3.departments.connect(department)
+
+        response = self.client.get(f"/expertise/path?from={person1.pk}&to={person3.pk}")
+        data = response.json()
+        self.assertEqual(data["paths"], [[person1.pk, department.pk, person3.pk]])
+        self.assertEqual(len(data["graph"]["nodes"]), 3)
+        self.assertEqual(len(data["graph"]["relationships"]), 2)
+        for rel in data["graph"]["relationships"]:
+            self.assertEqual(rel["type"], "MEMBER_OF")
+
+        response = self.client.get(f"/expertise/path?from={person1.pk}&to={person3.pk}&k=3")
+        data = response.json()
+        self.assertEqual(data["paths"], [
+            [person1.pk, department.pk, person3.pk],
+            [person1.pk, interest.pk, person2.pk, person3.pk],
+        ])
+        self.assertEqual(len(data["graph"]["nodes"]), 5)
+
+        response = self.client.get(f"/expertise/path?from={person1.pk}&to={unconnected.pk}")
+        self.assertEqual(response.json()["paths"], [])
+
+class MatchesApiTestCase(Neo4jTestCase):
+    def setUp(self):
+        clear_neo4j_database(db)
+        clear_graph_index()
+        self.person1 = Person(name="Adviso").save()
+        self.person2 = Person(name="Person").save()
+        self.person3 = Person(name="Jake").save()
+        self.python = Expertise(name="Python").save()
+        self.neo4j = Expertise(name="Neo4j").save()
+        self.person1.wanted_expertise.connect(self.python)
+        self.person1.wanted_expertise.connect(self.neo4j)
+        self.person2.offered_expertise.connect(self.python)
+        self.person2.offered_expertise.connect(self.neo4j)
+        self.person3.offered_expertise.connect(self.neo4j)
+
+    def check_matches(self, matches: dict):
+        offering = matches["offering"]
+        self.assertEqual([match["person"]["pk"] for match in offering], [self.person2.pk, self.person3.pk])
+        self.assertEqual([match["score"] for match in offering], [2, 1])
+        self.assertEqual(offering[1]["expertise"], [{"pk": self.neo4j.pk, "name": "Neo4j"}])
+        self.assertEqual(matches["wanting"], [])
+
+    def test_matches(self):
+        response = self.client.get("/expertise/matches?id=" + self.person1.pk)
+        self.check_matches(response.json()["matches"])
+
+        response = self.client.get("/expertise/matches?id=" + self.person3.pk)
+        wanting = response.json()["matches"]["wanting"]
+        self.assertEqual([match["person"]["pk"] for match in wanting], [self.person1.pk])
+
+    def test_incidence_is_built_once(self):
+        get_matches(self.person1.pk)
+        incidence = get_graph_index().derived["expertise_incidence"]
+        self.check_matches(get_matches(self.person1.pk))
+        self.assertIs(get_graph_index().derived["expertise_incidence"], incidence)
+
+    def test_stored_matches(self):
+        save_all_matches(load_graph_index(get_graph_version()))
+        self.assertEqual(ExpertiseMatches.objects.count(), 3)
+        response = self.client.get("/expertise/matches?id=" + self.person1.pk)
+        self.check_matches(response.json()["matches"])
+
+    def test_missing_parameter(self):
+        response = self.client.get("/expertise/matches")
+        self.assertEqual(response.status_code, 400)
+
+class SimilarApiTestCase(Neo4jTestCase):
+    def setUp(self):
+        clear_neo4j_database(db)
+        clear_graph_index()
+        self.person1 = Person(name="Adviso").save()
+        self.person2 = Person(name="Person").save()
+        self.person3 = Person(name="Jake").save()
+        self.graphs = ResearchInterest(name="Graphs").save()
+        self.music = ResearchInterest(name="Music").save()
+        self.department = Department(name="Computer Science").save()
+        for person in (self.person1, self.person2):
+            person.interests.connect(self.graphs)
+            person.departments.connect(self.department)
+            person.advisors.connect(self.person3)
+        self.person3.interests.connect(self.music)
+
+    def get_similar(self, person: Person) -> list[dict]:
+        response = self.client.get("/expertise/similar?id=" + person.pk)
+        return response.json()["similar"]
+
+    def test_similar(self):
+        self.assertEqual(rebuild_signatures(load_graph_index()), 3)
+        similar = self.get_similar(self.person1)
+        self.assertEqual(similar, [{"person": {"pk": self.person2.pk, "name": "Person"}, "similarity": 1.0}])
+        self.assertEqual(self.get_similar(self.person3), [])
+
+    def test_without_signatures(self):
+        rebuild_signatures(load_graph_index())
+        remove_person_signature(self.person1.pk)
+        similar = self.get_similar(self.person1)
+        self.assertEqual([x["person"]["pk"] for x in similar], [self.person2.pk])
+
+    def test_update_signature(self):
+        rebuild_signatures(load_graph_index())
+        data = {"interests": [self.graphs.pk], "departments": [self.department.pk], "advisors": [self.person3.pk]}
+        update_person_signature(self.person3.pk, "Jake", data)
+        similar = self.get_similar(self.person1)
+        self.assertEqual([x["person"]["pk"] for x in similar], [self.person3.pk, self.person2.pk])
+
+        update_person_signature(self.person3.pk, "Jake", {})
+        self.assertFalse(PersonSignature.objects.filter(person_id=self.person3.pk).exists())
+
+    def test_missing_parameter(self):
+        response = self.client.get("/expertise/similar")
+        self.assertEqual(response.status_code, 400)
+
+class RelatedApiTestCase(Neo4jTestCase):
+    def setUp(self):
+        clear_neo4j_database(db)
+        clear_graph_index()
+        self.person1 = Person(name="Adviso").save()
+        self.person2 = Person(name="Person").save()
+        self.graphs = ResearchInterest(name="Graphs").save()
+        self.music = ResearchInterest(name="Music").save()
+        self.python = Expertise(name="Python").save()
+        for person in (self.person1, self.person2):
+            person.interests.connect(self.graphs)
+            person.offered_expertise.connect(self.python)
+        self.person1.wanted_expertise.connect(self.python)
+        self.person2.interests.connect(self.music)
+
+    def get_related(self, node: DjangoNode) -> list[dict]:
+        response = self.client.get("/expertise/related?id=" + node.pk)
+        return response.json()["related"]
+
+    def test_related(self):
+        rebuild_cooccurrence(load_graph_index())
+        # offering and wanting the same expertise counts once
+        self.assertEqual(TopicCooccurrence.objects.get(topic_id=self.python.pk, other_id=self.python.pk).count, 2)
+        related = self.get_related(self.graphs)
+        self.assertEqual([x["pk"] for x in related], [self.python.pk, self.music.pk])
+        self.assertEqual(related[0], {
+            "pk": self.python.pk, "name": "Python", "label": "Expertise", "score": 1.0, "count": 2,
+        })
+        self.assertEqual(related[1]["score"], round(1 / 2 ** 0.5, 3))
+
+    def test_update(self):
+        rebuild_cooccurrence(load_graph_index())
+        previous_data = {"interests": [self.graphs.pk, self.music.pk], "offered": [self.python.pk]}
+        update_cooccurrence(previous_data, {"interests": [self.music.pk]})
+        self.assertEqual([x["pk"] for x in self.get_related(self.graphs)], [self.python.pk])
+        self.assertEqual(self.get_related(self.music), [])
+
+        update_cooccurrence({"interests": [self.music.pk]}, {})
+        self.assertFalse(TopicCooccurrence.objects.filter(topic_id=self.music.pk).exists())
+
+    def test_missing_parameter(self):
+        response = self.client.get("/expertise/related")
+        self.assertEqual(response.status_code, 400)
+
+class CentralityTestCase(Neo4jTestCase):
+    def setUp(self):
+        clear_neo4j_database(db)
+        clear_graph_index()
+        # the advisor connects the other persons
+        self.advisor = Person(name="Zed Adviso").save()
+        self.person1 = Person(name="Anna Person").save()
+        self.person2 = Person(name="Jake Person").save()
+        self.person3 = Person(name="Mia Person").save()
+        self.graphs = ResearchInterest(name="Graphs").save()
+        self.person1.advisors.connect(self.advisor)
+        self.person2.advisors.connect(self.advisor)
+        self.person3.advisors.connect(self.advisor)
+        self.person2.interests.connect(self.graphs)
+        save_centrality(load_graph_index(get_graph_version()))
+
+    def test_scores(self):
+        self.assertEqual(NodeCentrality.objects.count(), 5)
+        advisor = NodeCentrality.objects.get(node_id=self.advisor.pk)
+        person1 = NodeCentrality.objects.get(node_id=self.person1.pk)
+        person2 = NodeCentrality.objects.get(node_id=self.person2.pk)
+        self.assertEqual(advisor.degree, 3)
+        self.assertGreater(advisor.pagerank, person2.pagerank)
+        self.assertGreater(person2.pagerank, person1.pagerank)
+        # exact because there are fewer nodes than samples. the advisor is on the paths
+        # between the persons and from person1 and person3 to graphs
+        self.assertAlmostEqual(advisor.betweenness, 5)
+        self.assertAlmostEqual(person2.betweenness, 3)
+        self.assertAlmostEqual(person1.betweenness, 0)
+        self.assertAlmostEqual(sum(NodeCentrality.objects.values_list("pagerank", flat=True)), 1)
+
+    def test_sorted_persons(self):
+        response = self.client.get("/expertise/persons?search=&sort=centrality")
+        persons = [entry["person"]["pk"] for entry in response.json()["persons"]]
+        self.assertEqual(persons[:2], [self.advisor.pk, self.person2.pk])
+
+        response = self.client.get("/expertise/persons?search=&sort=degree")
+        self.assertEqual(response.status_code, 400)
+
+    def test_graph_pagerank(self):
+        response = self.client.get("/expertise/graph?id=" + self.advisor.pk)
+        nodes = response.json()["graph"]["nodes"]
+        pagerank = NodeCentrality.objects.get(node_id=self.advisor.pk).pagerank
+        self.assertIn({"name": "Zed Adviso", "pagerank": pagerank}, [node["properties"] for node in nodes])
+
+class GraphOverviewTestCase(Neo4jTestCase):
+    def setUp(self):
+        clear_neo4j_database(db)
+        clear_graph_index()
+        # two groups that are connected by one relationship. the advisors are created
+        # first, so they are the first of the members with the most neighbors
+        self.advisor1 = Person(name="Adviso").save()
+        self.advisor2 = Person(name="Jake").save()
+        self.groups = []
+        for advisor in (self.advisor1, self.advisor2):
+            interest = ResearchInterest(name=f"Interest of {advisor.name}").save()
+            group = [advisor, interest]
+            for i in range(3):
+                person = Person(name=f"{advisor.name} {i}").save()
+                person.advisors.connect(advisor)
+                person.interests.connect(interest)
+                group.append(person)
+            self.groups.append(group)
+        self.groups[0][2].advisors.connect(self.advisor2)
+
+    def test_overview(self):
+        self.assertEqual(save_communities(load_graph_index(get_graph_version())), 2)
+        communities = {
+            pk: community for pk, community in NodeCommunity.objects.values_list("node_id", "community_id")
+        }
+        for group in self.groups:
+            self.assertEqual(len({communities[node.pk] for node in group}), 1)
+
+        graph = self.client.get("/expertise/graph/overview").json()["graph"]
+        self.assertEqual([node["community"]["size"] for node in graph["nodes"]], [5, 5])
+        self.assertEqual({node["properties"]["name"] for node in graph["nodes"]}, {"Adviso", "Jake"})
+        self.assertEqual(len(graph["relationships"]), 1)
+        self.assertEqual(graph["relationships"][0]["weight"], 1)
+
+    def test_empty_overview(self):
+        graph = self.client.get("/expertise/graph/overview").json()["graph"]
+        self.assertEqual(graph["nodes"], [])
+
+class SubgraphApiTestCase(Neo4jTestCase):
+    def setUp(self):
+        clear_neo4j_database(db)
+        clear_graph_index()
+        self.advisor = Person(name="Adviso").save()
+        self.person1 = Person(name="Anna").save()
+        self.person2 = Person(name="Jake").save()
+        self.graphs = ResearchInterest(name="Graphs").save()
+        self.department = Department(name="Computer Science").save()
+        self.python = Expertise(name="Python").save()
+        for person in (self.person1, self.person2):
+            person.advisors.connect(self.advisor)
+            person.interests.connect(self.graphs)
+        self.person1.departments.connect(self.department)
+        self.person2.wanted_expertise.connect(self.python)
+
+    def get_graph(self, params: str) -> dict:
+        response = self.client.get("/expertise/graph/subgraph?" + params)
+        return response.json()["graph"]
+
+    def test_search(self):
+        graph = self.get_graph("search=graph")
+        self.assertEqual(graph["persons"], 2)
+        nodes = {node["id"]: node for node in graph["nodes"]}
+        # only the shared entities, the advisor doesn't match the search itself
+        self.assertEqual(set(nodes), {self.person1.pk, self.person2.pk, self.advisor.pk, self.graphs.pk})
+        self.assertEqual(nodes[self.graphs.pk]["properties"]["matches"], 2)
+        self.assertEqual(len(graph["relationships"]), 4)
+
+    def test_filters(self):
+        graph = self.get_graph(f"filter=want-{self.python.pk}&filter=offe-{self.python.pk}")
+        self.assertEqual(graph["persons"], 1)
+        # all entities of a single person
+        self.assertEqual(len(graph["nodes"]), 4)
+
+        graph = self.get_graph(f"filter=want-{self.python.pk}&filter=depa-{self.department.pk}")
+        self.assertEqual(graph["nodes"], [])
+
+    @override_settings(GRAPH_SUBGRAPH_MAX_NODES=2)
+    def test_max_nodes(self):
+        graph = self.get_graph("search=")
+        self.assertEqual(len(graph["nodes"]), 2)
+        self.assertEqual(graph["hidden"], {"Person": 2})
+
+    def test_invalid_filter(self):
+        response = self.client.get("/expertise/graph/subgraph?filter=something")
+        self.assertEqual(response.status_code, 400)
+
+class EntityApiTestCase(Neo4jTestCase):
+    def setUp(self):
+        clear_neo4j_database(db)
+        self.department = Department(name="Computer Science", alternatives=["CS"]).save()
+        self.python = Expertise(name="Python").save()
+        self.persons = []
+        for name in ("Mia", "Anna", "Jake", "Zed", "Bob"):
+            person = Person(name=name).save()
+            person.departments.connect(self.department)
+            self.persons.append(person)
+        self.persons[0].offered_expertise.connect(self.python)
+        self.persons[1].offered_expertise.connect(self.python)
+        self.persons[1].wanted_expertise.connect(self.python)
+
+    def test_counts(self):
+        response = self.client.get("/expertise/entity?id=" + self.python.pk)
+        data = response.json()
+        self.assertEqual(data["entity"]["properties"]["name"], "Python")
+        self.assertEqual(data["entity"]["counts"], {"OFFERS": 2, "WANTS": 1})
+        # distinct persons
+        self.assertEqual([person["name"] for person in data["persons"]], ["Anna", "Mia"])
+        self.assertIsNone(data["nextCursor"])
+
+        response = self.client.get(f"/expertise/entity?id={self.python.pk}&type=WANTS")
+        self.assertEqual([person["name"] for person in response.json()["persons"]], ["Anna"])
+
+    def test_pagination(self):
+        names = []
+        cursor = ""
+        for _ in range(3):
+            response = self.client.get(f"/expertise/entity?id={self.department.pk}&limit=2&after={cursor}")
+            data = response.json()
+            names += [person["name"] for person in data["persons"]]
+            cursor = data["nextCursor"]
+            if cursor is None:
+                break
+        self.assertEqual(names, ["Anna", "Bob", "Jake", "Mia", "Zed"])
+        self.assertEqual(data["entity"]["properties"]["alternatives"], ["CS"])
+
+    def test_errors(self):
+        response = self.client.get("/expertise/entity?id=doesNotExist")
+        self.assertEqual(response.status_code, 404)
+        for params in ("", f"id={self.python.pk}&after=abc", f"id={self.python.pk}&type=KNOWS"):
+            response = self.client.get("/expertise/entity?" + params)
+            self.assertEqual(response.status_code, 400)
+
+class LineageApiTestCase(Neo4jTestCase):
+    def setUp(self):
+        clear_neo4j_database(db)
+        self.person1 = Person(name="Adviso").save()
+        self.person2 = Person(name="Person").save()
+        self.person3 = Person(name="Jake").save()
+        self.person4 = Person(name="Mia").save()
+        # person3 -> person2 -> person1 and person3 -> person1
+        self.person2.advisors.connect(self.person1)
+        self.person3.advisors.connect(self.person2)
+        self.person3.advisors.connect(self.person1)
+        rebuild_closure(load_graph_index())
+
+    def get_lineage(self, person: Person, depth: int = 50) -> dict:
+        response = self.client.get(f"/expertise/lineage?id={person.pk}&depth={depth}")
+        return response.json()
+
+    def test_lineage(self):
+        data = self.get_lineage(self.person3)
+        self.assertEqual([(x["name"], x["depth"]) for x in data["ancestors"]], [("Adviso", 1), ("Person", 1)])
+        self.assertEqual(data["descendants"], [])
+        self.assertEqual(len(data["relationships"]), 3)
+
+        data = self.get_lineage(self.person1, 1)
+        self.assertEqual([x["name"] for x in data["descendants"]], ["Jake", "Person"])
+        # two paths from person3 to person1, one of each length
+        rows = AdvisorClosure.objects.filter(ancestor_id=self.person1.pk, descendant_id=self.person3.pk)
+        self.assertEqual(sorted(rows.values_list("depth", "paths")), [(1, 1), (2, 1)])
+
+    def test_cycle_is_rejected(self):
+        # person3 was advised by person1, so person3 can't be an advisor of person1
+        post_data = {
+            "action": "edit",
+            "personId": self.person1.pk,
+            "name": "Adviso",
+            "email": "a@a.com",
+            "advisors": [self.person3.pk, self.person4.pk],
+        }
+        response = self.client.post("/expertise/edit", post_data)
+        self.assertEqual(response.status_code, 422)
+        self.assertIn("Jake", response.json()["advisors"][0]["message"])
+        self.assertFalse(EditSubmission.objects.exists())
+
+    def test_update(self):
+        # person4 is advised by person3
+        update_advisors(self.person4.pk, [], [self.person3.pk])
+        data = self.get_lineage(self.person4)
+        self.assertEqual([(x["name"], x["depth"]) for x in data["ancestors"]], [("Jake", 1), ("Adviso", 2), ("Person", 2)])
+        data = self.get_lineage(self.person4, 1)
+        self.assertEqual([x["name"] for x in data["ancestors"]], ["Jake"])
+
+        remove_person_lineage(self.person3.pk)
+        self.assertEqual(self.get_lineage(self.person4)["ancestors"], [])
+        self.assertEqual([x["name"] for x in self.get_lineage(self.person1)["descendants"]], ["Person"])
+
+    def test_cycle(self):
+        update_advisors(self.person1.pk, [], [self.person3.pk])
+        self.assertEqual(self.get_lineage(self.person1)["ancestors"], [])
+
+    def test_invalid_depth(self):
+        response = self.client.get(f"/expertise/lineage?id={self.person1.pk}&depth=0")
+        self.assertEqual(response.status_code, 400)
+
+class CypherInstrumentationTestCase(Neo4jTestCase):
+    def setUp(self):
+        clear_neo4j_database(db)
+        self.person = Person(name="Jake").save()
+
+    def test_queries_are_recorded(self):
+        with record_queries() as outer:
+            with record_queries() as inner:
+                results, _ = db.cypher_query("MATCH (p:Person) WHERE p.pk IN $pks RETURN p", {"pks": [self.person.pk]})
+            Person.nodes.get(pk=self.person.pk)
+        self.assertEqual(len(inner), 1)
+        self.assertEqual(len(outer), 2)
+        self.assertEqual(inner[0].rows, 1)
+        self.assertEqual(inner[0].params_size, 1)
+        self.assertEqual(inner[0].query_hash, hash_query("MATCH (p:Person) WHERE p.pk IN $pks RETURN p"))
+
+    def test_server_timing_header(self):
+        response = self.client.get("/expertise/persons?search=")
+        self.assertRegex(response["Server-Timing"], r'cypher;dur=[0-9.]+;desc="[1-9][0-9]* queries')
+
+@override_settings(CYPHER_SLOW_QUERY_MS=0, CYPHER_SLOW_QUERY_SAMPLE_RATE=1)
+class SlowQueryTestCase(Neo4jTestCase):
+    def setUp(self):
+        clear_neo4j_database(db)
+        Person(name="Jake").save()
+        SlowQuery.objects.all().delete()
+
+    def test_read_query_is_profiled(self):
+        query = "MATCH (p:Person) WHERE p.name = $name RETURN p"
+        db.cypher_query(query, {"name": "Jake"})
+        db.cypher_query(query, {"name": "Jake"})
+        slow_query = SlowQuery.objects.get(query_hash=hash_query(query))
+        self.assertEqual(slow_query.count, 2)
+        self.assertEqual(slow_query.plan["rows"], 1)
+        self.assertGreater(slow_query.plan["db_hits"], 0)
+        self.assertEqual(slow_query.plan["operators"][0]["operator"], "ProduceResults")
+        self.assertNotIn("Jake", json.dumps(slow_query.plan))
+
+    def test_write_query_is_not_profiled(self):
+        query = "MATCH (p:Person) SET p.title = $title"
+        db.cypher_query(query, {"title": "Prof"})
+        slow_query = SlowQuery.objects.get(query_hash=hash_query(query))
+        self.assertIsNone(slow_query.plan)
+        self.assertIsNone(slow_query.profile_date)
+
+    def test_profile_is_rate_limited(self):
+        query = "MATCH (p:Person) RETURN p"
+        db.cypher_query(query)
+        profile_date = SlowQuery.objects.get(query_hash=hash_query(query)).profile_date
+        db.cypher_query(query)
+        self.assertEqual(SlowQuery.objects.get(query_hash=hash_query(query)).profile_date, profile_date)
+
+    def test_staff_only(self):
+        db.cypher_query("MATCH (p:Person) RETURN p")
+        user = User.objects.create_user(username="user")
+        self.client.force_login(user)
+        self.assertEqual(self.client.get("/expertise/slow-queries").status_code, 302)
+        user.is_staff = True
+        user.save()
+        response = self.client.get("/expertise/slow-queries")
+        self.assertContains(response, "MATCH (p:Person) RETURN p")
+        self.assertContains(response, "ProduceResults")
+
+@override_settings(CYPHER_SLOW_QUERY_SAMPLE_RATE=1)
+class SlowQueryProfileTestCase(TestCase):
+    plan = {"db_hits": 1, "rows": 1, "operators": []}
+
+    def test_profile_after_response(self):
+        with mock.patch("expertise.slow_queries.profile_query", return_value=self.plan) as profile_query:
+            record_slow_query("a", "MATCH (p:Person) RETURN p", None, 0, 1.0, "/expertise/")
+            profile_query.assert_not_called()
+            self.assertIsNotNone(SlowQuery.objects.get(query_hash="a").profile_date)
+            request_finished.send(sender=self.__class__)
+            profile_query.assert_called_once_with("MATCH (p:Person) RETURN p", None)
+        self.assertEqual(SlowQuery.objects.get(query_hash="a").plan, self.plan)
+
+class ProfilingMiddlewareTestCase(Neo4jTestCase):
+    def setUp(self):
+        clear_neo4j_database(db)
+        Person(name="Jake").save()
+        self.user = User.objects.create_user(username="user")
+        self.client.force_login(self.user)
+
+    def test_only_staff(self):
+        response = self.client.get("/expertise/?profile=text")
+        self.assertEqual(response["Content-Type"], "text/html; charset=utf-8")
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get("/expertise/?profile=text")
+        self.assertEqual(response["Content-Type"], "text/plain; charset=utf-8")
+        report = response.content.decode()
+        self.assertIn("GET /expertise/?profile=text: status 200", report)
+        self.assertRegex(report, r"templates +[0-9.]+ ms +1 calls")
+        self.assertRegex(report, r"cypher queries +[0-9.]+ ms +[1-9][0-9]* calls")
+
+    def test_stats_file(self):
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get("/expertise/persons", HTTP_X_PROFILE="prof")
+        stats = marshal.loads(response.content)
+        self.assertTrue(any(name == "persons_api" for _, _, name in stats))
+
+class MetricsTestCase(Neo4jTestCase):
+    def setUp(self):
+        clear_neo4j_database(db)
+        Person(name="Jake").save()
+
+    def test_metrics(self):
+        self.client.get("/expertise/persons?search=")
+        self.client.get("/expertise/persons?search=")
+        self.client.get("/expertise/no-view")
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn("# TYPE expertise_request_duration_seconds histogram", text)
+        self.assertRegex(text, r'expertise_request_duration_seconds_count\{view="persons"\} [2-9]')
+        self.assertIn('expertise_request_duration_seconds_bucket{view="persons",le="+Inf"}', text)
+        self.assertIn('expertise_responses_total{status="404",view="unknown"}', text)
+        self.assertRegex(text, r'expertise_cypher_queries_total\{view="persons"\} [1-9]')
+        self.assertRegex(text, r'expertise_response_size_bytes_sum\{view="persons"\} [1-9]')
+        self.assertIn("expertise_pending_edit_submissions 0", text)
+        # the buckets of a histogram are in increasing order
+        bounds = re.findall(r'expertise_request_duration_seconds_bucket\{view="persons",le="([^"]+)"\}', text)
+        self.assertEqual(bounds, sorted(bounds, key=float))
+
+    def test_streaming_size(self):
+        with override_settings(LEAN_PERSONS_PAYLOAD=True):
+            response = self.client.get("/expertise/persons?search=")
+            size = len(b"".join(response.streaming_content))
+        text = self.client.get("/metrics").content.decode()
+        sizes = re.findall(r'expertise_response_size_bytes_sum\{view="persons"\} ([0-9.]+)', text)
+        self.assertEqual(len(sizes), 1)
+        self.assertGreaterEqual(float(sizes[0]), size)
+
+    def test_only_local(self):
+        response = self.client.get("/metrics", REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(response.status_code, 403)
+
+class SyntheticGraphTestCase(Neo4jTestCase):
+    def setUp(self):
+        clear_neo4j_database(db)
+
+    def test_deterministic(self):
+        graph1 = generate_graph(300, seed=1)
+        graph2 = generate_graph(300, seed=1)
+        self.assertEqual(graph1, graph2)
+        self.assertNotEqual(graph1, generate_graph(300, seed=2))
+
+    def test_write(self):
+        graph = generate_graph(100, seed=1)
+        write_graph(graph, batch_size=40)
+        self.assertEqual(len(Person.nodes.all()), 100)
+        self.assertEqual(len(Department.nodes.all()), len(graph["nodes"][Department]))
+        advisors = next(rows for _, rel_type, _, rows in graph["relationships"] if rel_type == "ADVISED_BY")
+        results, _ = db.cypher_query("MATCH (:Person)-[r:ADVISED_BY]->(:Person) RETURN count(r)")
+        self.assertEqual(results[0][0], len(advisors))
+        # no cycles
+        results, _ = db.cypher_query("MATCH (p:Person)-[:ADVISED_BY*]->(p) RETURN count(p)")
+        self.assertEqual(results[0][0], 0)
+
+@override_settings(GRAPH_STORE="expertise.graph_store.MemoryGraphStore")
+class MemoryGraphStoreTestCase(TestCase):
+    def setUp(self):
+        clear_graph_stores()
+        clear_graph_index()
+        self.store = get_graph_store()
+        self.store.create_node("Person", pk="p1", name="Adviso", title="Prof", email="a@a.com")
+        self.store.create_node("Person", pk="p2", name="Jake", title="", email="j@j.com")
+        self.store.create_node("ResearchInterest", pk="i1", name="biology")
+        self.store.create_node("Department", pk="d1", name="ZIH")
+        self.store.connect("p1", "INTERESTED_IN", "i1")
+        self.store.connect("p2", "INTERESTED_IN", "i1")
+        self.store.connect("p2", "MEMBER_OF", "d1")
+        self.store.connect("p2", "ADVISED_BY", "p1")
+
+    def tearDown(self):
+        clear_graph_stores()
+        clear_graph_index()
+
+    def test_persons_api(self):
+        with assert_max_cypher_queries(self, 0):
+            response = self.client.get("/expertise/persons?search=biology&search=zih")
+        data = response.json()
+        self.assertEqual([x["person"]["name"] for x in data["persons"]], ["Jake"])
+        self.assertEqual(data["persons"][0]["advisors"], [{"name": "Adviso", "title": "Prof", "pk": "p1"}])
+        self.assertEqual(data["persons"][0]["departments"], [{"name": "ZIH", "pk": "d1"}])
+
+    def test_graph_api(self):
+        with assert_max_cypher_queries(self, 0):
+            response = self.client.get("/expertise/graph?id=p1&depth=2")
+        data = response.json()["graph"]
+        self.assertCountEqual([node["id"] for node in data["nodes"]], ["p1", "p2", "i1", "d1"])
+        self.assertEqual(len(data["relationships"]), 4)
+
+        self.store.disconnect("p2", "MEMBER_OF", "d1")
+        data = self.client.get("/expertise/graph?id=p2").json()["graph"]
+        self.assertCountEqual([node["id"] for node in data["nodes"]], ["p1", "p2", "i1"])
+
+    def test_graph_api_truncated(self):
+        data = self.client.get("/expertise/graph?id=p1&depth=2").json()["graph"]
+        self.assertFalse(data["truncated"])
+        with override_settings(GRAPH_MAX_NODES_PER_HOP=1):
+            data = self.client.get("/expertise/graph?id=p1&depth=2").json()["graph"]
+        self.assertTrue(data["truncated"])
+        self.assertLess(len(data["nodes"]), 4)
+
+    def test_transaction(self):
+        with self.assertRaises(ValueError):
+            with self.store.transaction():
+                self.store.delete_node("p1")
+                self.store.create_node("Person", pk="p2", name="Duplicate")
+        self.assertEqual(self.store.neighbor_counts("p1"), {"ResearchInterest": 1, "Person": 1})
+        self.assertEqual(len(load_graph_index()), 4)
+
 def get_submission_from_person_id(person_id: str) -> EditSubmission:
     return EditSubmission.objects.get(person_id_new=person_id)
 
@@ -288,7 +1150,7 @@ def get_post_data(submission: EditSubmission, decision) -> dict[str, str | Seque
     post_data["submissionId"] = submission.id
     return post_data
 
-class EditTestCase(TestCase):
+class EditTestCase(Neo4jTestCase):
     def setUp(self):
         create_group_and_user(self)
         clear_neo4j_database(db)
@@ -580,7 +1442,7 @@ class EditTestCase(TestCase):
         self.assertEqual(len(ResearchInterest.nodes.all()), 1)
         self.assertEqual(len(Expertise.nodes.all()), 1)
 
-class EditSubmissionTestCase(TestCase):
+class EditSubmissionTestCase(Neo4jTestCase):
     def setUp(self):
         create_group_and_user(self)
         clear_neo4j_database(db)
@@ -974,6 +1836,26 @@ class EditSubmissionTestCase(TestCase):
         choices = field_new_offered.field.choices
         self.assertEqual(len(choices), 3)
 
+    def test_approve_page_query_count(self):
+        # the choices are queried once for all forms
+        self.user.groups.add(self.group)
+        self.client.login(username=self.user.username, password=self.password)
+        for count in (1, 10):
+            for person in create_persons(count):
+                post_data = {
+                    "action": "edit",
+                    "personId": person.pk,
+                    "name": person.name,
+                    "email": person.email,
+                    "offered": ["new expertise"],
+                }
+                self.client.post("/expertise/edit", post_data)
+            with assert_max_cypher_queries(self, 7):
+                response = self.client.get("/expertise/approve")
+            self.assertEqual(len(response.context["forms"]), EditSubmission.objects.count())
+            clear_neo4j_database(db)
+            EditSubmission.objects.all().delete()
+
     def test_permission_required(self):
         post_data = {
             "personId": "",
@@ -991,7 +1873,7 @@ class EditSubmissionTestCase(TestCase):
 
     # test graph api for two connections between two nodes, e.g. person A -> expertise 1 twice (wanted/offered)
 
-class ShortenLinkTestCase(TestCase):
+class ShortenLinkTestCase(Neo4jTestCase):
     def setUp(self):
         clear_neo4j_database(db)
 
@@ -1056,3 +1938,123 @@ class ShortenLinkTestCase(TestCase):
         self.assertEqual(response.context["selected_options"], [])
         self.assertEqual(response.context["table_data"], json.dumps([]))
         self.assertEqual(json.loads(response.context["search"]), [])
+
+class GraphChangeTestCase(Neo4jTestCase):
+    def setUp(self):
+        create_group_and_user(self)
+        clear_neo4j_database(db)
+        self.group.permissions.add(Permission.objects.get(codename="view_graphchange"))
+        self.user.groups.add(self.group)
+        self.client.login(username=self.user.username, password=self.password)
+
+    def test_approved_edit_is_recorded(self):
+        person = Person(name="Jake", email="a@a.com").save()
+        exp1 = Expertise(name="expertise").save()
+        person.offered_expertise.connect(exp1)
+        post_data = {
+            "action": "edit",
+            "personId": person.pk,
+            "name": person.name,
+            "email": person.email,
+            "offered": ["new expertise"],
+        }
+        self.client.post("/expertise/edit", post_data)
+        self.assertEqual(get_graph_version(), 0)
+
+        submission = get_submission_from_person_id(person.pk)
+        self.client.post("/expertise/approve", get_post_data(submission, "approve"))
+
+        change = GraphChange.objects.get()
+        new_expertise = Expertise.nodes.get(name="new expertise")
+        self.assertEqual(change.action, "edit")
+        self.assertEqual(change.person_id, person.pk)
+        self.assertEqual(change.previous_data["offered"], [exp1.pk])
+        self.assertEqual(change.data["offered"], [new_expertise.pk])
+        self.assertEqual(get_graph_version(), change.id)
+
+        response = self.client.get("/expertise/changes?after=0")
+        data = response.json()
+        self.assertEqual(len(data["changes"]), 1)
+        self.assertEqual(data["cursor"], change.id)
+        self.assertEqual(data["changes"][0]["delta"]["offered"], {
+            "added": [new_expertise.pk],
+            "removed": [exp1.pk],
+        })
+
+        response = self.client.get(f"/expertise/changes?after={change.id}")
+        data = response.json()
+        self.assertEqual(data["changes"], [])
+        self.assertEqual(data["cursor"], change.id)
+
+    def test_failed_recording_rolls_back(self):
+        person = Person(name="Jake", email="a@a.com").save()
+        post_data = {
+            "action": "edit",
+            "personId": person.pk,
+            "name": "Jake Changed",
+            "email": person.email,
+        }
+        self.client.post("/expertise/edit", post_data)
+        submission = get_submission_from_person_id(person.pk)
+        with mock.patch("expertise.views.record_change", side_effect=DatabaseError("disk full")):
+            response = self.client.post("/expertise/approve", get_post_data(submission, "approve"))
+        self.assertEqual(response.status_code, 422)
+        # the Neo4j transaction was rolled back, so the next one can begin
+        db.begin()
+        db.rollback()
+        self.assertEqual(Person.nodes.get(pk=person.pk).name, "Jake")
+        self.assertTrue(EditSubmission.objects.filter(pk=submission.pk).exists())
+
+        # the delete path
+        with mock.patch("expertise.views.remove_person_signature", side_effect=DatabaseError("disk full")):
+            with self.assertRaises(DatabaseError):
+                self.client.post(
+                    "/expertise/approve",
+                    {"decision": "approve", "action": "delete", "submissionId": submission.pk},
+                )
+        db.begin()
+        db.rollback()
+        self.assertEqual(len(Person.nodes.filter(pk=person.pk)), 1)
+
+    def test_rejected_edit_is_not_recorded(self):
+        post_data = {
+            "action": "edit",
+            "personId": "",
+            "name": "new person",
+            "email": "a@a.com",
+        }
+        self.client.post("/expertise/edit", post_data)
+        submission = get_submission_from_person_email("a@a.com", "new person")
+        self.client.post("/expertise/approve", get_post_data(submission, "reject"))
+        self.assertEqual(GraphChange.objects.count(), 0)
+
+    def test_deletion_is_recorded(self):
+        person = Person(name="Jake", email="a@a.com").save()
+        data = {
+            "name": person.name,
+            "email": person.email,
+        }
+        form = EditForm(data)
+        form.is_valid()
+        save_submission(person, form.cleaned_data, "delete")
+        submission_data = get_post_data(get_submission_from_person_id(person.pk), "approve")
+        submission_data["action"] = "delete"
+        self.client.post("/expertise/approve", submission_data)
+
+        change = GraphChange.objects.get()
+        self.assertEqual(change.action, "delete")
+        self.assertEqual(change.data, {})
+        self.assertEqual(change.previous_data["email"], "a@a.com")
+
+    def test_compaction_keeps_latest(self):
+        for i in range(3):
+            GraphChange.objects.create(action="edit", person_id=str(i))
+        latest = get_graph_version()
+        deleted = compact_changes(timezone.now())
+        self.assertEqual(deleted, 2)
+        self.assertEqual(get_graph_version(), latest)
+
+    def test_permission_required(self):
+        self.client.logout()
+        response = self.client.get("/expertise/changes")
+        self.assertRedirects(response, "/login/?next=/expertise/changes")
@@ -9,7 +9,19 @@ urlpatterns = [
     path('edit', views.edit, name='edit'),
     path('persons', views.persons_api, name='persons'),
     path('graph', views.graph_api, name='graph'),
+    path('graph/neighbors', views.graph_neighbors_api, name='graph-neighbors'),
+    path('graph/overview', views.graph_overview_api, name='graph-overview'),
+    path('graph/subgraph', views.graph_subgraph_api, name='graph-subgraph'),
+    path('path', views.path_api, name='path'),
+    path('matches', views.matches_api, name='matches'),
+    path('similar', views.similar_api, name='similar'),
+    path('related', views.related_api, name='related'),
+    path('entity', views.entity_api, name='entity'),
+    path('lineage', views.lineage_api, name='lineage'),
     path('approve', views.approve, name='approve'),
     path('shorten', views.shorten, name='share'),
+    path('changes', views.changes_api, name='changes'),
+    path('slow-queries', views.slow_queries, name='slow-queries'),
+    path('metrics', views.metrics_view, name='metrics'),
     path('about', TemplateView.as_view(template_name='expertise/about.html'), name='about'),
 ]
@@ -1,14 +1,20 @@
 from typing import Any, Sequence
+from datetime import timedelta
+import base64
 import json
 import logging
+import time
 
 from django.shortcuts import render
-from django.http import HttpResponse, JsonResponse, QueryDict
+from django.http import HttpResponse, JsonResponse, QueryDict, StreamingHttpResponse
 from django.db.models import Q
-from django.db import IntegrityError, DatabaseError
+from django.db import IntegrityError, DatabaseError, transaction
 from django.conf import settings
 from django.contrib.auth.decorators import permission_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import ValidationError
 from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
 from neomodel import db, NeomodelException, RelationshipTo
 from django_neomodel import DjangoNode
 
@@ -22,14 +28,58 @@ from expertise.models import (
     Expertise,
     EditSubmission,
     ShareParameters,
+    PersonSignature,
+    SlowQuery,
 )
 
-from expertise.forms import EditForm
+from expertise import metrics
+from expertise.forms import EditForm, get_all_choices
+from expertise.changes import record_change, get_changes, serialize_change, MAX_CHANGES_PER_PAGE, get_graph_version
+from expertise.layout import get_graph_layout
+from expertise.graph_index import get_graph_index, DEFAULT_INDEX_MAX_AGE
+from expertise.graph_store import get_graph_store
+from expertise.payload import iter_persons_json
+from expertise.paths import k_shortest_paths
+from expertise.matching import get_matches, DEFAULT_TOP_MATCHES
+from expertise.similarity import (
+    get_similar_persons,
+    get_tokens,
+    update_person_signature,
+    remove_person_signature,
+    DEFAULT_SIMILAR_PERSONS,
+)
+from expertise.cooccurrence import get_related_topics, update_cooccurrence, DEFAULT_RELATED_TOPICS
+from expertise.centrality import get_pageranks, get_centrality_version
+from expertise.communities import get_overview_data
+from expertise.subgraph import get_subgraph_data, parse_filters
+from expertise.lineage import get_cycle_advisors, get_lineage, update_advisors, remove_person_lineage, MAX_LINEAGE_DEPTH
 
 logger = logging.getLogger(__name__)
 
 # this shouldn't be used to trim an error message if it is a custom message
 MAX_ERROR_LENGTH = 130
+MAX_GRAPH_DEPTH = 3
+MAX_GRAPH_IDS = 20
+DEFAULT_MAX_NODES_PER_HOP = 500
+DEFAULT_MAX_NEIGHBORS = 50
+MAX_PATH_LENGTH = 8
+MAX_PATHS = 5
+DEFAULT_MEMBERS_PER_PAGE = 50
+MAX_MEMBERS_PER_PAGE = 200
+MAX_SLOW_QUERIES = 100
+# relationships from persons to other nodes
+PERSON_RELATIONSHIP_TYPES = ("INTERESTED_IN", "MEMBER_OF", "OFFERS", "WANTS", "HAS", "ADVISED_BY")
+
+# names for the aggregate nodes that summarize the neighbors that are not shown
+GRAPH_LABEL_NAMES = {
+    "Person": "persons",
+    "ResearchInterest": "topics of interest",
+    "Institute": "institutions",
+    "Faculty": "faculties, centers",
+    "Department": "departments, groups",
+    "Role": "roles",
+    "Expertise": "expertise",
+}
 
 class ErrorDict(dict):
     """similar to format of django form errors"""
@@ -53,6 +103,9 @@ class ErrorDict(dict):
         else:
             self[field] = [error]
 
+# (graph and centrality version, time of loading, suggestions)
+_cached_suggestions: tuple[tuple[int, int], float, dict] | None = None
+
 def get_advisor_suggestions():
     query = (
         "MATCH (p:Person) "
@@ -64,6 +117,23 @@ def get_advisor_suggestions():
     return advisors
 
 def get_suggestions() -> dict:
+    """returns the cached suggestions, they are loaded again when the graph version or the
+    centrality scores change and at least every GRAPH_INDEX_MAX_AGE seconds because
+    changes that aren't approved submissions don't change the version"""
+    global _cached_suggestions
+    key = (get_graph_version(), get_centrality_version())
+    max_age = getattr(settings, "GRAPH_INDEX_MAX_AGE", DEFAULT_INDEX_MAX_AGE)
+    if (_cached_suggestions is None
+            or _cached_suggestions[0] != key
+            or time.monotonic() - _cached_suggestions[1] > max_age):
+        _cached_suggestions = (key, time.monotonic(), load_suggestions())
+    return _cached_suggestions[2]
+
+def clear_suggestions() -> None:
+    global _cached_suggestions
+    _cached_suggestions = None
+
+def load_suggestions() -> dict:
     """returns data of all nodes
 
     the lists with persons and expertise contain all persons/expertise entries.
@@ -72,6 +142,7 @@ def get_suggestions() -> dict:
     only the people that are actually advise someone are returned for advisors.
     """
     expertise_nodes = Expertise.nodes.all()
+    pageranks = get_pageranks()
     suggestions = {
         "persons": {
             "class": "person",
@@ -119,6 +190,9 @@ def get_suggestions() -> dict:
             "options": expertise_nodes,
         },
     }
+    # the most central nodes first, the order stays the same without computed scores
+    for item in suggestions.values():
+        item["options"] = sorted(item["options"], key=lambda node: -pageranks.get(node.pk, 0))
     return suggestions
 
 def convert_node_list(nodes) -> list[dict[str, DjangoNode]]:
@@ -129,8 +203,9 @@ def get_surname(name: str) -> str:
 
 def get_all_person_data(persons: list) -> list[dict]:
     entries = []
+    connected = get_graph_store().connected_of(persons)
     for person in persons:
-        data = person.all_connected()
+        data = connected[person.pk]
         data["person"] = {
                 "name": person.name,
                 "title": person.title,
@@ -155,21 +230,12 @@ def get_all_person_data(persons: list) -> list[dict]:
     entries.sort(key=lambda x: get_surname(x["person"]["name"]))
     return entries
 
-def get_filtered_data(search_phrases: list[str]) -> list[dict]:
+def find_persons(search_phrases: list[str]) -> list:
     search_phrases = [x.lower() for x in search_phrases if x != ""]
-    if not search_phrases:
-        matching_persons = Person.nodes.all()
-    else:
-        # this doesn't search properties of persons and advisors because I think it's not useful
-        query = (
-            "MATCH (p:Person)--(n) "
-            "WITH p, COLLECT(n.name) + p.name AS names "
-            "WHERE ALL(phrase IN $searchPhrases WHERE ANY(name IN names WHERE toLower(name) CONTAINS phrase)) "
-            "RETURN DISTINCT p;"
-        )
-        results, _ = db.cypher_query(query, {"searchPhrases": search_phrases}, resolve_objects=True)
-        matching_persons = [row[0] for row in results]
-    return get_all_person_data(matching_persons)
+    return list(get_graph_store().search_persons(search_phrases))
+
+def get_filtered_data(search_phrases: list[str]) -> list[dict]:
+    return get_all_person_data(find_persons(search_phrases))
 
 def format_nodes_for_graph(nodes):
     # the primary keys instead of node ids are used because it's
@@ -188,31 +254,312 @@ def format_rels_for_graph(rels):
             "type": rel.type}
             for rel in rels]
 
-def get_graph_data(node_id: str) -> dict:
-    nodes, rels = query_graph_data(node_id)
+def get_graph_data(
+        node_id: str,
+        depth: int = 1,
+        known_ids: Sequence[str] = (),
+        with_layout: bool = False,
+    ) -> dict:
+    """
+    if the node has more than GRAPH_MAX_NEIGHBORS neighbors, only the neighbors with the
+    highest degree are returned and the rest is summarized in one aggregate node per label.
+    "truncated" is true if GRAPH_MAX_NODES_PER_HOP left out nodes
+
+    Args:
+        known_ids (Sequence[str]): primary keys of the nodes the client already has. these
+            nodes are only listed in "knownNodes" and not returned again. the relationships
+            are always complete because the client can't know which of them are new
+        with_layout (bool): add the coordinates of all nodes, including the known nodes
+    """
+    max_neighbors = getattr(settings, "GRAPH_MAX_NEIGHBORS", DEFAULT_MAX_NEIGHBORS)
+    neighbor_counts = get_graph_store().neighbor_counts(node_id)
+    is_hub = sum(neighbor_counts.values()) > max_neighbors
+    nodes, rels, truncated = query_graph_data(node_id, depth, max_neighbors if is_hub else None)
     graph_data = {}
     graph_data["nodes"] = format_nodes_for_graph(nodes)
     graph_data["relationships"] = format_rels_for_graph(rels)
+    graph_data["truncated"] = truncated
+    add_pageranks(graph_data["nodes"])
+    if is_hub:
+        shown_counts = count_neighbors_by_label(node_id, rels)
+        aggregate_nodes, aggregate_rels = get_aggregate_nodes(node_id, neighbor_counts, shown_counts)
+        graph_data["nodes"] += aggregate_nodes
+        graph_data["relationships"] += aggregate_rels
+    return finish_graph_data(graph_data, f"{node_id}:{depth}", known_ids, with_layout)
+
+def get_batch_graph_data(
+        node_ids: Sequence[str],
+        depth: int = 1,
+        known_ids: Sequence[str] = (),
+        with_layout: bool = False,
+    ) -> dict:
+    """merged neighborhood of several nodes, e.g. of a team. each hop is one query for all
+    nodes, so there is no sampling of the neighbors of hub nodes like in get_graph_data
+    and only GRAPH_MAX_NODES_PER_HOP limits the result"""
+    nodes = {}
+    rels = {}
+    truncated = expand_graph_data(list(node_ids), depth, nodes, rels)
+    graph_data = {}
+    graph_data["nodes"] = format_nodes_for_graph(nodes.values())
+    graph_data["relationships"] = format_rels_for_graph(rels.values())
+    graph_data["truncated"] = truncated
+    add_pageranks(graph_data["nodes"])
+    return finish_graph_data(graph_data, f"{','.join(sorted(node_ids))}:{depth}", known_ids, with_layout)
+
+def finish_graph_data(graph_data: dict, layout_key: str, known_ids: Sequence[str], with_layout: bool) -> dict:
+    """add the layout and leave out the known nodes, see get_graph_data"""
+    if with_layout:
+        graph_data["layout"] = get_graph_layout(layout_key, graph_data)
+    if known_ids:
+        known_ids = set(known_ids)
+        graph_data["knownNodes"] = [node["id"] for node in graph_data["nodes"] if node["id"] in known_ids]
+        graph_data["nodes"] = [node for node in graph_data["nodes"] if node["id"] not in known_ids]
     return graph_data
 
-def query_graph_data(node_id: str) -> tuple[set[Any], list[Any]] :
+def add_pageranks(formatted_nodes: list[dict]) -> None:
+    """add the stored PageRank to the properties of the nodes, e.g. for their size"""
+    pageranks = get_pageranks(node["id"] for node in formatted_nodes)
+    for node in formatted_nodes:
+        if node["id"] in pageranks:
+            node["properties"]["pagerank"] = pageranks[node["id"]]
+
+def get_neighbors_page(node_id: str, label: str, offset: int, limit: int) -> dict:
+    """returns a page of the neighbors with the label in the order of get_graph_data and an
+    aggregate node for the neighbors after the page"""
+    store = get_graph_store()
+    total = store.neighbor_counts(node_id).get(label, 0)
+    results = store.top_neighbors(node_id, limit, label, offset)
+    nodes = {}
+    rels = {}
+    add_graph_rows(results, nodes, rels, limit)
+    graph_data = {
+        "nodes": format_nodes_for_graph(nodes.values()),
+        "relationships": format_rels_for_graph(rels.values()),
+    }
+    add_pageranks(graph_data["nodes"])
+    next_offset = offset + limit
+    if next_offset < total:
+        aggregate_nodes, aggregate_rels = get_aggregate_nodes(node_id, {label: total}, {label: next_offset})
+        graph_data["nodes"] += aggregate_nodes
+        graph_data["relationships"] += aggregate_rels
+    return {
+        "graph": graph_data,
+        "nextOffset": next_offset if next_offset < total else None,
+    }
+
+def count_neighbors_by_label(node_id: str, rels: Sequence[Any]) -> dict[str, int]:
+    neighbors = {}
+    for rel in rels:
+        start, end = rel.nodes
+        if start.get("pk") == node_id:
+            neighbors[end.id] = end
+        elif end.get("pk") == node_id:
+            neighbors[start.id] = start
+    counts = {}
+    for neighbor in neighbors.values():
+        label = list(neighbor.labels)[0]
+        counts[label] = counts.get(label, 0) + 1
+    return counts
+
+def get_aggregate_nodes(
+        node_id: str,
+        neighbor_counts: dict[str, int],
+        shown_counts: dict[str, int],
+    ) -> tuple[list[dict], list[dict]]:
+    """returns placeholder nodes in the format of format_nodes_for_graph for the neighbors
+    that are not shown and the relationships to them. the "aggregate" entry has the
+    parameters for requesting the next page"""
+    nodes = []
+    rels = []
+    for label, total in neighbor_counts.items():
+        shown = shown_counts.get(label, 0)
+        if total <= shown:
+            continue
+        aggregate_id = f"more-{label}-{node_id}"
+        nodes.append({
+            "id": aggregate_id,
+            "properties": {
+                "name": f"{total - shown} more {GRAPH_LABEL_NAMES.get(label, label)}",
+            },
+            "labels": ["Aggregate", label],
+            "aggregate": {
+                "origin": node_id,
+                "label": label,
+                "offset": shown,
+                "count": total - shown,
+            },
+        })
+        rels.append({"startNode": node_id, "endNode": aggregate_id, "type": "MORE"})
+    return nodes, rels
+
+def add_graph_rows(results: Sequence[Sequence[Any]], nodes: dict, rels: dict, max_new_nodes: int) -> list[str]:
+    """add the rows (n1, r, n2) to the dicts of nodes and relationships and return the
+    primary keys of the new neighbors
+
+    the ids are used as keys because nodes from different queries are never equal
+    """
+    new_pks = []
+    for origin, rel, neighbor in results:
+        nodes.setdefault(origin.id, origin)
+        if neighbor.id not in nodes:
+            if len(new_pks) >= max_new_nodes:
+                continue
+            nodes[neighbor.id] = neighbor
+            new_pks.append(neighbor.get("pk"))
+        rels[rel.id] = rel
+    return new_pks
+
+def query_graph_data(
+        node_id: str,
+        depth: int = 1,
+        max_neighbors: int | None = None,
+    ) -> tuple[list[Any], list[Any], bool]:
+    """breadth-first expansion from the node with one query per hop
+
+    at most GRAPH_MAX_NODES_PER_HOP new nodes are added per hop so that the result
+    stays bounded near nodes with many relationships, the bool is true if nodes were
+    left out because of it
+
+    Args:
+        max_neighbors (int | None): if set, only this many neighbors of the node with the
+            highest degree are expanded
+    """
+    nodes = {}
+    rels = {}
+    frontier = [node_id]
+    if max_neighbors is not None:
+        results = get_graph_store().top_neighbors(node_id, max_neighbors)
+        frontier = add_graph_rows(results, nodes, rels, max_neighbors)
+        depth -= 1
+    truncated = expand_graph_data(frontier, depth, nodes, rels)
+    return list(nodes.values()), list(rels.values()), truncated
+
+def expand_graph_data(frontier: list[str], depth: int, nodes: dict, rels: dict) -> bool:
+    """add depth hops from the frontier nodes to the dicts of add_graph_rows and return
+    whether GRAPH_MAX_NODES_PER_HOP left out nodes or relationships"""
+    max_nodes = getattr(settings, "GRAPH_MAX_NODES_PER_HOP", DEFAULT_MAX_NODES_PER_HOP)
+    truncated = False
+    for _ in range(depth):
+        if not frontier:
+            break
+        # more rows than nodes because two nodes can have multiple relationships
+        results = get_graph_store().relationship_rows(frontier, 2 * max_nodes)
+        frontier = add_graph_rows(results, nodes, rels, max_nodes)
+        truncated = truncated or len(results) >= 2 * max_nodes or any(
+            neighbor.id not in nodes for _, _, neighbor in results
+        )
+    return truncated
+
+def encode_members_cursor(name: str, pk: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([name, pk]).encode()).decode()
+
+def decode_members_cursor(cursor: str) -> tuple[str, str]:
+    """
+    Raises:
+        ValueError: if the cursor wasn't created by encode_members_cursor
+    """
+    try:
+        name, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError) as e:
+        raise ValueError("invalid cursor") from e
+    if not isinstance(name, str) or not isinstance(pk, str):
+        raise ValueError("invalid cursor")
+    return name, pk
+
+def get_entity_data(node_id: str) -> dict | None:
+    """returns the node in the format of format_nodes_for_graph with its alternative names
+    and the number of persons per relationship type to the node or None if it doesn't exist"""
     query = (
-        "MATCH (n1)-[r*1]-(n2) "
-        "WHERE n1.pk=$id "
-        "RETURN n1, r, n2"
+        "MATCH (n) "
+        "WHERE n.pk=$id "
+        "OPTIONAL MATCH (n)<-[r]-(p:Person) "
+        "RETURN n, type(r), count(DISTINCT p)"
     )
     results, _ = db.cypher_query(query, {"id": node_id})
-    nodes = set()
-    rels = []
-    if results:
-        # add the origin node
-        nodes.add(results[0][0])
-    for row in results:
-        # last relationship in the path/traversal
-        rel = row[1][-1]
-        rels.append(rel)
-        nodes.add(row[2])
-    return nodes, rels
+    if not results:
+        return None
+    node = results[0][0]
+    entity = format_nodes_for_graph([node])[0]
+    entity["properties"]["alternatives"] = node.get("alternatives") or []
+    entity["counts"] = {rel_type: count for _, rel_type, count in results if rel_type is not None}
+    return entity
+
+def query_entity_members(
+        node_id: str,
+        rel_type: str | None,
+        after: tuple[str, str] | None,
+        limit: int,
+    ) -> tuple[list[dict], str | None]:
+    """returns a page of the persons connected to the node ordered by name and the cursor
+    for the next page. the cursor is the last name and primary key, so changes in earlier
+    pages don't shift the following pages"""
+    query = (
+        "MATCH (n)<-[r]-(p:Person) "
+        "WHERE n.pk=$id AND ($type IS NULL OR type(r)=$type) "
+        "WITH DISTINCT p "
+        "WHERE $afterName IS NULL OR p.name > $afterName OR (p.name = $afterName AND p.pk > $afterPk) "
+        "RETURN p.pk, p.name, p.title "
+        "ORDER BY p.name, p.pk "
+        "LIMIT $limit"
+    )
+    params = {
+        "id": node_id,
+        "type": rel_type,
+        "afterName": after[0] if after else None,
+        "afterPk": after[1] if after else None,
+        # one more to know if there is a next page
+        "limit": limit + 1,
+    }
+    results, _ = db.cypher_query(query, params)
+    persons = [{"pk": pk, "name": name, "title": title} for pk, name, title in results[:limit]]
+    next_cursor = None
+    if len(results) > limit:
+        next_cursor = encode_members_cursor(persons[-1]["name"], persons[-1]["pk"])
+    return persons, next_cursor
+
+def get_path_data(source_id: str, target_id: str, k: int = 1) -> dict:
+    """returns the k shortest paths between the nodes as lists of primary keys and the
+    nodes and relationships of the paths in the format of get_graph_data"""
+    index = get_graph_index()
+    if source_id not in index.index or target_id not in index.index:
+        # the node might have been created after the index was loaded
+        return query_shortest_path(source_id, target_id)
+
+    paths = k_shortest_paths(index, index.index[source_id], index.index[target_id], k, MAX_PATH_LENGTH)
+    nodes = {}
+    rels = {}
+    for path_nodes, path_rels in paths:
+        nodes.update(dict.fromkeys(path_nodes))
+        rels.update(dict.fromkeys(path_rels))
+    return {
+        "graph": {
+            "nodes": index.format_nodes(nodes),
+            "relationships": index.format_rels(rels),
+        },
+        "paths": [[index.pks[node] for node in path_nodes] for path_nodes, _ in paths],
+    }
+
+def query_shortest_path(source_id: str, target_id: str) -> dict:
+    """fallback for get_path_data that only returns one path"""
+    query = (
+        "MATCH (n1 {pk: $source}), (n2 {pk: $target}), "
+        f"p = shortestPath((n1)-[*..{MAX_PATH_LENGTH}]-(n2)) "
+        "RETURN nodes(p), relationships(p)"
+    )
+    # shortestPath fails for the same start and end node
+    if source_id == target_id:
+        return {"graph": {"nodes": [], "relationships": []}, "paths": []}
+    results, _ = db.cypher_query(query, {"source": source_id, "target": target_id})
+    if not results:
+        return {"graph": {"nodes": [], "relationships": []}, "paths": []}
+    nodes, rels = results[0]
+    return {
+        "graph": {
+            "nodes": format_nodes_for_graph(nodes),
+            "relationships": format_rels_for_graph(rels),
+        },
+        "paths": [[node.get("pk") for node in nodes]],
+    }
 
 def connect_and_disconnect(
         nodes_before_change: Sequence[DjangoNode],
@@ -424,6 +771,8 @@ def get_submissions_forms(submissions: Sequence[EditSubmission]) -> Sequence[dic
         ("wanted", "wanted"),
     )
     # TODO: in frontend? for the entities that don't have a select option: add new one?
+    # queried once instead of for every form
+    choices = get_all_choices()
     for submission in submissions:
         old_data = {}
         new_data = {}
@@ -431,15 +780,15 @@ def get_submissions_forms(submissions: Sequence[EditSubmission]) -> Sequence[dic
             old_data[key] = getattr(submission, property_name)
             new_data[key] = getattr(submission, property_name + "_new")
 
-        old_form = EditForm(initial=old_data, prefix=str(submission.id) + "old")
+        old_form = EditForm(initial=old_data, prefix=str(submission.id) + "old", choices=choices)
         for field in old_form:
             field.field.disabled = True
         if submission.action == "delete":
-            new_form = EditForm(initial={}, prefix=str(submission.id) + "new")
+            new_form = EditForm(initial={}, prefix=str(submission.id) + "new", choices=choices)
             for field in new_form:
                 field.field.disabled = True
         else:
-            new_form = EditForm(initial=new_data, prefix=str(submission.id) + "new")
+            new_form = EditForm(initial=new_data, prefix=str(submission.id) + "new", choices=choices)
             add_missing_select_options(new_form)
 
         submission_data = {
@@ -460,6 +809,19 @@ def trim_error(error: str) -> str:
     # with the .. it can be longer than MAX_ERROR_LENGTH
     return error[:MAX_ERROR_LENGTH] + ".." if len(error) > MAX_ERROR_LENGTH else error
 
+def validate_advisors(form: EditForm, person_id: str) -> bool:
+    """adds an error to the valid form if an advisor would create a cycle of advisor
+    relationships, which the lineage can't show"""
+    cycle_advisors = get_cycle_advisors(person_id, form.cleaned_data["advisors"])
+    if cycle_advisors:
+        names = dict(form.fields["advisors"].choices)
+        form.add_error("advisors", ValidationError(
+            "%(names)s can't be an advisor, this person advised them (directly or indirectly)",
+            code="cycle",
+            params={"names": ", ".join(names.get(pk, pk) for pk in cycle_advisors)},
+        ))
+    return not cycle_advisors
+
 def get_error_response_data(errors: dict[str, Any], field_id: str | None = None) -> dict[str, Any]:
     """
     Returns:
@@ -471,7 +833,19 @@ def get_error_response_data(errors: dict[str, Any], field_id: str | None = None)
     }
     return data
 
-def apply_submission(person: Person, submission: EditSubmission, data: dict[str, str | Sequence[str]]) -> None:
+def apply_submission(
+        person: Person,
+        submission: EditSubmission,
+        data: dict[str, str | Sequence[str]],
+        previous_data: dict[str, str | Sequence[str]],
+        user: str = "",
+    ) -> Person:
+    """apply the submission to Neo4j, delete it and record the change in the outbox
+
+    the outbox entry and the deletion of the submission are only committed if the
+    Neo4j transaction was committed
+    """
+    committed = False
     db.begin()
     try:
         if not person:
@@ -481,11 +855,24 @@ def apply_submission(person: Person, submission: EditSubmission, data: dict[str,
         person.title = data["title"]
         person.save()
         change_connected(person, data)
-        submission.delete()
+        new_data = get_person_data(person)
+        with transaction.atomic():
+            submission.delete()
+            record_change("edit", person.pk, new_data, previous_data, user)
+            update_person_signature(person.pk, person.name, new_data)
+            update_cooccurrence(previous_data, new_data)
+            # change_connected is also used for validating submissions, so the closure table is
+            # only changed here where the changes are committed
+            update_advisors(person.pk, previous_data.get("advisors", []), new_data["advisors"])
+            # neomodel ends the transaction even if the commit fails
+            committed = True
+            db.commit()
     except Exception:
-        db.rollback()
+        # e.g. the SQLite part failed, the next db.begin() only works after a rollback
+        if not committed:
+            db.rollback()
         raise
-    db.commit()
+    return person
 
 def stringify_edit_submission_post(post_data: QueryDict) -> str:
     output = []
@@ -560,6 +947,8 @@ def edit(request):
             if not person:
                 # quietly discard the submission
                 return JsonResponse({})
+        elif person and not validate_advisors(form, person.pk):
+            return HttpResponse(form.errors.as_json(), content_type="application/json", status=422)
 
         db.begin()
         # if the exception cause is properly detected for error messages then the two try blocks can be merged
@@ -646,8 +1035,10 @@ def approve(request):
 
         person = Person.nodes.get_or_none(pk=submission.person_id)
         if person:
-            data_before_change = get_person_data(person)
+            previous_data = get_person_data(person)
+            data_before_change = previous_data
         else:
+            previous_data = {}
             data_before_change = "[person was created by this operation]"
 
         if action == "delete":
@@ -656,16 +1047,31 @@ def approve(request):
                 f"to DELETE person with PREVIOUS data = {data_before_change}"
             )
             logger.info(log)
-            submission.delete()
-            if person:
-                person.delete()
+            committed = False
+            db.begin()
+            try:
+                with transaction.atomic():
+                    submission.delete()
+                    if person:
+                        record_change("delete", person.pk, {}, previous_data, str(request.user))
+                        remove_person_signature(person.pk)
+                        update_cooccurrence(previous_data, {})
+                        remove_person_lineage(person.pk)
+                        person.delete()
+                    committed = True
+                    db.commit()
+            except Exception:
+                if not committed:
+                    db.rollback()
+                raise
             return JsonResponse({ "id": submission_id })
 
         form = EditForm(request.POST, prefix=submission_id + "new")
-        if not form.is_valid():
+        # the advisors are validated again because the lineage could have changed since the edit
+        if not form.is_valid() or (person and not validate_advisors(form, person.pk)):
             return HttpResponse(form.errors.as_json(), content_type="application/json", status=422)
         try:
-            apply_submission(person, submission, form.cleaned_data)
+            apply_submission(person, submission, form.cleaned_data, previous_data, str(request.user))
             log = (
                 f"approved submission by {request.user}:{request.user.id} "
                 f"to EDIT with REQUEST data = {stringify_edit_submission_post(request.POST)} "
@@ -692,20 +1098,258 @@ def persons_api(request):
         data["error"] = "missing parameter: search"
         return JsonResponse(data, status=400)
 
+    sort = request.GET.get("sort", "name")
+    if sort not in ("name", "centrality"):
+        data["error"] = "invalid parameter: sort needs to be name or centrality"
+        return JsonResponse(data, status=400)
+
     search_phrases = request.GET.getlist("search")
+    if getattr(settings, "LEAN_PERSONS_PAYLOAD", False):
+        # the same JSON without the dicts of get_all_person_data, see payload.py
+        persons = find_persons(search_phrases)
+        persons.sort(key=lambda person: get_surname(person.name))
+        if sort == "centrality":
+            pageranks = get_pageranks(person.pk for person in persons)
+            persons.sort(key=lambda person: -pageranks.get(person.pk, 0))
+        return StreamingHttpResponse(iter_persons_json(persons), content_type="application/json")
+
     persons_data = get_filtered_data(search_phrases)
+    if sort == "centrality":
+        pageranks = get_pageranks(entry["person"]["pk"] for entry in persons_data)
+        persons_data.sort(key=lambda entry: -pageranks.get(entry["person"]["pk"], 0))
     data["persons"] = persons_data
     return JsonResponse(data)
 
 def graph_api(request):
+    """the neighborhood of the node or the merged neighborhood if several ids are given"""
+    data = {}
+    node_ids = list(dict.fromkeys(x for x in request.GET.getlist("id") if x != ""))
+    if not node_ids:
+        data["error"] = "missing parameter: id"
+        return JsonResponse(data, status=400)
+    if len(node_ids) > MAX_GRAPH_IDS:
+        data["error"] = f"invalid parameter: at most {MAX_GRAPH_IDS} ids are allowed"
+        return JsonResponse(data, status=400)
+
+    try:
+        depth = int(request.GET.get("depth", 1))
+    except ValueError:
+        depth = 0
+    if not 1 <= depth <= MAX_GRAPH_DEPTH:
+        data["error"] = f"invalid parameter: depth needs to be between 1 and {MAX_GRAPH_DEPTH}"
+        return JsonResponse(data, status=400)
+
+    # do I need to give a proper error for the case that a node with the given key doesn't exist?
+    known_ids = request.GET.getlist("known")
+    with_layout = request.GET.get("layout") in ("1", "true")
+    if len(node_ids) == 1:
+        data["graph"] = get_graph_data(node_ids[0], depth, known_ids, with_layout)
+    else:
+        data["graph"] = get_batch_graph_data(node_ids, depth, known_ids, with_layout)
+    return JsonResponse(data)
+
+def graph_subgraph_api(request):
+    """the graph of the persons that match the search phrases and filters of the search page"""
+    data = {}
+    try:
+        filters = parse_filters(request.GET.getlist("filter"))
+    except ValueError as e:
+        data["error"] = f"invalid parameter: filter {e}"
+        return JsonResponse(data, status=400)
+
+    search_phrases = request.GET.getlist("search")
+    data["graph"] = get_subgraph_data(get_graph_index(), search_phrases, filters)
+    return JsonResponse(data)
+
+def graph_overview_api(request):
+    """the precomputed graph of the communities, empty until detect_communities was run"""
+    return JsonResponse({"graph": get_overview_data()})
+
+@permission_required("expertise.view_graphchange")
+def changes_api(request):
+    """returns the changes after the cursor, the returned cursor is used for the next request"""
+    data = {}
+    try:
+        after = int(request.GET.get("after", 0))
+        limit = int(request.GET.get("limit", MAX_CHANGES_PER_PAGE))
+    except ValueError:
+        data["error"] = "invalid parameter: after and limit need to be integers"
+        return JsonResponse(data, status=400)
+
+    changes = get_changes(after, limit)
+    data["changes"] = [serialize_change(change) for change in changes]
+    data["cursor"] = changes[-1].id if changes else after
+    return JsonResponse(data)
+
+@staff_member_required
+def slow_queries(request):
+    """the slow Cypher queries that were seen in the last days, the slowest first"""
+    days = getattr(settings, "SLOW_QUERY_DAYS", 7)
+    since = timezone.now() - timedelta(days=days)
+    queries = SlowQuery.objects.filter(last_seen__gte=since).order_by("-max_duration")[:MAX_SLOW_QUERIES]
+    context = {
+        "queries": queries,
+        "days": days,
+    }
+    return render(request, "expertise/slow-queries.html", context)
+
+def metrics_view(request):
+    """the metrics of all processes for Prometheus, only for the METRICS_ALLOWED_IPS"""
+    allowed_ips = getattr(settings, "METRICS_ALLOWED_IPS", ("127.0.0.1", "::1"))
+    if not metrics.is_enabled() or request.META.get("REMOTE_ADDR") not in allowed_ips:
+        return HttpResponse(status=403)
+    gauges = {"expertise_pending_edit_submissions": EditSubmission.objects.count()}
+    return HttpResponse(metrics.export(gauges), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+def graph_neighbors_api(request):
+    """pages through the neighbors of a node that are summarized by an aggregate node"""
+    data = {}
+    node_id = request.GET.get("id")
+    label = request.GET.get("label")
+    if node_id in (None, "") or label not in GRAPH_LABEL_NAMES:
+        data["error"] = "missing or invalid parameter: id, label"
+        return JsonResponse(data, status=400)
+
+    max_neighbors = getattr(settings, "GRAPH_MAX_NEIGHBORS", DEFAULT_MAX_NEIGHBORS)
+    try:
+        offset = int(request.GET.get("offset", 0))
+        limit = int(request.GET.get("limit", max_neighbors))
+    except ValueError:
+        offset = limit = -1
+    if offset < 0 or not 1 <= limit <= max_neighbors:
+        data["error"] = f"invalid parameter: offset can't be negative and limit needs to be between 1 and {max_neighbors}"
+        return JsonResponse(data, status=400)
+
+    data.update(get_neighbors_page(node_id, label, offset, limit))
+    return JsonResponse(data)
+
+def path_api(request):
+    data = {}
+    source_id = request.GET.get("from")
+    target_id = request.GET.get("to")
+    if source_id in (None, "") or target_id in (None, ""):
+        data["error"] = "missing parameter: from, to"
+        return JsonResponse(data, status=400)
+    try:
+        k = int(request.GET.get("k", 1))
+    except ValueError:
+        k = 0
+    if not 1 <= k <= MAX_PATHS:
+        data["error"] = f"invalid parameter: k needs to be between 1 and {MAX_PATHS}"
+        return JsonResponse(data, status=400)
+
+    data.update(get_path_data(source_id, target_id, k))
+    return JsonResponse(data)
+
+def matches_api(request):
+    """persons who offer the expertise the person wants and who want what the person offers"""
+    data = {}
+    person_id = request.GET.get("id")
+    if person_id in (None, ""):
+        data["error"] = "missing parameter: id"
+        return JsonResponse(data, status=400)
+    try:
+        k = int(request.GET.get("k", DEFAULT_TOP_MATCHES))
+    except ValueError:
+        k = 0
+    if not 1 <= k <= 10 * DEFAULT_TOP_MATCHES:
+        data["error"] = f"invalid parameter: k needs to be between 1 and {10 * DEFAULT_TOP_MATCHES}"
+        return JsonResponse(data, status=400)
+
+    data["matches"] = get_matches(person_id, k)
+    return JsonResponse(data)
+
+def similar_api(request):
+    """persons with similar interests, expertise, departments and advisors"""
+    data = {}
+    person_id = request.GET.get("id")
+    if person_id in (None, ""):
+        data["error"] = "missing parameter: id"
+        return JsonResponse(data, status=400)
+    try:
+        k = int(request.GET.get("k", DEFAULT_SIMILAR_PERSONS))
+    except ValueError:
+        k = 0
+    if not 1 <= k <= 10 * DEFAULT_SIMILAR_PERSONS:
+        data["error"] = f"invalid parameter: k needs to be between 1 and {10 * DEFAULT_SIMILAR_PERSONS}"
+        return JsonResponse(data, status=400)
+
+    tokens = None
+    # persons without a stored signature, e.g. before the signatures were built
+    person = Person.nodes.get_or_none(pk=person_id)
+    if person and not PersonSignature.objects.filter(person_id=person_id).exists():
+        tokens = get_tokens(get_person_data(person))
+    data["similar"] = get_similar_persons(person_id, tokens, k)
+    return JsonResponse(data)
+
+def related_api(request):
+    """interests and expertise that often occur together with the topic on the same persons"""
+    data = {}
+    topic_id = request.GET.get("id")
+    if topic_id in (None, ""):
+        data["error"] = "missing parameter: id"
+        return JsonResponse(data, status=400)
+    try:
+        k = int(request.GET.get("k", DEFAULT_RELATED_TOPICS))
+    except ValueError:
+        k = 0
+    if not 1 <= k <= 10 * DEFAULT_RELATED_TOPICS:
+        data["error"] = f"invalid parameter: k needs to be between 1 and {10 * DEFAULT_RELATED_TOPICS}"
+        return JsonResponse(data, status=400)
+
+    data["related"] = get_related_topics(topic_id, k)
+    return JsonResponse(data)
+
+def entity_api(request):
+    """the node, the number of connected persons by relationship type and a page of them"""
     data = {}
     node_id = request.GET.get("id")
     if node_id in (None, ""):
         data["error"] = "missing parameter: id"
         return JsonResponse(data, status=400)
+    rel_type = request.GET.get("type") or None
+    if rel_type is not None and rel_type not in PERSON_RELATIONSHIP_TYPES:
+        data["error"] = f"invalid parameter: type needs to be one of {', '.join(PERSON_RELATIONSHIP_TYPES)}"
+        return JsonResponse(data, status=400)
+    try:
+        limit = int(request.GET.get("limit", DEFAULT_MEMBERS_PER_PAGE))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_MEMBERS_PER_PAGE:
+        data["error"] = f"invalid parameter: limit needs to be between 1 and {MAX_MEMBERS_PER_PAGE}"
+        return JsonResponse(data, status=400)
+    after = None
+    if request.GET.get("after"):
+        try:
+            after = decode_members_cursor(request.GET["after"])
+        except ValueError:
+            data["error"] = "invalid parameter: after"
+            return JsonResponse(data, status=400)
+
+    entity = get_entity_data(node_id)
+    if entity is None:
+        data["error"] = "node not found"
+        return JsonResponse(data, status=404)
+    data["entity"] = entity
+    data["persons"], data["nextCursor"] = query_entity_members(node_id, rel_type, after, limit)
+    return JsonResponse(data)
 
-    # do I need to give a proper error for the case that a node with the given key doesn't exist?
-    data["graph"] = get_graph_data(node_id)
+def lineage_api(request):
+    """the advisors of the person's advisors and so on and the persons they advised"""
+    data = {}
+    person_id = request.GET.get("id")
+    if person_id in (None, ""):
+        data["error"] = "missing parameter: id"
+        return JsonResponse(data, status=400)
+    try:
+        depth = int(request.GET.get("depth", MAX_LINEAGE_DEPTH))
+    except ValueError:
+        depth = 0
+    if not 1 <= depth <= MAX_LINEAGE_DEPTH:
+        data["error"] = f"invalid parameter: depth needs to be between 1 and {MAX_LINEAGE_DEPTH}"
+        return JsonResponse(data, status=400)
+
+    data.update(get_lineage(person_id, depth))
     return JsonResponse(data)
 
 def shorten(request):